@@ -0,0 +1,292 @@
+#!/usr/bin/env python3
+
+import math
+
+import numpy as np
+from hyperopt import tpe, Trials, STATUS_OK, JOB_STATE_DONE, JOB_STATE_RUNNING, space_eval
+from hyperopt.base import Domain
+
+from job_tracker import JobTracker
+from metrics import timed
+
+class AsyncTPE:
+    """Ask/tell front end to hyperopt's TPE for evaluations that finish out of order.
+
+    Proposals that are still being evaluated are shown to TPE with a constant "lie" loss
+    (constant liar), so concurrent asks spread out instead of piling onto the same point.
+    `lie` is 'min', 'mean', 'max' (of the finite losses seen so far) or a fixed number.
+    """
+
+    def __init__(self, space, trials=None, lie='mean', seed=None, algo=tpe.suggest):
+        self.space = space
+        self.domain = Domain(lambda params: None, space)
+        self.trials = trials if trials is not None else Trials()
+        self.lie = lie
+        self.algo = algo
+        self.rstate = np.random.default_rng(seed)
+        self.pending = {}
+
+    def set_space(self, space):
+        """Search `space` from now on (same labels, e.g. narrower ranges); the history is kept."""
+        self.space = space
+        self.domain = Domain(lambda params: None, space)
+
+    def finite_losses(self):
+        return [loss for loss in self.trials.losses() if loss is not None and math.isfinite(loss)]
+
+    def lie_value(self):
+        if isinstance(self.lie, (int, float)):
+            return float(self.lie)
+        losses = self.finite_losses()
+        if not losses:
+            return None
+        if self.lie == 'min':
+            return min(losses)
+        if self.lie == 'max':
+            return max(losses)
+        return sum(losses) / len(losses)
+
+    def ask(self):
+        """Return (tid, params) for a new point; `params` is the evaluated `space` sample."""
+        lie = self.lie_value()
+        if lie is not None:
+            for doc in self.pending.values():
+                doc['result'] = {'loss': lie, 'status': STATUS_OK}
+        try:
+            tid = self.new_tid()
+            new_docs = self.algo([tid], self.domain, self.trials, self.rstate.integers(2 ** 31 - 1))
+        finally:
+            for doc in self.pending.values():
+                doc['result'] = self.domain.new_result()
+
+        for doc in new_docs:
+            doc['state'] = JOB_STATE_RUNNING
+        self.trials.insert_trial_docs(new_docs)
+        self.trials.refresh()
+
+        doc = next(doc for doc in self.trials.trials if doc['tid'] == tid)
+        self.pending[tid] = doc
+        return tid, self.params_of(doc)
+
+    def new_tid(self):
+        # Trials.new_trial_ids counts the ids handed out so far, which can hit a restored or seeded tid.
+        return max(self.trials.tids, default=-1) + 1
+
+    def vals_of(self, tid):
+        """Raw hyperopt values of a pending trial, as stored by a TrialJournal."""
+        vals = {label: values[0] for label, values in self.pending[tid]['misc']['vals'].items() if values}
+        return {label: value.item() if hasattr(value, 'item') else value for label, value in vals.items()}
+
+    def params_of(self, doc):
+        vals = {label: values[0] for label, values in doc['misc']['vals'].items() if values}
+        return space_eval(self.space, vals)
+
+    def restore(self, tid, vals, result=None):
+        """Re-insert a trial from a journal: finished if `result` is given, pending otherwise."""
+        misc = {'tid': tid, 'cmd': self.domain.cmd, 'workdir': self.domain.workdir,
+                'idxs': {label: [tid] for label in vals}, 'vals': {label: [value] for label, value in vals.items()}}
+        for label in self.domain.params:
+            misc['idxs'].setdefault(label, [])
+            misc['vals'].setdefault(label, [])
+        doc = self.trials.new_trial_docs([tid], [None], [result or self.domain.new_result()], [misc])[0]
+        doc['state'] = JOB_STATE_DONE if result is not None else JOB_STATE_RUNNING
+        self.trials.insert_trial_docs([doc])
+        self.trials.refresh()
+
+        doc = next(doc for doc in self.trials.trials if doc['tid'] == tid)
+        if result is None:
+            self.pending[tid] = doc
+        return self.params_of(doc)
+
+    def seed(self, vals, result):
+        """Add a finished evaluation from an earlier run (warm_start.py) under a new tid; returns the tid.
+
+        Seeded trials shape the proposals but are never reported by `best`.
+        """
+        tid = self.new_tid()
+        self.restore(tid, vals, dict(result, seeded=result.get('seeded', True)))
+        return tid
+
+    def tell(self, tid, result):
+        """Report the outcome of `tid`: a loss, or a hyperopt result dict with 'loss' and 'status'."""
+        if not isinstance(result, dict):
+            result = {'loss': result, 'status': STATUS_OK}
+        doc = self.pending.pop(tid)
+        doc['result'] = result
+        doc['state'] = JOB_STATE_DONE
+        self.trials.refresh()
+
+    def result_of(self, tid):
+        return next(doc['result'] for doc in self.trials.trials if doc['tid'] == tid)
+
+    def best(self):
+        """Best fully evaluated trial; results stopped at a lower fidelity ('screened') and
+        evaluations seeded from earlier runs are skipped."""
+        done = [doc for doc in self.trials.trials
+                if doc['tid'] not in self.pending and doc['result'].get('loss') is not None
+                and not doc['result'].get('screened') and not doc['result'].get('seeded')]
+        if not done:
+            return None, float('inf')
+        doc = min(done, key=lambda d: d['result']['loss'])
+        return self.params_of(doc), doc['result']['loss']
+
+def run_async_optimization(optimizer, submit, finish, max_evals, n_parallel=4, tracker=None, journal=None,
+                           check=None, metrics=None, prior=(), adapt=None, pool=None):
+    """Keep `n_parallel` parameter sets evaluating until `max_evals` results are told back.
+
+    `submit(params)` writes the inputs for one parameter set and returns the submitted job ids
+    without waiting. Once all of them have left the queue `finish(params)` is called; it
+    extracts and scores the results and returns the loss (or a hyperopt result dict), which
+    is fed straight back to the optimizer while the other evaluations keep running.
+
+    With a `pool` (job_tracker.JobPool) `submit` may queue its jobs on the pool instead; they
+    are labelled with the tid of their evaluation and the pool is stepped on every poll, so
+    at most `pool.max_jobs` jobs of all evaluations are in the queue at once. An evaluation
+    picks up its jobs as they are actually submitted and is done once none are left in the
+    queue or in the pool.
+
+    With a `journal` (trial_journal.TrialJournal) every step is checkpointed. A restarted run
+    replays the finished trials, reattaches to the jobs of evaluations that were in flight and
+    counts everything already done towards `max_evals`.
+
+    `check(params)` is called whenever some, but not all, jobs of an evaluation have finished.
+    If it returns a result (loss or result dict) the remaining jobs are cancelled and that
+    result is told to the optimizer straight away.
+
+    If `finish` returns a result dict with 'promoted' set (multi_fidelity.SuccessiveHalving),
+    the evaluation is not done yet: `submit(params)` is called again for the next stage and
+    the evaluation stays in flight.
+
+    With a `metrics` store (metrics.MetricsStore) the time spent in ask, submit, check and
+    finish is recorded per evaluation (tid), and polling and waiting by the tracker.
+    """
+    tracker = pool.tracker if pool is not None else tracker if tracker is not None else JobTracker()
+    in_flight = {}
+    submitted = {}
+    started = 0
+    finished = 0
+
+    def queued(tid):
+        return pool.queued(tid=tid) if pool is not None else 0
+
+    def record(tid):
+        if journal is not None:
+            if queued(tid):
+                journal.record_jobs(tid, submitted[tid])
+            else:
+                journal.record_submitted(tid, submitted[tid])
+
+    def attach(job_ids):
+        # Jobs the pool has just put in the queue join the evaluation they were queued for.
+        by_tid = {}
+        for job_id in job_ids:
+            tid = tracker.jobs[job_id].get("tid")
+            if tid in in_flight:
+                in_flight[tid][1].add(job_id)
+                submitted[tid].append(job_id)
+                by_tid[tid] = True
+        for tid in by_tid:
+            record(tid)
+
+    def start(tid, params):
+        with timed(metrics, 'submit', tid):
+            if pool is not None:
+                with pool.labelled(tid=tid):
+                    job_ids = list(submit(params))
+            else:
+                job_ids = list(submit(params))
+        for job_id in job_ids:
+            tracker.track(job_id, tid=tid)
+        in_flight[tid] = (params, set(job_ids))
+        submitted[tid] = list(job_ids)
+        record(tid)
+        if pool is not None:
+            attach(pool.fill())
+        return in_flight[tid][1]
+
+    if journal is not None:
+        unfinished = journal.restore(optimizer)
+        finished = len(optimizer.trials) - len(unfinished)
+        for tid, params, job_ids, state in unfinished:
+            if state == 'submitting':
+                # Jobs of an evaluation that was still being queued are cancelled and the evaluation
+                # is submitted again; molecules that had already finished come from the cache.
+                for job_id in job_ids:
+                    tracker.track(job_id, tid=tid)
+                tracker.cancel(job_ids)
+                job_ids = start(tid, params)
+            else:
+                for job_id in job_ids:
+                    if pool is not None:
+                        pool.adopt(job_id, tid=tid)
+                    else:
+                        tracker.track(job_id, tid=tid)
+                in_flight[tid] = (params, set(job_ids))
+                submitted[tid] = list(job_ids)
+            print(f"Evaluation {tid} resumed with {len(job_ids)} job(s).")
+        started = finished + len(in_flight)
+
+    for vals, result in prior:
+        optimizer.seed(vals, result)
+    if prior:
+        print(f"Seeded the optimizer with {len(prior)} evaluation(s) from earlier runs.")
+
+    while finished < max_evals:
+        while len(in_flight) < n_parallel and started < max_evals:
+            with timed(metrics, 'ask'):
+                tid, params = optimizer.ask()
+            if journal is not None:
+                journal.record_ask(tid, optimizer.vals_of(tid))
+            job_ids = start(tid, params)
+            started += 1
+            waiting = f", {queued(tid)} waiting for a place" if queued(tid) else ""
+            print(f"Evaluation {tid} started with {len(job_ids)} job(s){waiting}; {len(in_flight)} in flight.")
+
+        if pool is not None:
+            first_new = len(pool.submitted)
+            pool.step()
+            attach(pool.submitted[first_new:])
+        else:
+            tracker.poll()
+
+        completed = []
+        aborted = {}
+        for tid, (params, job_ids) in in_flight.items():
+            done = [job_id for job_id in job_ids if tracker.is_finished(job_id)]
+            job_ids.difference_update(done)
+            if not job_ids and not queued(tid):
+                completed.append(tid)
+            elif done and check is not None:
+                with timed(metrics, 'check', tid):
+                    result = check(params)
+                if result is not None:
+                    tracker.cancel(job_ids)
+                    job_ids.clear()
+                    if pool is not None:
+                        pool.drop(tid=tid)
+                    aborted[tid] = result
+                    completed.append(tid)
+
+        for tid in completed:
+            params, _ = in_flight.pop(tid)
+            if tid in aborted:
+                result = aborted[tid]
+            else:
+                with timed(metrics, 'finish', tid):
+                    result = finish(params)
+            if isinstance(result, dict) and result.get('promoted'):
+                job_ids = start(tid, params)
+                print(f"Evaluation {tid} promoted to {result['promoted']} with {len(job_ids)} job(s).")
+                continue
+            optimizer.tell(tid, result)
+            if journal is not None:
+                journal.record_tell(tid, optimizer.result_of(tid))
+            finished += 1
+            print(f"Evaluation {tid} finished ({finished}/{max_evals}).")
+            if adapt is not None:
+                adapt(optimizer, finished)
+
+        if in_flight and not completed:
+            tracker.sleep()
+
+    return optimizer.best()
@@ -0,0 +1,208 @@
+#!/usr/bin/env python3
+
+import io
+import os
+import json
+import shutil
+import argparse
+import tempfile
+import contextlib
+import subprocess
+from time import perf_counter
+from collections import defaultdict
+
+from log_parser import parse_log
+from retry_engine import classify_failure
+from parallel_extract import extract_parallel
+from extract_log_data import extract_log_data
+from compare_results import compare_with_reference, calculate_rmse_mae, S1_ref, T1_ref
+from scoring import ResultArrays, score_all
+from generate_and_submit_jobs import render_input, write_input_file
+from evaluation_cache import params_key
+from synthetic_logs import SIZES, FAILURE_MODES, render_log, write_tree, random_points
+from collect_energies import collect_tree, arrange, write_arranged, ARRANGED_FILE
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+GEOMETRIES = os.path.join(HERE, "geometries.txt")
+LEGACY = os.path.join(HERE, "legacy")
+
+def measure(function, repeat):
+    """Best and mean wall time of `repeat` calls of `function()` (its output silenced)."""
+    times = []
+    for _ in range(repeat):
+        with contextlib.redirect_stdout(io.StringIO()):
+            start = perf_counter()
+            function()
+            times.append(perf_counter() - start)
+    return min(times), sum(times) / len(times)
+
+class Benchmarks:
+    """Collects (name, items, best, mean) rows and prints them as they come in."""
+
+    def __init__(self, repeat):
+        self.repeat = repeat
+        self.rows = []
+
+    def run(self, name, function, items=1):
+        best, mean = measure(function, self.repeat)
+        self.rows.append({"name": name, "items": items, "best": best, "mean": mean, "per_item": best / items})
+        print(f"{name:<38s} {items:7d}  best {best * 1e3:10.2f} ms  mean {mean * 1e3:10.2f} ms  "
+              f"{best / items * 1e6:10.1f} us/item")
+
+    def skip(self, name, reason):
+        print(f"{name:<38s} skipped: {reason}")
+
+def log_corpus(root, count, seed=0):
+    """`count` successful logs of every size and one log of every failure mode; {label: [paths]}."""
+    corpus = defaultdict(list)
+    params = {'a1': 0.5, 'b1': -0.23, 'a2': 0.68, 'b2': -0.1}
+    for size in SIZES:
+        for i in range(count):
+            path = os.path.join(root, f"{size}_{i}.log")
+            with open(path, "w") as f:
+                f.write(render_log("Heptazine", params, "S" if i % 2 else "T", None, size, seed + i))
+            corpus[size].append(path)
+    for failure in FAILURE_MODES:
+        path = os.path.join(root, f"{failure}.log")
+        text = render_log("Heptazine", params, "S", failure, "small", seed)
+        if text is not None:
+            with open(path, "w") as f:
+                f.write(text)
+        corpus["failures"].append(path)
+    return corpus
+
+def bench_parsing(bench, corpus):
+    for size in SIZES:
+        logs = corpus[size]
+        megabytes = sum(os.path.getsize(path) for path in logs) / 2 ** 20
+        bench.run(f"parse_log {size} ({megabytes / len(logs):.2f} MB/log)",
+                  lambda logs=logs: [parse_log(path) for path in logs], len(logs))
+    bench.run("classify_failure (every mode)",
+              lambda: [classify_failure(path) for path in corpus["failures"]], len(corpus["failures"]))
+
+def bench_extraction(bench, tree, points, molecules, outcome, workers):
+    n_logs = sum(1 for failure in outcome.values() if failure != 'missing')
+    bench.run("parallel_extract (1 worker)", lambda: extract_parallel([tree], workers=1), n_logs)
+    if workers > 1:
+        bench.run(f"parallel_extract ({workers} workers)", lambda: extract_parallel([tree], workers=workers), n_logs)
+
+    # Only points whose runs all finished are timed (a failed run is also classified, which costs
+    # a second read of its log), so the numbers compare across failure rates.
+    clean = [p for p in points if all(outcome[(params_key(p), molecule, state)] is None
+                                      for molecule in molecules for state in ('S', 'T'))]
+    if not clean:
+        bench.skip("extract_log_data", "no point without failures (lower --failure-rate)")
+        return
+    current_dir = os.getcwd()
+    os.chdir(tree)
+    try:
+        bench.run("extract_log_data (per evaluation)",
+                  lambda: [extract_log_data(molecules, p['a1'], p['b1'], p['a2'], p['b2'], []) for p in clean],
+                  len(clean))
+    finally:
+        os.chdir(current_dir)
+
+def bench_scoring(bench, rows):
+    by_combination = defaultdict(list)
+    for row in rows:
+        by_combination[tuple(row[name] for name in ('a1', 'b1', 'a2', 'b2'))].append(row)
+
+    def score_each():
+        for combination_rows in by_combination.values():
+            comparison, differences = compare_with_reference(combination_rows, S1_ref, T1_ref)
+            calculate_rmse_mae(differences)
+
+    bench.run("compare_with_reference + RMSE", score_each, len(by_combination))
+    bench.run("scoring.score_all (vectorized)", lambda: score_all(ResultArrays.from_rows(rows), S1_ref, T1_ref),
+              len(by_combination))
+
+def bench_inputs(bench, points, molecules, root):
+    n_inputs = 2 * len(points) * len(molecules)
+    bench.run("render_input", lambda: [render_input(molecule, p['a1'], p['b1'], p['a2'], p['b2'], state, GEOMETRIES)
+                                       for p in points for molecule in molecules for state in ('S', 'T')], n_inputs)
+
+    current_dir = os.getcwd()
+    os.chdir(root)
+    try:
+        bench.run("write_input_file", lambda: [write_input_file(molecule, p['a1'], p['b1'], p['a2'], p['b2'], state,
+                                                                GEOMETRIES)
+                                               for p in points for molecule in molecules for state in ('S', 'T')],
+                  n_inputs)
+    finally:
+        os.chdir(current_dir)
+
+def bench_collector(bench, tree, outcome, workers):
+    n_pairs = sum(1 for (key, molecule, state), failure in outcome.items() if state == 'S')
+
+    def collect_and_arrange(workers):
+        write_arranged(arrange(collect_tree([tree], workers)), os.path.join(tree, ARRANGED_FILE))
+
+    bench.run("collect_energies all (1 worker)", lambda: collect_and_arrange(1), n_pairs)
+    if workers > 1:
+        bench.run(f"collect_energies all ({workers} workers)", lambda: collect_and_arrange(workers), n_pairs)
+
+    # The awk/grep/bc collector and arranger collect_energies.py replaced, kept in legacy/ for this
+    # comparison only (data_collector_I.sh and data_arranger_II.sh now call collect_energies.py).
+    missing = [tool for tool in ("bash", "awk", "bc", "grep") if shutil.which(tool) is None]
+    if missing:
+        bench.skip("legacy shell collector + arranger", f"{', '.join(missing)} not found")
+        return
+
+    def run_scripts():
+        for script in ("data_collector_I.sh", "data_arranger_II.sh"):
+            subprocess.run(["bash", os.path.join(LEGACY, script)], cwd=tree, stdout=subprocess.DEVNULL,
+                           stderr=subprocess.DEVNULL, check=True)
+
+    bench.run("legacy shell collector + arranger", run_scripts, n_pairs)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Time the driver-side hot paths on a synthetic MRSF log corpus.")
+    parser.add_argument("-n", "--points", type=int, default=20, help="parameter sets in the synthetic tree")
+    parser.add_argument("--molecules", nargs="+", default=list(S1_ref))
+    parser.add_argument("--size", default="small", help=f"log size of the tree: {', '.join(SIZES)} or filler lines")
+    parser.add_argument("--logs", type=int, default=10, help="logs per size for the parsing benchmarks")
+    parser.add_argument("--failure-rate", type=float, default=0.05)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--only", nargs="+", choices=("parsing", "extraction", "scoring", "inputs", "collector"))
+    parser.add_argument("--json", help="also write the results to this file")
+    parser.add_argument("--keep", help="build the corpus in this directory and keep it")
+    args = parser.parse_args()
+
+    root = args.keep or tempfile.mkdtemp(prefix="mrsf_bench_")
+    os.makedirs(root, exist_ok=True)
+    selected = set(args.only or ("parsing", "extraction", "scoring", "inputs", "collector"))
+    try:
+        points = random_points(args.points, args.seed)
+        print(f"Writing the synthetic corpus to {root}...")
+        corpus_dir = os.path.join(root, "corpus")
+        os.makedirs(corpus_dir, exist_ok=True)
+        corpus = log_corpus(corpus_dir, args.logs, args.seed)
+        tree = os.path.join(root, "tree")
+        outcome = write_tree(tree, points, args.molecules, args.failure_rate, args.size, args.seed)
+        print(f"{len(outcome)} run(s) in the tree, {sum(1 for f in outcome.values() if f)} failed; "
+              f"best of {args.repeat} repeat(s).\n")
+
+        bench = Benchmarks(args.repeat)
+        if "parsing" in selected:
+            bench_parsing(bench, corpus)
+        if "extraction" in selected:
+            bench_extraction(bench, tree, points, args.molecules, outcome, args.workers)
+        if "scoring" in selected:
+            rows, _ = extract_parallel([tree], workers=1)
+            bench_scoring(bench, rows)
+        if "inputs" in selected:
+            inputs_dir = os.path.join(root, "inputs")
+            os.makedirs(inputs_dir, exist_ok=True)
+            bench_inputs(bench, points, args.molecules, inputs_dir)
+        if "collector" in selected:
+            bench_collector(bench, tree, outcome, args.workers)
+
+        if args.json:
+            with open(args.json, "w") as f:
+                json.dump({"args": vars(args), "results": bench.rows}, f, indent=2)
+            print(f"\nResults saved to {args.json}")
+    finally:
+        if not args.keep:
+            shutil.rmtree(root, ignore_errors=True)
@@ -0,0 +1,239 @@
+#!/usr/bin/env python3
+
+import os
+import re
+import csv
+import argparse
+from decimal import Decimal, ROUND_DOWN
+from concurrent.futures import ProcessPoolExecutor
+
+from log_parser import open_log, list_logs, log_exists
+from evaluation_cache import parse_state_dir
+
+COLLECTED_FILE = "final_energies_and_differences.txt"
+ARRANGED_FILE = "sorted_energies_and_differences_by_folder.txt"
+
+MOLECULE_ORDER = ["Heptazine", "Cyclazine", "Molecule3", "Molecule4", "Molecule5",
+                  "Molecule6", "Molecule7", "Molecule8", "Molecule9", "Molecule10"]
+
+# The factor data_collector_I.sh multiplied (E_S0 - E_T1) by, as bc saw it.
+FACTOR = "-27.2114"
+
+collected_pattern = re.compile(r"^(?P<name>.+?): Excitation Energy = (?P<excitation>\S+), Energy_A_S = (?P<energy_s>\S+), "
+                               r"Energy_A_T = (?P<energy_t>\S+), Difference x -27\.2114 = (?P<difference>\S+)$")
+
+def singlet_fields(log_file):
+    """(S0 energy, S1 excitation) text of a singlet log, read as data_collector_I.sh's awk did.
+
+    The energy is the third field of the last line containing "1  A" before the first
+    "1  ->  2" line, the excitation the fourth field of that line. Missing values are None.
+    """
+    energy = excitation = None
+    with open_log(log_file) as lines:
+        for line in lines:
+            if "1  A" in line:
+                fields = line.split()
+                energy = fields[2] if len(fields) > 2 else None
+            if "1  ->  2" in line:
+                fields = line.split()
+                excitation = fields[3] if len(fields) > 3 else None
+                break
+    return energy, excitation
+
+def triplet_energy(log_file):
+    """Third field of the first line containing "1  A" of a triplet log (the T1 energy), or None."""
+    with open_log(log_file) as lines:
+        for line in lines:
+            if "1  A" in line:
+                fields = line.split()
+                return fields[2] if len(fields) > 2 else None
+    return None
+
+def scale(text):
+    return len(text.split(".", 1)[1]) if "." in text else 0
+
+def bc_format(value, digits):
+    """`value` as bc prints it at scale `digits`: truncated, without the leading zero of |x| < 1."""
+    if value == 0:
+        return "0"
+    text = f"{value.quantize(Decimal(1).scaleb(-digits), rounding=ROUND_DOWN):f}"
+    if text.startswith("0."):
+        return text[1:]
+    if text.startswith("-0."):
+        return "-" + text[2:]
+    return text
+
+def bc_difference(energy_s, energy_t):
+    """(E_S - E_T) * -27.2114 as `bc` computed it in data_collector_I.sh: the T1 energy in eV."""
+    digits = max(scale(energy_s), scale(energy_t), scale(FACTOR))
+    return bc_format((Decimal(energy_s) - Decimal(energy_t)) * Decimal(FACTOR), digits)
+
+def bc_subtract(a, b):
+    return bc_format(Decimal(a) - Decimal(b), max(scale(a), scale(b)))
+
+def collect_pair(pair):
+    """Fields of one singlet/triplet log pair, or None if the collector would have skipped it."""
+    singlet_log, triplet_log = pair
+    try:
+        energy_s, excitation = singlet_fields(singlet_log)
+        energy_t = triplet_energy(triplet_log)
+    except (OSError, UnicodeDecodeError):
+        return None
+    if not energy_s or not energy_t or not excitation:
+        return None
+    try:
+        difference = bc_difference(energy_s, energy_t)
+    except ArithmeticError:
+        return None
+    return excitation, energy_s, energy_t, difference
+
+def log_pairs(directories):
+    """(folder, molecule, singlet log, triplet log) for every `*_S` directory directly in `directories`.
+
+    Logs compacted into an evaluation archive are included; a singlet log without its
+    triplet counterpart is left out, as in data_collector_I.sh.
+    """
+    pairs = []
+    for directory in directories:
+        names = [directory] if parse_state_dir(directory) else sorted(os.listdir(directory))
+        for name in names:
+            singlet_dir = name if name == directory else os.path.join(directory, name)
+            parsed = parse_state_dir(singlet_dir)
+            if parsed is None or parsed[1] != 'S' or not os.path.isdir(singlet_dir):
+                continue
+            folder = os.path.basename(singlet_dir.rstrip(os.sep))
+            triplet_dir = singlet_dir.rstrip(os.sep)[:-len("_S")] + "_T"
+            if not os.path.isdir(triplet_dir):
+                print(f"Corresponding directory {triplet_dir} does not exist.")
+                continue
+            suffix = f"_{folder}.log"
+            for filename in list_logs(singlet_dir):
+                if not filename.endswith(suffix):
+                    continue
+                molecule = filename[:-len(suffix)]
+                triplet_log = os.path.join(triplet_dir, f"{molecule}_{os.path.basename(triplet_dir)}.log")
+                if log_exists(triplet_log):
+                    pairs.append((folder, molecule, os.path.join(singlet_dir, filename), triplet_log))
+    return pairs
+
+def collect_tree(directories, workers=None, chunksize=32):
+    """Read every singlet/triplet pair below `directories` once; returns collector entries in tree order.
+
+    Each entry is a dict with folder, molecule, name (the singlet log name without .log) and
+    the excitation, energy_s, energy_t and difference text of data_collector_I.sh.
+    """
+    pairs = log_pairs(directories)
+    work = [(singlet_log, triplet_log) for _, _, singlet_log, triplet_log in pairs]
+    if workers == 1 or len(work) < 2:
+        results = [collect_pair(item) for item in work]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(collect_pair, work, chunksize=chunksize))
+
+    entries = []
+    for (folder, molecule, singlet_log, _), fields in zip(pairs, results):
+        if fields is None:
+            continue
+        excitation, energy_s, energy_t, difference = fields
+        entries.append({"folder": folder, "molecule": molecule, "name": os.path.basename(singlet_log)[:-len(".log")],
+                        "excitation": excitation, "energy_s": energy_s, "energy_t": energy_t, "difference": difference})
+    return entries
+
+def read_collected(filename):
+    """Entries of an existing final_energies_and_differences.txt."""
+    entries = []
+    with open(filename) as f:
+        for line in f:
+            match = collected_pattern.match(line.rstrip("\n"))
+            if not match:
+                continue
+            entry = match.groupdict()
+            tokens = entry["name"].split("_")
+            for i in range(1, len(tokens)):
+                folder = "_".join(tokens[i:])
+                parsed = parse_state_dir(folder)
+                if parsed is not None and parsed[1] == 'S':
+                    entry.update(molecule="_".join(tokens[:i]), folder=folder)
+                    break
+            else:
+                continue
+            entries.append(entry)
+    return entries
+
+def write_collected(entries, filename=COLLECTED_FILE):
+    with open(filename, "w") as f:
+        for entry in entries:
+            f.write(f"{entry['name']}: Excitation Energy = {entry['excitation']}, Energy_A_S = {entry['energy_s']}, "
+                    f"Energy_A_T = {entry['energy_t']}, Difference x -27.2114 = {entry['difference']}\n")
+
+def arrange(entries, molecules=MOLECULE_ORDER):
+    """{folder: [(molecule, S1, T1, S1-T1 text)]}, folders sorted and molecules in the given order.
+
+    S1 is the excitation and T1 the difference of the collector; molecules not in
+    `molecules` are dropped, as in data_arranger_II.sh.
+    """
+    by_folder = {}
+    for entry in entries:
+        by_folder.setdefault(entry["folder"], {}).setdefault(entry["molecule"], []).append(entry)
+    arranged = {}
+    for folder in sorted(by_folder):
+        arranged[folder] = [(molecule, entry["excitation"], entry["difference"],
+                             bc_subtract(entry["excitation"], entry["difference"]))
+                            for molecule in molecules for entry in by_folder[folder].get(molecule, [])]
+    return arranged
+
+def write_arranged(arranged, filename=ARRANGED_FILE):
+    with open(filename, "w") as f:
+        for folder, rows in arranged.items():
+            f.write(f"Processing folder: {folder}\n")
+            for row in rows:
+                f.write(", ".join(row) + "\n")
+            f.write("\n")
+
+def write_table(arranged, filename):
+    """The arranged rows as an extract_log_data-style CSV (molecule, parameters, S1, T1, S1-T1),
+    in the same order; scoring.py and compare_results.py read it as is."""
+    rows = []
+    for folder, molecule_rows in arranged.items():
+        params = parse_state_dir(folder)[0]
+        for molecule, s1, t1, gap in molecule_rows:
+            rows.append({"molecule": molecule, **params, "S1": float(s1), "T1": float(t1), "S1-T1": float(gap)})
+    fieldnames = ["molecule"]
+    for row in rows:
+        fieldnames.extend(key for key in row if key not in fieldnames)
+    with open(filename, "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=fieldnames)
+        writer.writeheader()
+        writer.writerows(rows)
+    return len(rows)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Collect S1/T1 from the *_S/*_T directories in one pass "
+                                                 "(data_collector_I.sh and data_arranger_II.sh in one).")
+    sub = parser.add_subparsers(dest="command", required=True)
+    for name, help_text in (("collect", f"write {COLLECTED_FILE} from the log tree"),
+                            ("arrange", f"sort an existing {COLLECTED_FILE} by folder and molecule"),
+                            ("all", "collect and arrange in one pass")):
+        command = sub.add_parser(name, help=help_text)
+        if name != "arrange":
+            command.add_argument("dirs", nargs="*", default=["."], help="directories holding the *_S/*_T directories")
+            command.add_argument("-j", "--workers", type=int, default=None, help="worker processes (1: no pool)")
+        command.add_argument("--collected", default=COLLECTED_FILE)
+        if name != "collect":
+            command.add_argument("--arranged", default=ARRANGED_FILE)
+            command.add_argument("--molecules", nargs="+", default=MOLECULE_ORDER, help="molecules in output order")
+            command.add_argument("--csv", help="also write the arranged rows as a CSV table")
+    args = parser.parse_args()
+
+    if args.command == "arrange":
+        entries = read_collected(args.collected)
+    else:
+        entries = collect_tree(args.dirs, args.workers)
+        write_collected(entries, args.collected)
+        print(f"Final energies and differences have been saved to {args.collected}.")
+    if args.command != "collect":
+        arranged = arrange(entries, args.molecules)
+        write_arranged(arranged, args.arranged)
+        print(f"Data has been processed and saved to {args.arranged}.")
+        if args.csv:
+            print(f"{write_table(arranged, args.csv)} row(s) saved to {args.csv}.")
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+
+import math
+import argparse
+import statistics
+
+import numpy as np
+from hyperopt import hp
+
+from async_optimizer import AsyncTPE
+from gp_optimizer import AsyncGP, space_bounds
+
+space = {
+    'a1': hp.uniform('a1', 0.45, 0.55),
+    'b1': hp.uniform('b1', -0.28, -0.18),
+    'a2': hp.uniform('a2', 0.60, 0.75),
+    'b2': hp.uniform('b2', -0.12, -0.08)
+}
+
+OPTIMIZERS = {
+    'tpe': lambda seed: AsyncTPE(space, lie='mean', seed=seed),
+    'gp': lambda seed: AsyncGP(space, lie='mean', seed=seed),
+}
+
+def synthetic_rmse(params):
+    """Smooth stand-in for the RMSE surface: a tilted, correlated bowl with its minimum of 0.05
+    inside the box, rejected (inf) in one corner like combinations with positive S1-T1 gaps."""
+    bounds = space_bounds(space)
+    x = {name: (params[name] - low) / (high - low) for name, (_, low, high, _) in bounds.items()}
+    if x['a1'] < 0.1 and x['b2'] > 0.9:
+        return float('inf')
+    u = x['a1'] - 0.62 + 0.3 * (x['a2'] - 0.35)
+    v = x['b1'] - 0.40
+    return 0.05 + math.sqrt(1.5 * u ** 2 + v ** 2 + 0.4 * (x['a2'] - 0.35) ** 2 + 0.2 * (x['b2'] - 0.55) ** 2)
+
+def store_objective(filename):
+    """Replay a results store: every proposal gets the RMSE of the nearest stored combination."""
+    from results_store import ResultsStore
+    rows = [row for row in ResultsStore(filename).query() if all(name in row for name in space)]
+    if not rows:
+        raise SystemExit(f"No combinations in {filename}")
+    bounds = space_bounds(space)
+    scale = np.array([high - low for _, low, high, _ in bounds.values()])
+    points = np.array([[row[name] for name in space] for row in rows]) / scale
+    losses = [row['rmse'] if row['rmse'] is not None else float('inf') for row in rows]
+
+    def objective(params):
+        point = np.array([params[name] for name in space]) / scale
+        return losses[int(np.argmin(((points - point) ** 2).sum(axis=1)))]
+    return objective
+
+def run(optimizer, objective, max_evals, n_parallel=1):
+    """Ask/tell in rounds of `n_parallel` and return the losses in the order they were told."""
+    losses = []
+    while len(losses) < max_evals:
+        batch = [optimizer.ask() for _ in range(min(n_parallel, max_evals - len(losses)))]
+        for tid, params in batch:
+            loss = objective(params)
+            optimizer.tell(tid, loss)
+            losses.append(loss)
+    return losses
+
+def evaluations_to_target(losses, target):
+    for i, loss in enumerate(losses, 1):
+        if loss <= target:
+            return i
+    return None
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare optimizer backends by evaluations needed to reach a target RMSE.")
+    parser.add_argument("--optimizers", nargs="+", choices=OPTIMIZERS, default=list(OPTIMIZERS))
+    parser.add_argument("--store", help="replay a results.db instead of the synthetic objective")
+    parser.add_argument("--target", type=float, default=0.1)
+    parser.add_argument("--max-evals", type=int, default=100)
+    parser.add_argument("--parallel", type=int, default=1, help="proposals per round, as in main.parallel_evals")
+    parser.add_argument("--seeds", type=int, default=5)
+    args = parser.parse_args()
+
+    objective = store_objective(args.store) if args.store else synthetic_rmse
+
+    print(f"Target RMSE {args.target}, {args.max_evals} evaluations, {args.parallel} in parallel, {args.seeds} seed(s)")
+    for name in args.optimizers:
+        counts, bests = [], []
+        for seed in range(args.seeds):
+            losses = run(OPTIMIZERS[name](seed), objective, args.max_evals, args.parallel)
+            counts.append(evaluations_to_target(losses, args.target))
+            bests.append(min(losses))
+        reached = [count for count in counts if count is not None]
+        median = statistics.median(reached) if reached else float('nan')
+        print(f"{name:>4s}: reached target in {len(reached)}/{args.seeds} run(s), "
+              f"median {median} evaluations, best RMSE {min(bests):.4f}")
+        print(f"      evaluations per seed: {counts}")
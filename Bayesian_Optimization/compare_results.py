@@ -114,23 +114,24 @@ def save_comparison_results_to_csv(comparison_data, filename='comparison_results
     else:
         print(f"No comparison data to save.")
 
-extracted_data = load_extracted_data_from_csv('extracted_data.csv')
+if __name__ == "__main__":
+    extracted_data = load_extracted_data_from_csv('extracted_data.csv')
 
-comparison_results, valid_differences = compare_with_reference(extracted_data, S1_ref, T1_ref)
+    comparison_results, valid_differences = compare_with_reference(extracted_data, S1_ref, T1_ref)
 
-save_comparison_results_to_csv(comparison_results, 'comparison_results.csv')
+    save_comparison_results_to_csv(comparison_results, 'comparison_results.csv')
 
-rmse, mae = calculate_rmse_mae(valid_differences)
+    rmse, mae = calculate_rmse_mae(valid_differences)
 
-if rmse is not None and mae is not None:
-    print(f"RMSE: {rmse}, MAE: {mae}")
-    save_summary_results(params={"a1": "N/A", "b1": "N/A", "a2": "N/A", "b2": "N/A"}, rmse=rmse, mae=mae, comparison_results=comparison_results)
-else:
-    print("RMSE and MAE calculation skipped due to invalid differences.")
+    if rmse is not None and mae is not None:
+        print(f"RMSE: {rmse}, MAE: {mae}")
+        save_summary_results(params={"a1": "N/A", "b1": "N/A", "a2": "N/A", "b2": "N/A"}, rmse=rmse, mae=mae, comparison_results=comparison_results)
+    else:
+        print("RMSE and MAE calculation skipped due to invalid differences.")
 
-for result in comparison_results:
-    print(f"Molecule: {result['molecule']}")
-    print(f"S1 Calculated: {result['S1_calculated']}, S1 Reference: {result['S1_reference']}, S1 Difference: {result['S1_diff']}")
-    print(f"T1 Calculated: {result['T1_calculated']}, T1 Reference: {result['T1_reference']}, T1 Difference: {result['T1_diff']}")
-    print(f"S1-T1 Difference: {result['S1_T1_diff']}\n")
+    for result in comparison_results:
+        print(f"Molecule: {result['molecule']}")
+        print(f"S1 Calculated: {result['S1_calculated']}, S1 Reference: {result['S1_reference']}, S1 Difference: {result['S1_diff']}")
+        print(f"T1 Calculated: {result['T1_calculated']}, T1 Reference: {result['T1_reference']}, T1 Difference: {result['T1_diff']}")
+        print(f"S1-T1 Difference: {result['S1_T1_diff']}\n")
 
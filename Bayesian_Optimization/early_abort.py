@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+
+import os
+import math
+
+from log_parser import parse_log, HARTREE_TO_EV
+
+_records = {}
+
+def finished_energies(log_file):
+    """Root energies of a completed log, or None; logs are only re-parsed when they change."""
+    try:
+        stat = os.stat(log_file)
+    except OSError:
+        return None
+    key = (stat.st_mtime, stat.st_size)
+    cached = _records.get(log_file)
+    if cached is None or cached[0] != key:
+        record = parse_log(log_file)
+        cached = (key, record["energies"] if record and record["completed"] else None)
+        _records[log_file] = cached
+    return cached[1]
+
+def energy_row(molecule, S, T):
+    """S1/T1/gap row from the singlet and triplet root energies of a molecule, or None if incomplete."""
+    if not S or not T or 1 not in S or 2 not in S or 1 not in T:
+        return None
+    S1 = (S[2] - S[1]) * HARTREE_TO_EV
+    T1 = (T[1] - S[1]) * HARTREE_TO_EV
+    return {"molecule": molecule, "S1": S1, "T1": T1, "S1-T1": S1 - T1}
+
+def partial_results(molecules, params, state_dirs, cache=None, template=None):
+    """S1/T1/gap rows for the molecules whose singlet and triplet results are both available.
+
+    `state_dirs` maps 'S'/'T' to the evaluation's directories. Cached energies are used when
+    a cache is given.
+    """
+    rows = []
+    for molecule in molecules:
+        energies = {}
+        for state, state_dir in state_dirs.items():
+            cached = cache.get(params, molecule, state, template) if cache is not None else None
+            energies[state] = cached or finished_energies(os.path.join(state_dir, f"{molecule}_{os.path.basename(state_dir)}.log"))
+        row = energy_row(molecule, energies.get('S'), energies.get('T'))
+        if row is not None:
+            rows.append(row)
+    return rows
+
+def doomed_reason(rows, n_molecules, S1_ref, T1_ref, best_rmse=float('inf'), reject_positive_gap=False):
+    """Return (reason, loss) if a partially finished combination can no longer be accepted or win.
+
+    `loss` is the RMSE lower bound, or inf when the combination is rejected outright; None
+    is returned while the combination is still viable.
+
+    The bound assumes every molecule that has not finished yet lands exactly on its
+    reference gap: RMSE >= sqrt(sum of squared gap errors so far / (valid so far + remaining)).
+    With `reject_positive_gap` one positive S1-T1 gap is enough to reject the combination.
+    """
+    squared = 0.0
+    valid = 0
+    for row in rows:
+        S1_ref_val, T1_ref_val = S1_ref.get(row["molecule"]), T1_ref.get(row["molecule"])
+        if S1_ref_val is None or T1_ref_val is None:
+            continue
+        if row["S1-T1"] >= 0:
+            if reject_positive_gap:
+                return f"positive S1-T1 gap for {row['molecule']}", float('inf')
+            continue
+        squared += (row["S1-T1"] - (S1_ref_val - T1_ref_val)) ** 2
+        valid += 1
+
+    remaining = n_molecules - len(rows)
+    if valid + remaining == 0:
+        return "no molecule with a negative S1-T1 gap left", float('inf')
+    lower_bound = math.sqrt(squared / (valid + remaining))
+    if lower_bound > best_rmse:
+        return f"RMSE lower bound {lower_bound:.4f} already above best {best_rmse:.4f}", lower_bound
+    return None
@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+
+import os
+import re
+import sys
+import json
+import sqlite3
+import hashlib
+
+from log_parser import list_logs
+
+# Keywords that carry the optimized parameters (or the spin state) and therefore do not
+# belong in the template fingerprint.
+PARAMETER_KEYWORDS = {"dft.alphac", "dft.betac", "tddft.mralp", "tddft.mrbet", "tddft.mrmu",
+                      "tddft.spcp(1)", "tddft.mult"}
+
+def params_key(params):
+    """Canonical text key for a parameter set: names sorted, values rounded to 2 decimals."""
+    return ",".join(f"{name}={round(float(value), 2) + 0.0}" for name, value in sorted(params.items()))
+
+def parse_params_key(key):
+    """Inverse of params_key: 'a1=0.5,b1=-0.2' -> {'a1': 0.5, 'b1': -0.2}."""
+    return {name: float(value) for name, value in (item.split("=") for item in key.split(","))}
+
+def parse_state_dir(dirname):
+    """Split 'a1_0.50_b1_-0.20_a2_0.65_b2_-0.10_S' into ({'a1': 0.5, ...}, 'S'), or None."""
+    match = re.match(r"^(?P<params>.+)_(?P<state>[ST])$", os.path.basename(dirname.rstrip(os.sep)))
+    if not match:
+        return None
+    tokens = match.group("params").split("_")
+    if len(tokens) % 2:
+        return None
+    try:
+        params = {tokens[i]: float(tokens[i + 1]) for i in range(0, len(tokens), 2)}
+    except ValueError:
+        return None
+    return params, match.group("state")
+
+def input_fingerprint(input_text):
+    """Hash the GAMESS settings of an input, ignoring $DATA, whitespace and the optimized keywords.
+
+    $GUESS/$VEC (orbital warm starts) only change how the SCF gets to its solution and are ignored too.
+
+    Inputs written by generate_and_submit_jobs.py and by the Grid_Search csh generators give
+    the same fingerprint as long as they request the same calculation.
+    """
+    settings = []
+    for group, body in re.findall(r"\$(\w+)(.*?)\$END", input_text, flags=re.S | re.I):
+        group = group.lower()
+        if group in ("data", "guess", "vec"):
+            continue
+        for key, value in re.findall(r"([\w()]+)\s*=\s*(\S+)", body):
+            setting = f"{group}.{key.lower()}"
+            if setting not in PARAMETER_KEYWORDS:
+                settings.append(f"{setting}={value.lower()}")
+    return hashlib.sha1(" ".join(sorted(settings)).encode()).hexdigest()[:16]
+
+# Parameters written as the three spcp(1) weights. The original opt_with_CSP_and_sigma generator
+# wrote spcp(1)={co},{co},{co}, so its ov and cv never reached GAMESS although they name its
+# directories; inputs that really carry co, ov and cv get a fingerprint of their own
+# (weighted_fingerprint), which keeps those older trees out.
+SPCP_WEIGHTS = ("co", "ov", "cv")
+
+def weighted_fingerprint(fingerprint):
+    """Fingerprint of the same settings with the spcp(1) weights taken from co, ov and cv."""
+    return hashlib.sha1(f"{fingerprint} spcp(1)=co,ov,cv".encode()).hexdigest()[:16]
+
+def spcp_weights(input_text):
+    """The three spcp(1) weights of an input as floats, or None if it does not set them."""
+    match = re.search(r"spcp\(1\)\s*=\s*([-+.\d]+),([-+.\d]+),([-+.\d]+)", input_text, flags=re.I)
+    return tuple(float(value) for value in match.groups()) if match else None
+
+class EvaluationCache:
+    """On-disk store of parsed root energies for every (parameters, molecule, state, template).
+
+    The energies are kept as {root: energy in Hartree}; for the singlet run roots 1 and 2
+    give S0 and S1, for the triplet run root 1 gives T1.
+    """
+
+    def __init__(self, filename="evaluation_cache.db"):
+        self.filename = filename
+        self.connection = sqlite3.connect(filename)
+        self.connection.execute("""
+            CREATE TABLE IF NOT EXISTS energies (
+                params TEXT NOT NULL,
+                molecule TEXT NOT NULL,
+                state TEXT NOT NULL,
+                template TEXT NOT NULL,
+                energies TEXT NOT NULL,
+                source TEXT,
+                PRIMARY KEY (params, molecule, state, template)
+            )""")
+        self.connection.commit()
+
+    def get(self, params, molecule, state, template):
+        row = self.connection.execute(
+            "SELECT energies FROM energies WHERE params=? AND molecule=? AND state=? AND template=?",
+            (params_key(params), molecule, state, template)).fetchone()
+        if row is None:
+            return None
+        return {int(root): energy for root, energy in json.loads(row[0]).items()}
+
+    def put(self, params, molecule, state, template, energies, source=None):
+        self.connection.execute(
+            "INSERT OR REPLACE INTO energies VALUES (?, ?, ?, ?, ?, ?)",
+            (params_key(params), molecule, state, template, json.dumps(energies), source))
+        self.connection.commit()
+
+    def entries(self, template=None):
+        """Every stored (params, molecule, state, energies), for one template only if given."""
+        sql = "SELECT params, molecule, state, energies FROM energies"
+        rows = self.connection.execute(sql + " WHERE template=?", (template,)) if template else self.connection.execute(sql)
+        for key, molecule, state, energies in rows:
+            yield (parse_params_key(key), molecule, state,
+                   {int(root): energy for root, energy in json.loads(energies).items()})
+
+    def missing_molecules(self, molecules, params, state, template):
+        return [molecule for molecule in molecules if self.get(params, molecule, state, template) is None]
+
+    def import_tree(self, root, parse_log):
+        """Add every finished log found under `*_S`/`*_T` directories below `root` (archived ones too).
+
+        `parse_log(log_file)` returns the {root: energy} dict for a log, or None if the run
+        did not finish. Returns the number of new entries.
+
+        Directories named after spcp(1) weights (co/ov/cv) are only taken if their inputs set those
+        weights, under weighted_fingerprint; the original CSP generator's co,co,co trees are skipped.
+        """
+        added = 0
+        for dirpath, dirnames, filenames in os.walk(root):
+            dirnames.sort()
+            parsed = parse_state_dir(dirpath)
+            if parsed is None:
+                continue
+            params, state = parsed
+            state_dir = os.path.basename(dirpath)
+            for filename in list_logs(dirpath):
+                suffix = f"_{state_dir}.log"
+                if not filename.endswith(suffix):
+                    continue
+                molecule = filename[:-len(suffix)]
+                log_file = os.path.join(dirpath, filename)
+                inp_file = log_file[:-len(".log")] + ".inp"
+                if not os.path.exists(inp_file):
+                    continue
+                with open(inp_file) as f:
+                    input_text = f.read()
+                template = input_fingerprint(input_text)
+                if any(name in params for name in SPCP_WEIGHTS):
+                    weights = spcp_weights(input_text)
+                    if weights is None or any(name in params and abs(params[name] - weight) > 1e-9
+                                              for name, weight in zip(SPCP_WEIGHTS, weights)):
+                        print(f"Skipping {dirpath}: the spcp(1) weights of its inputs are not its co/ov/cv")
+                        break
+                    template = weighted_fingerprint(template)
+                if self.get(params, molecule, state, template) is not None:
+                    continue
+                energies = parse_log(log_file)
+                if energies:
+                    self.put(params, molecule, state, template, energies, source=log_file)
+                    added += 1
+        return added
+
+if __name__ == "__main__":
+    # Usage: evaluation_cache.py <cache.db> <directory> [<directory> ...]
+    # e.g. evaluation_cache.py evaluation_cache.db . ../Grid_Search
+    from extract_log_data import parse_root_energies
+
+    cache = EvaluationCache(sys.argv[1])
+    for directory in sys.argv[2:]:
+        print(f"Imported {cache.import_tree(directory, parse_root_energies)} entries from {directory}")
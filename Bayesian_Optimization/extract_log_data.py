@@ -2,159 +2,153 @@
 
 
 import os
-import re
 import csv
-import subprocess
-from time import sleep
 import math
+from time import monotonic
+from job_tracker import JobTracker
+from log_parser import parse_log, HARTREE_TO_EV
+from generate_and_submit_jobs import state_dir_path
+from retry_engine import classify_failure
 
-def rerun_job(molecule, a1, b1, a2, b2, state):
-    state_dir = f'a1_{a1}_b1_{b1}_a2_{a2}_b2_{b2}_{state}'
-    inp_file = f"{molecule}_{state_dir}.inp"
+def wait_for_specific_jobs_to_finish(job_ids, tracker=None):
+    tracker = tracker if tracker is not None else JobTracker()
+    tracker.wait(list(job_ids))
 
-    current_dir = os.getcwd()
-    job_dir = os.path.join(current_dir, state_dir)
-
-    if not os.path.exists(job_dir):
-        print(f"Directory {job_dir} does not exist.")
-        return None
-
-    try:
-        os.chdir(job_dir)  
-        print(f"Rerunning job for {molecule} in directory {job_dir}...")
-        job_submission_command = f"gms_sbatch -p r630 -c 30 -i {inp_file}"
-        job_id = subprocess.check_output(job_submission_command, shell=True).strip().decode()
-        print(f"Job resubmitted with ID: {job_id}")
-        wait_for_specific_jobs_to_finish([job_id])
-        os.chdir(current_dir)  
-        return job_id
-    except subprocess.CalledProcessError as e:
-        print(f"Failed to resubmit job for {molecule}. Command output: {e.output.decode()}")
-        os.chdir(current_dir)  
-        return None
-    except Exception as e:
-        print(f"An error occurred while rerunning the job for {molecule}: {e}")
-        os.chdir(current_dir)  
-        return None
-
-def wait_for_specific_jobs_to_finish(job_ids):
-    while job_ids:
-        for job_id in list(job_ids):  
-            print(f"Waiting for job {job_id} to complete...")
-            try:
-                job_status_command = f"squeue -j {job_id}"
-                result = subprocess.run(job_status_command, shell=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-                if job_id not in result.stdout.decode():
-                    print(f"Job {job_id} has completed.")
-                    job_ids.remove(job_id)  
-                else:
-                    print(f"Job {job_id} is still running. Waiting...")
-            except Exception as e:
-                print(f"Error checking status for job {job_id}: {e}")
-        sleep(30)  
-
-def ensure_job_completion(job_ids):
+def ensure_job_completion(job_ids, tracker=None):
     print("Ensuring all jobs are finished before data extraction...")
-    wait_for_specific_jobs_to_finish(job_ids)
+    wait_for_specific_jobs_to_finish(job_ids, tracker)
     print("All jobs have completed.")
 
 def check_job_completion(log_file):
     """Check for job completion by searching for specific phrases in the log."""
-    if os.path.exists(log_file):
-        with open(log_file, 'r') as log:
-            content = log.read()
-            if "CPU timing information for all processes" in content or "ddikick.x: exited gracefully." in content:
-                return True
-    return False
-
-def extract_log_data(molecules, a1, b1, a2, b2, job_ids):
-    ensure_job_completion(job_ids)
+    record = parse_log(log_file)
+    return record is not None and record["completed"]
 
-    singlet_dir = f'a1_{a1}_b1_{b1}_a2_{a2}_b2_{b2}_S'
-    triplet_dir = f'a1_{a1}_b1_{b1}_a2_{a2}_b2_{b2}_T'
+def parse_root_energies(log_file):
+    """Return {root: energy in Hartree} for every state of a finished log, or None."""
+    record = parse_log(log_file)
+    if record is None or not record["completed"]:
+        return None
+    return record["energies"] or None
+
+def cache_finished_log(cache, params, molecule, state, template, log_file, metrics=None, job_id=None, info=None,
+                       fidelity=None):
+    """Parse one log as soon as its job has left the queue and store its energies in the cache.
+
+    Returns the energies, or None if the run did not finish (retry_engine.RetryEngine requeues it).
+    With a metrics.MetricsStore, the job's timings (tracker `info`, log timing section, parse
+    time) are recorded as well, finished or not.
+    """
+    start = monotonic()
+    record = parse_log(log_file)
+    if metrics is not None:
+        metrics.record_job(job_id, info or {}, record, monotonic() - start, params, fidelity)
+    if record is None or not record["completed"] or not record["energies"]:
+        print(f"[STREAM] {log_file} did not finish; leaving it for extraction.")
+        return None
+    cache.put(params, molecule, state, template, record["energies"], source=log_file)
+    print(f"[STREAM] Cached {state} energies of {molecule} from {log_file}")
+    return record["energies"]
+
+def extract_log_data(molecules, a1, b1, a2, b2, job_ids, cache=None, template=None, workers=1, fidelity='full',
+                     tracker=None, extra=None):
+    # Nothing is resubmitted here: failed runs are requeued by retry_engine.RetryEngine while their
+    # jobs are tracked, so a molecule whose log is missing, unfinished or failed is reported
+    # (with its failure class) and left out of the returned data.
+    # With a cache (evaluation_cache.EvaluationCache) and the input template fingerprint, stored
+    # energies are used instead of the logs and newly parsed energies are added to the cache.
+    # workers > 1 parses all logs of the evaluation up front on a process pool.
+    # `extra` holds the optimized EXTRA_PARAMETERS (co, ov, cv, mu) of the evaluation, if any.
+    ensure_job_completion(job_ids, tracker)
+
+    extra = extra or {}
+    singlet_dir = state_dir_path(a1, b1, a2, b2, 'S', fidelity, extra)
+    triplet_dir = state_dir_path(a1, b1, a2, b2, 'T', fidelity, extra)
+    params = {'a1': a1, 'b1': b1, 'a2': a2, 'b2': b2, **extra}
+
+    prefetched = {}
+    if workers != 1:
+        from parallel_extract import parse_logs_parallel
+        log_files = [os.path.join(state_dir, f"{molecule}_{os.path.basename(state_dir)}.log")
+                     for molecule in molecules for state_dir in (singlet_dir, triplet_dir)]
+        prefetched = dict(zip(log_files, parse_logs_parallel(log_files, workers=workers)))
 
     data = []
-
-    s0_pattern = re.compile(r"1\s+A\s+([-+]?\d*\.\d+|\d+)")  # Ground state energy
-    s1_pattern = re.compile(r"2\s+A\s+([-+]?\d*\.\d+|\d+)")  # Singlet state energy
-    t1_pattern = re.compile(r"1\s+A\s+([-+]?\d*\.\d+|\d+)")  # Triplet state energy
+    failed = []
 
     for molecule in molecules:
-        singlet_log = os.path.join(singlet_dir, f"{molecule}_{singlet_dir}.log")
-        triplet_log = os.path.join(triplet_dir, f"{molecule}_{triplet_dir}.log")
+        singlet_log = os.path.join(singlet_dir, f"{molecule}_{os.path.basename(singlet_dir)}.log")
+        triplet_log = os.path.join(triplet_dir, f"{molecule}_{os.path.basename(triplet_dir)}.log")
 
         print(f"\nProcessing molecule: {molecule}")
         print(f"Singlet log path: {singlet_log}")
         print(f"Triplet log path: {triplet_log}")
 
-        retry_count = 0
-        while retry_count < 2:  
-            try:
-                if not check_job_completion(singlet_log):
-                    raise ValueError(f"Singlet job for {molecule} is not completed yet.")
-                if not check_job_completion(triplet_log):
-                    raise ValueError(f"Triplet job for {molecule} is not completed yet.")
-
-                if os.path.exists(singlet_log):
-                    with open(singlet_log, 'r') as file_s:
-                        content_s = file_s.read()
-                        print(f"[DEBUG] Content of singlet log (first 500 chars): {content_s[:500]}")
-                        s0_match = s0_pattern.search(content_s)  # Ground state energy
-                        s1_match = s1_pattern.search(content_s)  # Singlet state energy
-                        if s0_match and s1_match:
-                            s0 = float(s0_match.group(1))  # Extract s0
-                            s1 = float(s1_match.group(1))  # Extract s1
-                            print(f"[DEBUG] {molecule} Singlet file: s0 = {s0}, s1 = {s1}")
-                        else:
-                            raise ValueError(f"Failed to extract s0 or s1 data from {singlet_log}.")
-                else:
-                    raise FileNotFoundError(f"Log file not found: {singlet_log}")
-
-                if os.path.exists(triplet_log):
-                    with open(triplet_log, 'r') as file_t:
-                        content_t = file_t.read()
-                        print(f"[DEBUG] Content of triplet log (first 500 chars): {content_t[:500]}")
-                        t1_match = t1_pattern.search(content_t)  # Triplet state energy
-                        if t1_match:
-                            t1 = float(t1_match.group(1))  # Extract t1
-                            print(f"[DEBUG] {molecule} Triplet file: t1 = {t1}")
-                        else:
-                            raise ValueError(f"Failed to extract t1 data from {triplet_log}.")
-                else:
-                    raise FileNotFoundError(f"Log file not found: {triplet_log}")
-
-                # Calculate S1, T1, and S1-T1 difference
-                S1 = (s1 - s0) * 27.2114  # Convert from Hartree to eV
-                T1 = (t1 - s0) * 27.2114  # Convert from Hartree to eV
-                s1_t1_gap = S1 - T1
-
-                print(f"[DEBUG] Calculated S1: {S1}, T1: {T1}, S1-T1: {s1_t1_gap}")
-
-                # Append data for this molecule
-                data.append({
-                    "molecule": molecule,
-                    "a1": a1,
-                    "b1": b1,
-                    "a2": a2,
-                    "b2": b2,
-                    "S1": S1,
-                    "T1": T1,
-                    "S1-T1": s1_t1_gap
-                })
-                break  # If successful, stop retrying
-
-            except (ValueError, FileNotFoundError) as e:
-                print(f"[ERROR] {e}")
-                retry_count += 1
-                if retry_count < 2:
-                    print(f"Retrying job for {molecule}...")
-                    if "singlet" in str(e).lower():
-                        rerun_job(molecule, a1, b1, a2, b2, state='S')  # Resubmit singlet job
-                    elif "triplet" in str(e).lower():
-                        rerun_job(molecule, a1, b1, a2, b2, state='T')  # Resubmit triplet job
-                else:
-                    print(f"Skipping molecule {molecule} after failed retries.")
-                    continue
+        cached_s = cache.get(params, molecule, 'S', template) if cache is not None else None
+        cached_t = cache.get(params, molecule, 'T', template) if cache is not None else None
+        if cached_s is not None and 2 not in cached_s:
+            cached_s = None
+
+        try:
+            if cached_s is not None:
+                s0, s1 = cached_s[1], cached_s[2]
+                print(f"[CACHE] {molecule} Singlet energies: s0 = {s0}, s1 = {s1}")
+            else:
+                record_s = prefetched.pop(singlet_log, None) or parse_log(singlet_log)
+                if record_s is None or not record_s["completed"] or 1 not in record_s["energies"] \
+                        or 2 not in record_s["energies"]:
+                    failed.append((molecule, 'S', classify_failure(singlet_log) or "unknown"))
+                    raise ValueError(f"No s0/s1 data for {molecule} in {singlet_log} ({failed[-1][2]}).")
+                s0 = record_s["energies"][1]  # Ground state energy
+                s1 = record_s["energies"][2]  # Singlet state energy
+                print(f"[DEBUG] {molecule} Singlet file: s0 = {s0}, s1 = {s1}, "
+                      f"SCF iterations = {record_s['scf_iterations']}")
+
+            if cached_t is not None:
+                t1 = cached_t[1]
+                print(f"[CACHE] {molecule} Triplet energy: t1 = {t1}")
+            else:
+                record_t = prefetched.pop(triplet_log, None) or parse_log(triplet_log)
+                if record_t is None or not record_t["completed"] or 1 not in record_t["energies"]:
+                    failed.append((molecule, 'T', classify_failure(triplet_log) or "unknown"))
+                    raise ValueError(f"No t1 data for {molecule} in {triplet_log} ({failed[-1][2]}).")
+                t1 = record_t["energies"][1]  # Triplet state energy
+                print(f"[DEBUG] {molecule} Triplet file: t1 = {t1}, "
+                      f"SCF iterations = {record_t['scf_iterations']}")
+
+        except ValueError as e:
+            print(f"[ERROR] {e} Skipping molecule {molecule}.")
+            continue
+
+        # Calculate S1, T1, and S1-T1 difference
+        S1 = (s1 - s0) * HARTREE_TO_EV  # Convert from Hartree to eV
+        T1 = (t1 - s0) * HARTREE_TO_EV  # Convert from Hartree to eV
+        s1_t1_gap = S1 - T1
+
+        print(f"[DEBUG] Calculated S1: {S1}, T1: {T1}, S1-T1: {s1_t1_gap}")
+
+        if cache is not None:
+            if cached_s is None:
+                cache.put(params, molecule, 'S', template, record_s["energies"], source=singlet_log)
+            if cached_t is None:
+                cache.put(params, molecule, 'T', template, record_t["energies"], source=triplet_log)
+
+        # Append data for this molecule
+        data.append({
+            "molecule": molecule,
+            "a1": a1,
+            "b1": b1,
+            "a2": a2,
+            "b2": b2,
+            **extra,
+            "S1": S1,
+            "T1": T1,
+            "S1-T1": s1_t1_gap
+        })
+
+    if failed:
+        print(f"[WARNING] {len(failed)} run(s) missing or failed: " +
+              ", ".join(f"{molecule} {state} ({failure})" for molecule, state, failure in failed))
 
     return data
 
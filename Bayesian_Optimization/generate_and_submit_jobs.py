@@ -2,104 +2,222 @@
 
 import os
 import subprocess
-from time import sleep
-
-def frange(start, stop, step):
-    while start < stop:
-        yield round(start, 2)
-        start += step
-
-def generate_input_files_and_submit(molecules, a1, b1, a2, b2, state, geom_file="geometries.txt", max_jobs=10):
-    state_dir = f'a1_{a1}_b1_{b1}_a2_{a2}_b2_{b2}_{state}'
-
-    if not os.path.exists(state_dir):
-        os.makedirs(state_dir)
-
-    mult_tddft = '1' if state == 'S' else '3'
-
-    job_ids = []  
-    job_count = 0
-
-    for molecule in molecules:
-        inp_file = os.path.join(state_dir, f"{molecule}_{state_dir}.inp")
-        print(f"Generating input file: {inp_file}")
-
-        try:
-            command = f'./gen_geo.sh {molecule} {geom_file}'
-            geom_data = subprocess.check_output(command, shell=True).decode()
-
-            with open(inp_file, 'w') as f:
-                f.write(f""" $CONTRL SCFTYP=ROHF RUNTYP=energy DFTTYP=camb3lyp ICHARG=0
+from time import monotonic
+from job_tracker import JobTracker, JobPool, SlurmScheduler
+from evaluation_cache import input_fingerprint, weighted_fingerprint, params_key, SPCP_WEIGHTS
+from geometry import render_geometry
+from job_array import submit_array
+from orbital_cache import guess_groups
+
+INPUT_HEADER = """ $CONTRL SCFTYP=ROHF RUNTYP=energy DFTTYP=camb3lyp ICHARG=0
  TDDFT=MRSF MAXIT=200 MULT=3 ISPHER=0 UNITS=BOHR $END
- $TDDFT NSTATE=3 IROOT=1 MULT={mult_tddft} mralp={a2} mrbet={b2} $END
- $TDDFT spcp(1)=0.5,0.5,0.5 $END
+ $TDDFT NSTATE={nstate} IROOT=1 MULT={mult_tddft} mralp={a2} mrbet={b2} $END
+ $TDDFT spcp(1)={co},{ov},{cv}{mrmu} $END
  $DFT alphac={a1} betac={b1} $END
  $SCF DIRSCF=.t. diis=.f. damp=.t.
   soscf=.f. shift=.t. FDIFF=.t. $END
- $BASIS GBASIS=N31 NGAUSS=6 NDFUNC=1 $END
+ $BASIS {basis} $END
  $SYSTEM TIMLIM=999999100 MWORDS=500 kdiag=1 $END
  $DATA
  {molecule}
  C1
-""")
-                f.write(geom_data)
-                f.write(" $END\n")
-            print(f"Successfully generated {inp_file}")
-
-        except subprocess.CalledProcessError as e:
-            print(f"Error running gen_geo.sh for {molecule}: {e}")
-            print(f"Command output: {e.output.decode()}")
-            continue
-
-        except Exception as ex:
-            print(f"Unexpected error: {ex}")
-            continue
-
-        try:
-            print(f"Submitting job for {molecule}...")
-            job_submission_command = f"gms_sbatch -p r630 -c 30 -i {molecule}_{state_dir}.inp"
-            current_dir = os.getcwd()
-            os.chdir(state_dir)  
-            job_id = subprocess.check_output(job_submission_command, shell=True).strip().decode()
-            os.chdir(current_dir)  
-
-            job_ids.append(job_id)  
-            print(f"Job submitted with ID: {job_id}")
-            job_count += 1
-
-            if job_count >= max_jobs:
-                print(f"Reached max job limit of {max_jobs}. Waiting for jobs to complete...")
-                wait_for_all_jobs_to_complete(job_ids)
-                job_count = 0
-                job_ids = []  #
-
-        except subprocess.CalledProcessError as e:
-            print(f"Error submitting job for {molecule}: {e}")
-            print(f"Command output: {e.output.decode()}")
-            os.chdir(current_dir)
-
-    if job_ids:
-        print(f"Waiting for remaining jobs to complete...")
-        wait_for_all_jobs_to_complete(job_ids)
+"""
+
+# Settings that change with the fidelity of an evaluation, cheapest first. 'full' is the
+# production setup; 'screen' drops the d functions and computes one singlet root less
+# (roots 1 and 2 still give S0 and S1).
+FIDELITIES = {
+    'screen': {'basis': "GBASIS=N31 NGAUSS=6 NDFUNC=0", 'nstate': 2},
+    'full': {'basis': "GBASIS=N31 NGAUSS=6 NDFUNC=1", 'nstate': 3},
+}
+
+# Parameters that can be optimized on top of a1/b1/a2/b2 (opt_with_CSP_and_sigma), with the values
+# runs that do not optimize them use: the spcp(1) weights co, ov, cv (written as 0.5,0.5,0.5) and the
+# MRSF range separation mrmu, which is then left out of the input (0.33, the CAM-B3LYP value, is assumed).
+# The three weights are written as spcp(1)=co,ov,cv. The original opt_with_CSP_and_sigma generator wrote
+# spcp(1)=co,co,co, so ov and cv never reached GAMESS there: its results describe a different (one-weight)
+# functional and are kept out of the caches and the warm start by template_fingerprint.
+EXTRA_PARAMETERS = {'co': 0.5, 'ov': 0.5, 'cv': 0.5, 'mu': 0.33}
+
+# Slurm partition and cores of every GAMESS run.
+PARTITION = "r630"
+CPUS = 30
+
+def extra_keywords(extra=None):
+    """Template fields of the EXTRA_PARAMETERS in `extra` ({name: value}); the others keep their defaults."""
+    extra = extra or {}
+    fields = {name: extra.get(name, EXTRA_PARAMETERS[name]) for name in ('co', 'ov', 'cv')}
+    fields['mrmu'] = f" mrmu={extra['mu']}" if 'mu' in extra else ""
+    return fields
+
+def render_input(molecule, a1, b1, a2, b2, state, geom_file="geometries.txt", fidelity='full', vec=None, extra=None):
+    """Complete GAMESS input text for one molecule and state, built in memory.
+
+    With `vec` (a $VEC body from orbital_cache) the SCF starts from those orbitals (GUESS=MOREAD).
+    `extra` sets any of the EXTRA_PARAMETERS.
+    """
+    mult_tddft = '1' if state == 'S' else '3'
+    header = INPUT_HEADER.format(molecule=molecule, mult_tddft=mult_tddft, a1=a1, b1=b1, a2=a2, b2=b2,
+                                 **extra_keywords(extra), **FIDELITIES[fidelity])
+    if vec is None:
+        return header + render_geometry(molecule, geom_file) + " $END\n"
+    guess, vec_group = guess_groups(vec)
+    header = header.replace(" $DATA\n", guess + " $DATA\n", 1)
+    return header + render_geometry(molecule, geom_file) + " $END\n" + vec_group
+
+def template_fingerprint(fidelity='full', extra=None):
+    """Fingerprint of the inputs of one fidelity; optimizing any spcp(1) weight in `extra` gives its own."""
+    fingerprint = input_fingerprint(INPUT_HEADER.format(molecule="", mult_tddft=1, a1=0, b1=0, a2=0, b2=0,
+                                                        **extra_keywords(), **FIDELITIES[fidelity]))
+    if extra and any(name in extra for name in SPCP_WEIGHTS):
+        return weighted_fingerprint(fingerprint)
+    return fingerprint
+
+def state_dir_path(a1, b1, a2, b2, state, fidelity='full', extra=None):
+    """Directory of one evaluation; lower fidelities get a parent directory of their own.
+
+    Optimized EXTRA_PARAMETERS are appended to the name: a1_*_b1_*_a2_*_b2_*_co_*_ov_*_cv_*_mu_*_S.
+    """
+    extra = extra or {}
+    state_dir = f'a1_{a1}_b1_{b1}_a2_{a2}_b2_{b2}' + "".join(f"_{name}_{extra[name]}" for name in EXTRA_PARAMETERS
+                                                            if name in extra) + f'_{state}'
+    return state_dir if fidelity == 'full' else os.path.join(fidelity, state_dir)
+
+def frange(start, stop, step):
+    while start < stop:
+        yield round(start, 2)
+        start += step
+
+def write_input_file(molecule, a1, b1, a2, b2, state, geom_file="geometries.txt", fidelity='full', orbitals=None,
+                     extra=None):
+    """Write the input of one molecule and state; return its path, or None if it cannot be built.
+
+    Given an orbital_cache.OrbitalCache, the input starts from the orbitals of the nearest finished run.
+    """
+    job_dir = state_dir_path(a1, b1, a2, b2, state, fidelity, extra)
+    os.makedirs(job_dir, exist_ok=True)
+    inp_file = os.path.join(job_dir, f"{molecule}_{os.path.basename(job_dir)}.inp")
+    print(f"Generating input file: {inp_file}")
+
+    try:
+        vec = None
+        if orbitals is not None:
+            nearest = orbitals.nearest(molecule, template_fingerprint(fidelity), {'a1': a1, 'b1': b1})
+            if nearest is not None:
+                print(f"Starting {molecule} from the orbitals of {params_key(nearest[0])}")
+                vec = nearest[1]
+        input_text = render_input(molecule, a1, b1, a2, b2, state, geom_file, fidelity, vec, extra)
+
+        with open(inp_file, 'w') as f:
+            f.write(input_text)
+        print(f"Successfully generated {inp_file}")
+        return inp_file
+
+    except KeyError as e:
+        print(f"Error building geometry for {molecule}: {e}")
+
+    except Exception as ex:
+        print(f"Unexpected error: {ex}")
+
+    return None
+
+def submit_input_file(inp_file, scheduler=None, partition=None):
+    """Submit one input through `scheduler` (gms_sbatch from its own directory by default) to
+    `partition` (a comma-separated list; PARTITION by default); return the job id, or None on failure."""
+    scheduler = scheduler if scheduler is not None else SlurmScheduler()
+    inp_name = os.path.basename(inp_file)
+    try:
+        print(f"Submitting job for {inp_name}...")
+        job_id = scheduler.submit_input(inp_file, partition or PARTITION, CPUS)
+        print(f"Job submitted with ID: {job_id}")
+        return job_id
+
+    except subprocess.CalledProcessError as e:
+        print(f"Error submitting job for {inp_name}: {e}")
+        print(f"Command output: {e.output.decode()}")
+        return None
+
+    except OSError as e:
+        print(f"Error submitting job for {inp_name}: {e}")
+        return None
+
+def submit_inputs_as_array(inputs, tracker=None, callback=None, scheduler=None, max_running=None, job_name=None,
+                           partition=None, gamess_command=None):
+    """Submit [(molecule, state, inp_file)] as one Slurm job array instead of one gms_sbatch call each.
+
+    Every array task is tracked on `tracker` like a separate job, with the same info as in
+    generate_input_files_and_submit. The tasks run `gamess_command` (job_array.GAMESS_COMMAND
+    by default). Returns the task ids in input order.
+    """
+    partition = partition or PARTITION
+    start = monotonic()
+    try:
+        task_ids = submit_array([inp_file for _, _, inp_file in inputs], job_name, partition=partition, cpus=CPUS,
+                                max_running=max_running, scheduler=scheduler, gamess_command=gamess_command)
+    except subprocess.CalledProcessError as e:
+        print(f"Error submitting job array {job_name}: {e}")
+        print(f"Command output: {e.output.decode()}")
+        return []
+
+    if tracker is not None:
+        submit_seconds = (monotonic() - start) / max(len(task_ids), 1)
+        for task_id, (molecule, state, inp_file) in zip(task_ids, inputs):
+            tracker.track(task_id, callback, molecule=molecule, spin_state=state, inp_file=inp_file,
+                          partition=partition, submit_seconds=submit_seconds)
+    return task_ids
+
+def generate_input_files_and_submit(molecules, a1, b1, a2, b2, state, geom_file="geometries.txt", max_jobs=10, wait=True,
+                                    fidelity='full', pool=None, tracker=None, callback=None, orbitals=None, extra=None,
+                                    partition=None):
+    # With wait=False every job is submitted at once and the caller is responsible for tracking the ids;
+    # given a tracker, the jobs are tracked on it with `callback(job_id, info)` (info has molecule,
+    # spin_state, inp_file, partition and submit_seconds) so each one can be processed the moment it finishes.
+    # With wait=True at most max_jobs run at a time and a new job goes in as soon as any finishes.
+    # Given a job_tracker.JobPool, the jobs are only queued on it and the caller runs the pool.
+    # Given an orbital_cache.OrbitalCache, every input starts from the nearest stored orbitals.
+    # Jobs are submitted through the scheduler of the tracker (or pool) in use.
+    # `extra` sets any of the EXTRA_PARAMETERS (co, ov, cv, mu) on top of a1/b1/a2/b2.
+    # Jobs go to `partition` (comma-separated), PARTITION by default.
+    partition = partition or PARTITION
+    inputs = [(molecule, write_input_file(molecule, a1, b1, a2, b2, state, geom_file, fidelity, orbitals, extra))
+              for molecule in molecules]
+    inputs = [(molecule, inp_file) for molecule, inp_file in inputs if inp_file is not None]
+
+    if pool is not None:
+        scheduler = pool.tracker.scheduler
+        for molecule, inp_file in inputs:
+            pool.add(lambda inp_file=inp_file: submit_input_file(inp_file, scheduler, partition), callback,
+                     molecule=molecule, spin_state=state, inp_file=inp_file, partition=partition)
+        return []
+
+    if not wait:
+        job_ids = []
+        scheduler = tracker.scheduler if tracker is not None else None
+        for molecule, inp_file in inputs:
+            start = monotonic()
+            job_id = submit_input_file(inp_file, scheduler, partition)
+            if job_id is None:
+                continue
+            if tracker is not None:
+                tracker.track(job_id, callback, molecule=molecule, spin_state=state, inp_file=inp_file,
+                              partition=partition, submit_seconds=monotonic() - start)
+            job_ids.append(job_id)
+        print(f"All jobs submitted.")
+        return job_ids
+
+    pool = JobPool(max_jobs, tracker)
+    for molecule, inp_file in inputs:
+        pool.add(lambda inp_file=inp_file: submit_input_file(inp_file, pool.tracker.scheduler, partition), callback,
+                 molecule=molecule, spin_state=state, inp_file=inp_file, partition=partition)
+    job_ids = pool.run()
 
     print(f"All jobs submitted and completed.")
-    return job_ids  
-
-def wait_for_all_jobs_to_complete(job_ids):
-    while job_ids:
-        for job_id in list(job_ids):  
-            print(f"Waiting for job {job_id} to complete...")
-            try:
-                job_status_command = f"squeue -j {job_id}"
-                result = subprocess.run(job_status_command, shell=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-                if job_id not in result.stdout.decode():
-                    print(f"Job {job_id} has completed.")
-                    job_ids.remove(job_id)  
-                else:
-                    print(f"Job {job_id} is still running. Waiting...")
-            except Exception as e:
-                print(f"Error checking status for job {job_id}: {e}")
-        sleep(30)  
+    return job_ids
+
+def wait_for_all_jobs_to_complete(job_ids, tracker=None):
+    tracker = tracker if tracker is not None else JobTracker()
+    print(f"Waiting for {len(job_ids)} job(s) to complete...")
+    tracker.wait(list(job_ids))
 
 a1_values = [round(x, 2) for x in list(frange(0.45, 0.55, 0.01))]
 b1_values = [round(x, 2) for x in list(frange(-0.28, -0.18, 0.01))]
@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+
+import os
+import sys
+
+ATOMIC_NUMBERS = {
+    "H": 1, "He": 2, "Li": 3, "Be": 4, "B": 5, "C": 6, "N": 7, "O": 8, "F": 9, "Ne": 10,
+    "Na": 11, "Mg": 12, "Al": 13, "Si": 14, "P": 15, "S": 16, "Cl": 17, "Ar": 18,
+    "K": 19, "Ca": 20, "Ga": 31, "Ge": 32, "As": 33, "Se": 34, "Br": 35, "Kr": 36, "I": 53,
+}
+
+class GeometryIndex:
+    """All molecules of a geometries.txt file, parsed once and indexed by name.
+
+    The file is a sequence of XYZ blocks: an atom count, a comment line whose fourth field is
+    the molecule name ("# CAS 74-82-8, Heptazine") and one "symbol x y z" line per atom.
+    """
+
+    def __init__(self, geom_file):
+        self.geom_file = geom_file
+        self.molecules = {}
+        self.data_blocks = {}
+        with open(geom_file, "r") as f:
+            lines = [line.strip() for line in f]
+
+        i = 0
+        while i < len(lines):
+            fields = lines[i].split()
+            if len(fields) == 1 and fields[0].isdigit() and i + 1 < len(lines):
+                count = int(fields[0])
+                comment = lines[i + 1].split()
+                if len(comment) >= 4:
+                    atoms = []
+                    for line in lines[i + 2:i + 2 + count]:
+                        symbol, x, y, z = line.split()[:4]
+                        atoms.append((symbol, float(x), float(y), float(z)))
+                    self.molecules[comment[3]] = atoms
+                i += 2 + count
+            else:
+                i += 1
+
+    def __contains__(self, molecule):
+        return molecule in self.molecules
+
+    def atoms(self, molecule):
+        if molecule not in self.molecules:
+            raise KeyError(f"Molecule {molecule} not found in {self.geom_file}")
+        return self.molecules[molecule]
+
+    def data_block(self, molecule):
+        """Atom lines for the $DATA group, formatted exactly as gen_geo.sh prints them."""
+        if molecule not in self.data_blocks:
+            lines = []
+            for symbol, x, y, z in self.atoms(molecule):
+                if symbol not in ATOMIC_NUMBERS:
+                    raise KeyError(f"No atomic number for element {symbol} in {molecule}")
+                lines.append(f" {symbol + chr(9):>2s} {ATOMIC_NUMBERS[symbol]:.1f} {x:14.12f} {y:14.12f} {z:14.12f}\n")
+            self.data_blocks[molecule] = "".join(lines)
+        return self.data_blocks[molecule]
+
+_indexes = {}
+
+def load_geometries(geom_file="geometries.txt"):
+    """Return the GeometryIndex for `geom_file`, re-reading it only when the file changes."""
+    path = os.path.abspath(geom_file)
+    mtime = os.path.getmtime(path)
+    cached = _indexes.get(path)
+    if cached is None or cached[0] != mtime:
+        cached = (mtime, GeometryIndex(path))
+        _indexes[path] = cached
+    return cached[1]
+
+def render_geometry(molecule, geom_file="geometries.txt"):
+    return load_geometries(geom_file).data_block(molecule)
+
+if __name__ == "__main__":
+    # Drop-in replacement for gen_geo.sh: geometry.py <molecule> <geom_file>
+    sys.stdout.write(render_geometry(sys.argv[1], sys.argv[2]))
@@ -0,0 +1,234 @@
+#!/usr/bin/env python3
+
+import math
+
+import numpy as np
+from scipy.linalg import cho_factor, cho_solve, solve_triangular
+from scipy.special import ndtr
+from hyperopt import STATUS_OK
+
+def space_bounds(space):
+    """{name: (label, low, high, q)} for a flat dict of hp.uniform / hp.quniform expressions."""
+    bounds = {}
+    for name, node in space.items():
+        while getattr(node, "name", None) != "hyperopt_param":
+            if not getattr(node, "pos_args", None):
+                raise ValueError(f"Cannot read bounds of {name}: not a hyperopt expression")
+            node = node.pos_args[0]
+        label, dist = node.pos_args[0].obj, node.pos_args[1]
+        if dist.name not in ("uniform", "quniform"):
+            raise ValueError(f"Only hp.uniform and hp.quniform are supported, {name} uses {dist.name}")
+        args = [arg.obj for arg in dist.pos_args]
+        bounds[name] = (label, float(args[0]), float(args[1]), float(args[2]) if dist.name == "quniform" else None)
+    return bounds
+
+def matern52(A, B, lengthscales):
+    d = np.sqrt((((A[:, None, :] - B[None, :, :]) / lengthscales) ** 2).sum(axis=-1)) * math.sqrt(5.0)
+    return (1.0 + d + d ** 2 / 3.0) * np.exp(-d)
+
+class GaussianProcess:
+    """Zero-mean GP with a Matern 5/2 ARD kernel on the unit cube, for standardized losses.
+
+    The lengthscales are chosen by maximizing the log marginal likelihood over a batch of
+    random candidates, all scored at once.
+    """
+
+    def __init__(self, noise=1e-6, n_lengthscales=64, rng=None):
+        self.noise = noise
+        self.n_lengthscales = n_lengthscales
+        self.rng = rng if rng is not None else np.random.default_rng()
+        self.lengthscales = None
+
+    def log_likelihood(self, X, y, lengthscales):
+        K = matern52(X, X, lengthscales) + self.noise * np.eye(len(X))
+        try:
+            factor = cho_factor(K, lower=True)
+        except np.linalg.LinAlgError:
+            return -np.inf
+        alpha = cho_solve(factor, y)
+        return -0.5 * y @ alpha - np.log(np.diag(factor[0])).sum()
+
+    def fit(self, X, y):
+        d = X.shape[1]
+        candidates = np.exp(self.rng.uniform(np.log(0.05), np.log(2.0), size=(self.n_lengthscales, d)))
+        if self.lengthscales is not None:
+            candidates[0] = self.lengthscales
+        scores = [self.log_likelihood(X, y, lengthscales) for lengthscales in candidates]
+        self.lengthscales = candidates[int(np.argmax(scores))]
+
+        self.X = X
+        K = matern52(X, X, self.lengthscales) + self.noise * np.eye(len(X))
+        self.L = np.linalg.cholesky(K + 1e-10 * np.eye(len(X)))
+        self.alpha = cho_solve((self.L, True), y)
+        return self
+
+    def predict(self, Xs):
+        """Mean and standard deviation at every row of `Xs`, in one pass."""
+        Ks = matern52(Xs, self.X, self.lengthscales)
+        mean = Ks @ self.alpha
+        v = solve_triangular(self.L, Ks.T, lower=True)
+        var = np.maximum(1.0 - (v ** 2).sum(axis=0), 1e-12)
+        return mean, np.sqrt(var)
+
+def expected_improvement(mean, std, best, xi=0.01):
+    z = (best - mean - xi) / std
+    return (best - mean - xi) * ndtr(z) + std * np.exp(-0.5 * z ** 2) / math.sqrt(2 * math.pi)
+
+class AsyncGP:
+    """Ask/tell Gaussian-process optimizer with the same interface as async_optimizer.AsyncTPE.
+
+    Takes the hyperopt `space` (hp.uniform / hp.quniform per parameter) or a bounds dict
+    {name: (low, high)}. The first `n_initial` points are a random design; after that every
+    ask fits the GP to the finished trials and picks the candidate with the highest expected
+    improvement out of `n_candidates` random and local points, scored in one batch. Trials
+    still running enter the fit with the constant `lie` loss, as in AsyncTPE. Infinite
+    losses (rejected combinations) are fitted as the worst finite loss.
+    """
+
+    def __init__(self, space, lie='mean', seed=None, n_initial=10, n_candidates=4096, xi=0.01):
+        self.set_space(space)
+        self.lie = lie
+        self.n_initial = n_initial
+        self.n_candidates = n_candidates
+        self.xi = xi
+        self.rng = np.random.default_rng(seed)
+        self.gp = GaussianProcess(rng=self.rng)
+        self.trials = []
+        self.pending = {}
+
+    def set_space(self, space):
+        """Search `space` from now on (same parameters, e.g. narrower ranges); the history is kept.
+
+        The unit cube of the fit stays that of the first space, so every finished trial keeps
+        informing the GP; only new points are limited to the `box` of the new ranges.
+        """
+        if all(isinstance(bound, tuple) for bound in space.values()):
+            self.bounds = {name: (name, float(low), float(high), None) for name, (low, high) in space.items()}
+        else:
+            self.bounds = space_bounds(space)
+        if not hasattr(self, 'names'):
+            self.names = list(self.bounds)
+            self.labels = {name: self.bounds[name][0] for name in self.names}
+            self.low = np.array([self.bounds[name][1] for name in self.names])
+            self.high = np.array([self.bounds[name][2] for name in self.names])
+        self.box = (self.to_unit({name: self.bounds[name][1] for name in self.names}),
+                    self.to_unit({name: self.bounds[name][2] for name in self.names}))
+
+    def random_points(self, n):
+        return self.box[0] + self.rng.random((n, len(self.names))) * (self.box[1] - self.box[0])
+
+    def to_unit(self, params):
+        x = np.array([params[name] for name in self.names], dtype=float)
+        return (x - self.low) / (self.high - self.low)
+
+    def from_unit(self, x):
+        params = {}
+        for name, value in zip(self.names, self.low + np.clip(x, *self.box) * (self.high - self.low)):
+            q = self.bounds[name][3]
+            params[name] = float(np.round(value / q) * q) if q else float(value)
+        return params
+
+    def finite_losses(self):
+        return [trial['result']['loss'] for trial in self.trials
+                if trial['tid'] not in self.pending and trial['result'].get('loss') is not None
+                and math.isfinite(trial['result']['loss'])]
+
+    def lie_value(self):
+        if isinstance(self.lie, (int, float)):
+            return float(self.lie)
+        losses = self.finite_losses()
+        if not losses:
+            return None
+        if self.lie == 'min':
+            return min(losses)
+        if self.lie == 'max':
+            return max(losses)
+        return sum(losses) / len(losses)
+
+    def training_data(self):
+        losses = self.finite_losses()
+        worst = max(losses) if losses else 0.0
+        lie = self.lie_value()
+        X, y = [], []
+        for trial in self.trials:
+            if trial['tid'] in self.pending:
+                loss = lie
+            else:
+                loss = trial['result'].get('loss')
+                loss = worst if loss is not None and not math.isfinite(loss) else loss
+            if loss is not None:
+                X.append(self.to_unit(trial['params']))
+                y.append(loss)
+        return np.array(X), np.array(y)
+
+    def candidates(self, X, y):
+        points = [self.random_points(self.n_candidates)]
+        if len(y):
+            best = X[np.argsort(y)[:5]]
+            local = best[self.rng.integers(len(best), size=self.n_candidates)]
+            points.append(np.clip(local + self.rng.normal(scale=0.05, size=local.shape), *self.box))
+        return np.vstack(points)
+
+    def suggest(self):
+        n_done = len(self.trials) - len(self.pending)
+        X, y = self.training_data()
+        if n_done < self.n_initial or len(y) < 2 or np.ptp(y) == 0:
+            return self.random_points(1)[0]
+
+        scale = y.std()
+        y_std = (y - y.mean()) / scale
+        self.gp.fit(X, y_std)
+        Xs = self.candidates(X, y_std)
+        mean, std = self.gp.predict(Xs)
+        ei = expected_improvement(mean, std, y_std.min(), self.xi)
+        return Xs[int(np.argmax(ei))]
+
+    def ask(self):
+        """Return (tid, params) for a new point."""
+        tid = max((trial['tid'] for trial in self.trials), default=-1) + 1
+        params = self.from_unit(self.suggest())
+        trial = {'tid': tid, 'params': params, 'result': {'status': 'new'}}
+        self.trials.append(trial)
+        self.pending[tid] = trial
+        return tid, dict(params)
+
+    def vals_of(self, tid):
+        return {self.labels[name]: value for name, value in self.pending[tid]['params'].items()}
+
+    def restore(self, tid, vals, result=None):
+        """Re-insert a trial from a journal: finished if `result` is given, pending otherwise."""
+        params = {name: float(vals[self.labels[name]]) for name in self.names}
+        trial = {'tid': tid, 'params': params, 'result': result or {'status': 'new'}}
+        self.trials.append(trial)
+        if result is None:
+            self.pending[tid] = trial
+        return dict(params)
+
+    def seed(self, vals, result):
+        """Add a finished evaluation from an earlier run (warm_start.py) under a new tid; returns the tid.
+
+        Seeded trials enter the fit (and count towards `n_initial`) but are never reported by `best`.
+        """
+        tid = max((trial['tid'] for trial in self.trials), default=-1) + 1
+        self.restore(tid, vals, dict(result, seeded=result.get('seeded', True)))
+        return tid
+
+    def tell(self, tid, result):
+        """Report the outcome of `tid`: a loss, or a result dict with 'loss' and 'status'."""
+        if not isinstance(result, dict):
+            result = {'loss': result, 'status': STATUS_OK}
+        self.pending.pop(tid)['result'] = result
+
+    def result_of(self, tid):
+        return next(trial['result'] for trial in self.trials if trial['tid'] == tid)
+
+    def best(self):
+        """Best fully evaluated trial; results stopped at a lower fidelity ('screened') and
+        evaluations seeded from earlier runs are skipped."""
+        done = [trial for trial in self.trials
+                if trial['tid'] not in self.pending and trial['result'].get('loss') is not None
+                and not trial['result'].get('screened') and not trial['result'].get('seeded')]
+        if not done:
+            return None, float('inf')
+        trial = min(done, key=lambda t: t['result']['loss'])
+        return dict(trial['params']), trial['result']['loss']
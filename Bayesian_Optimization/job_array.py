@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+
+import os
+import sys
+from time import strftime
+
+from job_tracker import SlurmScheduler
+
+# How one array task runs GAMESS on "$inp" (the input file name; the task runs in the input's
+# directory). There is no default: gms_sbatch sets up scratch and the GAMESS environment in the
+# batch script it writes, and the array tasks have to do the same. Copy the lines of that script
+# that prepare and run GAMESS, with the input name replaced by "$inp", e.g.
+#   GAMESS_COMMAND = 'source /path/to/gms_env.sh\nrungms "$inp" 00 "$SLURM_CPUS_PER_TASK" > "${inp%.inp}.log" 2>&1'
+# The log has to end up next to the input as <input name>.log, like the gms_sbatch runs.
+# Job arrays are refused until this is set (or a gamess_command is passed to submit_array).
+GAMESS_COMMAND = None
+
+ARRAY_SCRIPT = """#!/bin/bash
+#SBATCH --job-name={job_name}
+#SBATCH -p {partition}
+#SBATCH -c {cpus}
+#SBATCH --array=0-{last}{throttle}
+#SBATCH -o {array_dir}/{job_name}_%A_%a.out
+
+inp_path=$(sed -n "$((SLURM_ARRAY_TASK_ID + 1))p" {manifest})
+cd "$(dirname "$inp_path")" || exit 1
+inp=$(basename "$inp_path")
+{gamess_command}
+"""
+
+# Default limit on tasks per array (Slurm's MaxArraySize defaults to 1001).
+MAX_ARRAY_SIZE = 1000
+
+def gamess_command_or_fail(gamess_command=None):
+    """`gamess_command`, else GAMESS_COMMAND; raises ValueError if neither is set."""
+    command = gamess_command or GAMESS_COMMAND
+    if not command:
+        raise ValueError("Job arrays need the command that runs GAMESS in each task: set GAMESS_COMMAND in "
+                         "job_array.py to what gms_sbatch's batch script runs (see the comment there)")
+    return command
+
+def write_array_script(inp_files, job_name, partition="r630", cpus=30, max_running=None, array_dir="job_arrays",
+                       gamess_command=None):
+    """Write the manifest (one absolute input path per line) and batch script of one job array.
+
+    Task i runs inp_files[i]. Returns the script path.
+    """
+    os.makedirs(array_dir, exist_ok=True)
+    array_dir = os.path.abspath(array_dir)
+    manifest = os.path.join(array_dir, f"{job_name}.txt")
+    with open(manifest, "w") as f:
+        f.writelines(os.path.abspath(inp_file) + "\n" for inp_file in inp_files)
+
+    script = os.path.join(array_dir, f"{job_name}.sh")
+    with open(script, "w") as f:
+        f.write(ARRAY_SCRIPT.format(job_name=job_name, partition=partition, cpus=cpus, last=len(inp_files) - 1,
+                                    throttle=f"%{max_running}" if max_running else "", array_dir=array_dir,
+                                    manifest=manifest, gamess_command=gamess_command_or_fail(gamess_command)))
+    return script
+
+def submit_array(inp_files, job_name=None, partition="r630", cpus=30, max_running=None, scheduler=None,
+                 array_dir="job_arrays", gamess_command=None):
+    """Submit `inp_files` as a single Slurm job array; return the task ids ('123_0', ...) in input order."""
+    if not inp_files:
+        return []
+    if len(inp_files) > MAX_ARRAY_SIZE:
+        raise ValueError(f"{len(inp_files)} inputs do not fit in one array of at most {MAX_ARRAY_SIZE} tasks")
+    scheduler = scheduler if scheduler is not None else SlurmScheduler()
+    job_name = job_name or f"gms_array_{strftime('%Y%m%d_%H%M%S')}_{os.getpid()}"
+    script = write_array_script(inp_files, job_name, partition, cpus, max_running, array_dir, gamess_command)
+    array_id = scheduler.submit(script)
+    print(f"Submitted {len(inp_files)} input(s) as job array {array_id}")
+    return [f"{array_id}_{i}" for i in range(len(inp_files))]
+
+if __name__ == "__main__":
+    # Usage: job_array.py <input.inp> [<input.inp> ...]
+    for task_id, inp_file in zip(submit_array(sys.argv[1:]), sys.argv[1:]):
+        print(task_id, inp_file)
@@ -0,0 +1,337 @@
+#!/usr/bin/env python3
+
+import os
+import re
+import subprocess
+from collections import deque
+from contextlib import contextmanager
+from time import sleep, monotonic
+
+# States squeue can still report for a job that has already left the run queue.
+FINISHED_STATES = {
+    "COMPLETED", "FAILED", "CANCELLED", "TIMEOUT", "NODE_FAIL", "OUT_OF_MEMORY",
+    "PREEMPTED", "BOOT_FAIL", "DEADLINE", "SPECIAL_EXIT", "REVOKED"
+}
+
+def parse_job_id(submission_output):
+    """Return the Slurm job id from sbatch/gms_sbatch output ("Submitted batch job 123")."""
+    text = submission_output.strip()
+    match = re.search(r"(\d+(?:_\d+)?)\s*$", text)
+    return match.group(1) if match else text
+
+class SlurmScheduler:
+    """Thin wrapper around the Slurm command line tools.
+
+    The commands can be swapped for local stand-ins (e.g. a fake sbatch/squeue pair) to test
+    submission and tracking without a cluster; simulator.SimulatedScheduler replaces the
+    whole class in-process.
+    """
+
+    def __init__(self, squeue_command="squeue", scancel_command="scancel", sbatch_command="sbatch",
+                 gms_sbatch_command="gms_sbatch"):
+        self.squeue_command = squeue_command
+        self.scancel_command = scancel_command
+        self.sbatch_command = sbatch_command
+        self.gms_sbatch_command = gms_sbatch_command
+
+    def query(self, job_ids):
+        """Return {job_id: state} for every job squeue still lists, or None if squeue failed.
+
+        All ids are checked with a single squeue call. Array tasks ('123_4') are looked up
+        through their array job and listed one task per line (-r). Jobs missing from the
+        output have left the queue and are considered finished.
+        """
+        if not job_ids:
+            return {}
+        query_ids = sorted({job_id.split("_")[0] for job_id in job_ids})
+        command = [self.squeue_command, "-h", "-r", "-o", "%i %T", "-j", ",".join(query_ids)]
+        try:
+            result = subprocess.run(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+        except OSError as e:
+            print(f"Error running {self.squeue_command}: {e}")
+            return None
+
+        if result.returncode != 0:
+            # squeue refuses the whole request once every id has been purged from the controller.
+            if "Invalid job id" in result.stderr:
+                return {}
+            print(f"squeue failed ({result.returncode}): {result.stderr.strip()}")
+            return None
+
+        states = {}
+        for line in result.stdout.splitlines():
+            fields = line.split()
+            if len(fields) >= 2:
+                states[fields[0]] = fields[1]
+        return states
+
+    def submit(self, script, *options):
+        """sbatch a batch script and return its job id."""
+        command = [self.sbatch_command] + list(options) + [script]
+        return parse_job_id(subprocess.check_output(command, stderr=subprocess.STDOUT).decode())
+
+    def submit_input(self, inp_file, partition="r630", cpus=30):
+        """gms_sbatch one GAMESS input from its own directory and return the job id."""
+        job_dir, inp_name = os.path.split(inp_file)
+        command = [self.gms_sbatch_command, "-p", partition, "-c", str(cpus), "-i", inp_name]
+        return parse_job_id(subprocess.check_output(command, cwd=job_dir or None).decode())
+
+    def cancel(self, job_ids):
+        if job_ids:
+            subprocess.run([self.scancel_command] + list(job_ids), stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+
+class JobTracker:
+    """Track outstanding Slurm jobs and report them as they finish.
+
+    Every poll issues one scheduler query for all tracked jobs. The poll interval starts at
+    `min_interval`, grows by `backoff` after each poll that sees no completions and drops back
+    to `min_interval` as soon as something finishes, capped at `max_interval`.
+
+    With a `metrics` store (metrics.MetricsStore) the time of every scheduler query and
+    every wait between polls is recorded as the 'squeue' and 'sleep' phases.
+    """
+
+    def __init__(self, scheduler=None, min_interval=5.0, max_interval=60.0, backoff=1.5, metrics=None):
+        self.scheduler = scheduler if scheduler is not None else SlurmScheduler()
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.backoff = backoff
+        self.interval = min_interval
+        self.jobs = {}
+        self.callbacks = {}
+        self.polls = 0
+        self.metrics = metrics
+
+    def track(self, job_id, callback=None, **info):
+        """Start tracking `job_id`; `callback(job_id, info)` fires once it has finished.
+
+        Tracking a job again adds to its info and keeps an earlier callback unless a new one is given.
+        """
+        self.jobs.setdefault(job_id, {"state": "SUBMITTED", "submitted_at": monotonic()}).update(info)
+        if callback is not None:
+            self.callbacks[job_id] = callback
+        return job_id
+
+    def forget(self, job_id):
+        self.jobs.pop(job_id, None)
+        self.callbacks.pop(job_id, None)
+
+    def outstanding(self, job_ids=None):
+        ids = self.jobs if job_ids is None else job_ids
+        return [job_id for job_id in ids if job_id in self.jobs and "finished_at" not in self.jobs[job_id]]
+
+    def is_finished(self, job_id):
+        return job_id not in self.jobs or "finished_at" in self.jobs[job_id]
+
+    def slurm_id(self, job_id):
+        """Id of the Slurm job currently running `job_id` (a retried job keeps its first id)."""
+        return self.jobs[job_id].get("slurm_id", job_id)
+
+    def retry(self, job_id, resubmit, delay=0.0, callback=None):
+        """Put a finished job back in the queue after `delay` seconds, under the same id.
+
+        `resubmit()` submits the job again and returns the new Slurm id (None if that fails).
+        Callers waiting on `job_id` keep waiting until the retried run has finished too.
+        """
+        job = self.jobs[job_id]
+        job.pop("finished_at", None)
+        job.update(state="RETRY_WAIT", retry_at=monotonic() + delay, resubmit=resubmit)
+        job["attempts"] = job.get("attempts", 1) + 1
+        if callback is not None:
+            self.callbacks[job_id] = callback
+
+    def resubmit_due(self):
+        now = monotonic()
+        for job_id, job in self.jobs.items():
+            if job["state"] != "RETRY_WAIT" or job["retry_at"] > now:
+                continue
+            start = monotonic()
+            slurm_id = job.pop("resubmit")()
+            if slurm_id is None:
+                print(f"Resubmission of job {job_id} failed.")
+                job.update(state="FAILED", finished_at=now)
+                continue
+            print(f"Job {job_id} resubmitted as {slurm_id} (attempt {job['attempts']}).")
+            job.update(state="SUBMITTED", slurm_id=slurm_id, submitted_at=now, submit_seconds=monotonic() - start)
+            job.pop("started_at", None)
+
+    def poll(self):
+        """Query the scheduler once and return the ids that finished since the last poll."""
+        self.resubmit_due()
+        pending = [job_id for job_id in self.outstanding() if self.jobs[job_id]["state"] != "RETRY_WAIT"]
+        if not pending:
+            return []
+
+        start = monotonic()
+        states = self.scheduler.query([self.slurm_id(job_id) for job_id in pending])
+        self.polls += 1
+        if self.metrics is not None:
+            self.metrics.phase("squeue", monotonic() - start)
+        if states is None:
+            self.interval = min(self.interval * self.backoff, self.max_interval)
+            return []
+
+        finished = []
+        now = monotonic()
+        for job_id in pending:
+            state = states.get(self.slurm_id(job_id))
+            job = self.jobs[job_id]
+            if state is None or state in FINISHED_STATES:
+                job["state"] = state or "COMPLETED"
+                job["finished_at"] = now
+                finished.append(job_id)
+            else:
+                if state == "RUNNING" and "started_at" not in job:
+                    job["started_at"] = now
+                job["state"] = state
+
+        for job_id in finished:
+            print(f"Job {job_id} has completed.")
+            callback = self.callbacks.pop(job_id, None)
+            if callback is not None:
+                callback(job_id, self.jobs[job_id])
+
+        if finished:
+            self.interval = self.min_interval
+        else:
+            self.interval = min(self.interval * self.backoff, self.max_interval)
+        # A callback may have put its job back in the queue (retry); it has not finished then.
+        return [job_id for job_id in finished if self.is_finished(job_id)]
+
+    def sleep(self):
+        """Wait one poll interval."""
+        start = monotonic()
+        sleep(self.interval)
+        if self.metrics is not None:
+            self.metrics.phase("sleep", monotonic() - start)
+
+    def cancel(self, job_ids):
+        """scancel `job_ids` and mark them finished without firing their callbacks."""
+        job_ids = [job_id for job_id in job_ids if not self.is_finished(job_id)]
+        if not job_ids:
+            return []
+        self.scheduler.cancel([self.slurm_id(job_id) for job_id in job_ids if self.jobs[job_id]["state"] != "RETRY_WAIT"])
+        now = monotonic()
+        for job_id in job_ids:
+            self.jobs[job_id].update(state="CANCELLED", finished_at=now)
+            self.callbacks.pop(job_id, None)
+        print(f"Cancelled {len(job_ids)} job(s): {' '.join(job_ids)}")
+        return job_ids
+
+    def as_completed(self, job_ids=None):
+        """Yield job ids (all tracked jobs, or just `job_ids`) in the order they finish."""
+        if job_ids is not None:
+            for job_id in job_ids:
+                if job_id not in self.jobs:
+                    self.track(job_id)
+        waiting = set(self.outstanding(job_ids))
+        for job_id in (job_ids or []):
+            if job_id not in waiting:
+                yield job_id
+
+        while waiting:
+            for job_id in self.poll():
+                if job_id in waiting:
+                    waiting.discard(job_id)
+                    yield job_id
+            waiting.intersection_update(self.outstanding())
+            if waiting:
+                print(f"{len(waiting)} job(s) still queued or running. Next check in {self.interval:.0f} s...")
+                self.sleep()
+
+    def wait(self, job_ids=None):
+        """Block until every job in `job_ids` (default: all tracked jobs) has finished."""
+        for _ in self.as_completed(job_ids):
+            pass
+
+class JobPool:
+    """Sliding window of Slurm jobs: at most `max_jobs` in the queue, refilled as each one finishes.
+
+    Jobs are queued with `add(submit)`, where `submit()` puts one job in the queue and returns
+    its id (None if the submission failed). Nothing waits for a whole batch: every poll that
+    sees jobs finish submits the same number of queued ones, whatever molecule, state or
+    parameter set they belong to.
+    """
+
+    def __init__(self, max_jobs, tracker=None):
+        self.max_jobs = max_jobs
+        self.tracker = tracker if tracker is not None else JobTracker()
+        self.queue = deque()
+        self.running = set()
+        self.submitted = []
+        self.labels = {}
+
+    def add(self, submit, callback=None, slots=1, **info):
+        """Queue a job; `callback(job_id, info)` fires once it has finished.
+
+        A `submit()` that returns a list of ids (a job array of `slots` tasks, tracked by
+        `submit` itself) takes that many places in the window; one larger than the whole
+        window goes in once the window is empty.
+        """
+        self.queue.append((submit, callback, slots, dict(self.labels, **info)))
+
+    @contextmanager
+    def labelled(self, **labels):
+        """Jobs added inside the block get `labels` in their info (e.g. tid=... of the evaluation they belong to)."""
+        previous = self.labels
+        self.labels = dict(previous, **labels)
+        try:
+            yield self
+        finally:
+            self.labels = previous
+
+    def queued(self, **labels):
+        """Number of jobs still waiting for a place whose info matches `labels`."""
+        return sum(1 for _, _, _, info in self.queue if all(info.get(key) == value for key, value in labels.items()))
+
+    def drop(self, **labels):
+        """Remove the waiting jobs whose info matches `labels` (e.g. of a cancelled evaluation); return how many."""
+        kept = deque(entry for entry in self.queue if any(entry[3].get(key) != value for key, value in labels.items()))
+        dropped = len(self.queue) - len(kept)
+        self.queue = kept
+        return dropped
+
+    def adopt(self, job_id, **info):
+        """Track a job submitted elsewhere (e.g. reattached after a restart) as one taking a place in the window."""
+        self.tracker.track(job_id, **info)
+        if not self.tracker.is_finished(job_id):
+            self.running.add(job_id)
+
+    def __len__(self):
+        return len(self.queue) + len(self.running)
+
+    def fill(self):
+        """Submit queued jobs until `max_jobs` are in flight; return the new job ids."""
+        new_ids = []
+        while self.queue and (len(self.running) + self.queue[0][2] <= self.max_jobs or not self.running):
+            submit, callback, _, info = self.queue.popleft()
+            start = monotonic()
+            job_ids = submit()
+            if job_ids is None:
+                continue
+            if isinstance(job_ids, list):
+                for job_id in job_ids:
+                    self.tracker.track(job_id, callback, **info)
+            else:
+                job_ids = [self.tracker.track(job_ids, callback, submit_seconds=monotonic() - start, **info)]
+            self.running.update(job_ids)
+            new_ids += job_ids
+        self.submitted += new_ids
+        return new_ids
+
+    def step(self):
+        """Poll once, refill the freed slots and return the ids that finished."""
+        finished = [job_id for job_id in self.tracker.poll() if job_id in self.running]
+        self.running.intersection_update(self.tracker.outstanding(self.running))
+        self.fill()
+        return finished
+
+    def run(self):
+        """Submit and wait for every queued job; return all submitted ids."""
+        self.fill()
+        while self.running:
+            if not self.step() and self.running:
+                print(f"{len(self.running)} job(s) in flight, {len(self.queue)} queued. "
+                      f"Next check in {self.tracker.interval:.0f} s...")
+                self.tracker.sleep()
+        return self.submitted
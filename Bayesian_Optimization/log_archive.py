@@ -0,0 +1,199 @@
+#!/usr/bin/env python3
+
+import os
+import sys
+import json
+import shutil
+import zipfile
+import argparse
+from time import time
+from concurrent.futures import ThreadPoolExecutor
+
+from log_parser import (parse_lines, new_record, to_json, open_log, archive_member, read_archive, list_logs,
+                        state_pattern, transition_pattern, cpu_time_pattern, ARCHIVE_SUFFIX, SUMMARY_MEMBER)
+from evaluation_cache import parse_state_dir
+from retry_engine import FAILURE_PATTERNS
+
+# Compression of the archived logs: LZMA is about a third smaller, DEFLATE several times faster.
+COMPRESSION = {"lzma": zipfile.ZIP_LZMA, "deflate": zipfile.ZIP_DEFLATED}
+
+# Lines kept next to the parsed record of a compacted log: everything log_parser and
+# retry_engine.classify_failure look at, so the key lines alone give the same answers.
+KEY_MARKERS = ("FINAL", "UNCONVERGED", "DID NOT CONVERGE", "TERMINATED", "CPU timing information", "ddikick.x",
+               "WALL CLOCK TIME", "DDI Process")
+
+def is_key_line(line):
+    if any(marker in line for marker in KEY_MARKERS):
+        return True
+    if state_pattern.match(line) or transition_pattern.match(line) or cpu_time_pattern.match(line):
+        return True
+    return any(pattern.search(line) for _, pattern in FAILURE_PATTERNS)
+
+def scan_log(log_file):
+    """Parse a log and collect its key lines in the same pass; returns (record, key lines)."""
+    key_lines = []
+
+    def lines():
+        with open(log_file, 'r', errors='replace') as f:
+            for line in f:
+                if is_key_line(line):
+                    key_lines.append(line.rstrip("\n"))
+                yield line
+
+    return parse_lines(lines(), new_record(log_file)), key_lines
+
+def compact_evaluation(prefix, min_age=0.0, compression="lzma"):
+    """Move the logs of one evaluation (`prefix`_S and `prefix`_T) into `prefix`.logs.zip.
+
+    The logs are compressed with `compression` (a COMPRESSION key); the parsed record and key lines of each one go into the
+    archive's summary. Logs already in the archive are kept unless a newer copy is on disk
+    (a rerun). The logs are only deleted once the new archive is in place. Nothing is done if
+    a log was modified less than `min_age` seconds ago (its job may still be running).
+    Returns (logs compacted, bytes before, archive bytes), or None if nothing was done.
+    """
+    logs = {}
+    for state in ('S', 'T'):
+        state_dir = f"{prefix}_{state}"
+        if os.path.isdir(state_dir):
+            for name in sorted(os.listdir(state_dir)):
+                if name.endswith(".log"):
+                    log_file = os.path.join(state_dir, name)
+                    logs[archive_member(log_file)[1]] = log_file
+    if not logs:
+        return None
+    newest = max(os.path.getmtime(log_file) for log_file in logs.values())
+    if time() - newest < min_age:
+        return None
+
+    archive = prefix + ARCHIVE_SUFFIX
+    old_names, summary = read_archive(archive) if os.path.exists(archive) else (frozenset(), {})
+    summary = dict(summary)
+    before = sum(os.path.getsize(log_file) for log_file in logs.values())
+
+    tmp = archive + ".tmp"
+    with zipfile.ZipFile(tmp, "w", COMPRESSION[compression]) as out:
+        if old_names:
+            with zipfile.ZipFile(archive) as old:
+                for name in sorted(old_names - set(logs) - {SUMMARY_MEMBER}):
+                    with old.open(name) as src, out.open(name, "w") as dst:
+                        shutil.copyfileobj(src, dst)
+        for member, log_file in logs.items():
+            record, key_lines = scan_log(log_file)
+            out.write(log_file, member)
+            summary[member] = {"record": to_json(record), "key_lines": key_lines}
+        out.writestr(SUMMARY_MEMBER, json.dumps(summary), compress_type=zipfile.ZIP_DEFLATED)
+
+    with zipfile.ZipFile(tmp) as check:
+        sizes = {info.filename: info.file_size for info in check.infolist()}
+    for member, log_file in logs.items():
+        if sizes.get(member) != os.path.getsize(log_file):
+            os.remove(tmp)
+            raise IOError(f"{log_file} changed while it was being archived; left in place")
+
+    os.replace(tmp, archive)
+    for log_file in logs.values():
+        os.remove(log_file)
+    return len(logs), before, os.path.getsize(archive)
+
+class BackgroundCompactor:
+    """Compacts finished evaluations on a worker thread, one at a time, while the driver keeps polling.
+
+    `submit(prefix)` returns at once. Compression runs without the GIL, so the driver loop
+    is only slowed down by the parse of each log. Call `close()` before exiting; it waits
+    for the evaluations still queued.
+    """
+
+    def __init__(self, compression="lzma"):
+        self.compression = compression
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="compact")
+
+    def submit(self, prefix):
+        future = self.executor.submit(compact_evaluation, prefix, 0.0, self.compression)
+        future.add_done_callback(lambda future: self.report(prefix, future))
+        return future
+
+    def report(self, prefix, future):
+        try:
+            result = future.result()
+        except Exception as e:
+            print(f"Compacting {prefix} failed: {e}")
+            return
+        if result is not None:
+            print(f"Compacted {result[0]} log(s) of {prefix}: {result[1] / 2 ** 20:.1f} MB -> {result[2] / 2 ** 20:.1f} MB")
+
+    def close(self):
+        self.executor.shutdown(wait=True)
+
+def evaluation_prefixes(root):
+    """Prefixes of every evaluation with an _S or _T directory below `root`."""
+    prefixes = set()
+    for dirpath, dirnames, _ in os.walk(root):
+        dirnames.sort()
+        if parse_state_dir(dirpath) is not None:
+            prefixes.add(dirpath.rstrip(os.sep)[:-len("_S")])
+    return sorted(prefixes)
+
+def restore_evaluation(prefix):
+    """Write the archived logs of an evaluation back into its directories and drop the archive."""
+    archive = prefix + ARCHIVE_SUFFIX
+    restored = 0
+    with zipfile.ZipFile(archive) as zf:
+        for name in zf.namelist():
+            if name == SUMMARY_MEMBER:
+                continue
+            log_file = os.path.join(os.path.dirname(prefix), name)
+            if os.path.exists(log_file):
+                continue
+            os.makedirs(os.path.dirname(log_file), exist_ok=True)
+            with zf.open(name) as src, open(log_file, "wb") as dst:
+                shutil.copyfileobj(src, dst)
+            restored += 1
+    os.remove(archive)
+    return restored
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compact evaluation logs into per-evaluation compressed archives.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    compact = sub.add_parser("compact", help="archive the logs of every evaluation below the given directories")
+    compact.add_argument("dirs", nargs="*", default=["."])
+    compact.add_argument("--min-age", type=float, default=3600.0,
+                         help="skip evaluations with a log modified less than this many seconds ago")
+    compact.add_argument("--compression", choices=COMPRESSION, default="lzma")
+    restore = sub.add_parser("restore", help="unpack the archives of evaluations (prefixes or directories)")
+    restore.add_argument("paths", nargs="+")
+    cat = sub.add_parser("cat", help="print a log, archived or not")
+    cat.add_argument("logs", nargs="+")
+    keys = sub.add_parser("keys", help="print the key lines kept for an archived log")
+    keys.add_argument("logs", nargs="+")
+    ls = sub.add_parser("ls", help="list the logs of state directories, archived or not")
+    ls.add_argument("dirs", nargs="+")
+    args = parser.parse_args()
+
+    if args.command == "compact":
+        total = [0, 0, 0]
+        for directory in args.dirs:
+            for prefix in evaluation_prefixes(directory):
+                result = compact_evaluation(prefix, args.min_age, args.compression)
+                if result is not None:
+                    total = [a + b for a, b in zip(total, result)]
+                    print(f"{prefix}: {result[0]} log(s), {result[1] / 2 ** 20:.1f} MB -> {result[2] / 2 ** 20:.1f} MB")
+        if total[0]:
+            print(f"Compacted {total[0]} log(s): {total[1] / 2 ** 20:.1f} MB -> {total[2] / 2 ** 20:.1f} MB")
+    elif args.command == "restore":
+        for path in args.paths:
+            prefix = path.rstrip(os.sep)
+            prefix = prefix[:-len("_S")] if parse_state_dir(prefix) is not None else prefix
+            print(f"{prefix}: restored {restore_evaluation(prefix)} log(s)")
+    elif args.command == "cat":
+        for log_file in args.logs:
+            with open_log(log_file) as lines:
+                shutil.copyfileobj(lines, sys.stdout)
+    elif args.command == "keys":
+        for log_file in args.logs:
+            archive, member = archive_member(log_file)
+            entry = read_archive(archive)[1].get(member)
+            print("\n".join(entry["key_lines"]) if entry else f"{log_file} is not archived")
+    elif args.command == "ls":
+        for state_dir in args.dirs:
+            for name in list_logs(state_dir):
+                print(os.path.join(state_dir, name))
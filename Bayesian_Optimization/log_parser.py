@@ -0,0 +1,190 @@
+#!/usr/bin/env python3
+
+import io
+import os
+import re
+import sys
+import json
+import zipfile
+from functools import lru_cache
+
+HARTREE_TO_EV = 27.2114
+
+COMPLETION_MARKERS = ("CPU timing information for all processes", "ddikick.x: exited gracefully.")
+
+# "   2  A     -230.7512451234     3.123 ..." in the MRSF-DFT state summary
+state_pattern = re.compile(r"^\s*(\d+)\s+A\s+([-+]?\d*\.\d+)(?:\s+([-+]?\d*\.\d+))?")
+# "   1  ->  2     2.345 ..." in the transitions between excited states
+transition_pattern = re.compile(r"^\s*(\d+)\s+->\s+(\d+)\s+([-+]?\d*\.\d+)")
+# " FINAL ROHF ENERGY IS     -230.1234567890 AFTER  17 ITERATIONS"
+final_scf_pattern = re.compile(r"FINAL\s+\S+\s+ENERGY IS\s+([-+]?\d*\.\d+)\s+AFTER\s+(\d+)\s+ITERATIONS")
+# " TOTAL WALL CLOCK TIME=       13.0 SECONDS, CPU UTILIZATION IS  94.62%"
+wall_clock_pattern = re.compile(r"TOTAL WALL CLOCK TIME=\s*([-+]?\d*\.\d+)")
+# "   0: 1234.567 + 12.345 = 1246.912" per process under "CPU timing information for all processes"
+cpu_time_pattern = re.compile(r"^\s*(\d+):\s*([-+]?\d*\.\d+)\s*\+\s*([-+]?\d*\.\d+)\s*=\s*([-+]?\d*\.\d+)")
+
+# Logs of a compacted evaluation live in <evaluation prefix>.logs.zip next to its _S/_T
+# directories, as "<state dir>/<log name>" members, with the parsed records and key lines of
+# every log in its "summary.json" member (see log_archive.py).
+ARCHIVE_SUFFIX = ".logs.zip"
+SUMMARY_MEMBER = "summary.json"
+
+def archive_member(log_file):
+    """(archive path, member name) where a compacted `log_file` would be stored."""
+    state_dir = os.path.dirname(os.path.abspath(log_file))
+    return state_dir[:-len("_S")] + ARCHIVE_SUFFIX, f"{os.path.basename(state_dir)}/{os.path.basename(log_file)}"
+
+@lru_cache(maxsize=64)
+def archive_contents(archive, mtime):
+    """(member names, summary) of an archive; cached until the archive changes."""
+    with zipfile.ZipFile(archive) as zf:
+        names = frozenset(zf.namelist())
+        summary = json.loads(zf.read(SUMMARY_MEMBER)) if SUMMARY_MEMBER in names else {}
+    return names, summary
+
+def read_archive(archive):
+    try:
+        return archive_contents(archive, os.stat(archive).st_mtime_ns)
+    except (OSError, zipfile.BadZipFile):
+        return frozenset(), {}
+
+def log_exists(log_file):
+    """True if `log_file` is on disk or in its evaluation's archive."""
+    if os.path.exists(log_file):
+        return True
+    archive, member = archive_member(log_file)
+    return os.path.exists(archive) and member in read_archive(archive)[0]
+
+def list_logs(state_dir):
+    """Sorted names of the .log files of a state directory, on disk or archived."""
+    names = set()
+    if os.path.isdir(state_dir):
+        names.update(name for name in os.listdir(state_dir) if name.endswith(".log"))
+    archive, member = archive_member(os.path.join(state_dir, "x.log"))
+    prefix = member[:-len("x.log")]
+    if os.path.exists(archive):
+        names.update(name[len(prefix):] for name in read_archive(archive)[0] if name.startswith(prefix))
+    return sorted(names)
+
+def open_log(log_file):
+    """Text stream over a log, read from disk or decompressed on the fly from its archive."""
+    if os.path.exists(log_file):
+        return open(log_file, 'r', errors='replace')
+    archive, member = archive_member(log_file)
+    if os.path.exists(archive):
+        with zipfile.ZipFile(archive) as zf:
+            if member in zf.namelist():
+                # The member stream keeps the archive file open after the ZipFile is closed.
+                return io.TextIOWrapper(zf.open(member), errors='replace')
+    raise FileNotFoundError(log_file)
+
+def new_record(log_file):
+    return {
+        "log": log_file,
+        "completed": False,
+        "terminated_normally": False,
+        "energies": {},
+        "excitation_energies": {},
+        "transitions": {},
+        "scf_energy": None,
+        "scf_iterations": None,
+        "scf_converged": None,
+        "tddft_converged": None,
+        "wall_time": None,
+        "cpu_times": [],
+    }
+
+def parse_lines(lines, record):
+    """Fill `record` from an iterable of log lines in a single pass.
+
+    The first occurrence of every state line wins, as with the original regex extraction.
+    """
+    energies = record["energies"]
+    excitation_energies = record["excitation_energies"]
+    transitions = record["transitions"]
+    cpu_times = record["cpu_times"]
+
+    for line in lines:
+        head = line.lstrip()[:1]
+        if head.isdigit():
+            if "->" in line:
+                match = transition_pattern.match(line)
+                if match:
+                    transitions.setdefault((int(match.group(1)), int(match.group(2))), float(match.group(3)))
+                continue
+            match = state_pattern.match(line)
+            if match:
+                root = int(match.group(1))
+                if root not in energies:
+                    energies[root] = float(match.group(2))
+                    if match.group(3) is not None:
+                        excitation_energies[root] = float(match.group(3))
+            elif record["completed"] and ":" in line:
+                match = cpu_time_pattern.match(line)
+                if match:
+                    cpu_times.append(float(match.group(4)))
+            continue
+
+        if "FINAL" in line:
+            match = final_scf_pattern.search(line)
+            if match:
+                record["scf_energy"] = float(match.group(1))
+                record["scf_iterations"] = int(match.group(2))
+                if record["scf_converged"] is None:
+                    record["scf_converged"] = True
+        elif "UNCONVERGED" in line or "DID NOT CONVERGE" in line:
+            if record["scf_energy"] is None:
+                record["scf_converged"] = False
+            else:
+                record["tddft_converged"] = False
+        elif "TERMINATED NORMALLY" in line:
+            record["terminated_normally"] = True
+        elif COMPLETION_MARKERS[0] in line or COMPLETION_MARKERS[1] in line:
+            record["completed"] = True
+        elif "WALL CLOCK TIME" in line:
+            match = wall_clock_pattern.search(line)
+            if match:
+                record["wall_time"] = float(match.group(1))
+
+    if energies and record["tddft_converged"] is None:
+        record["tddft_converged"] = True
+    return record
+
+def parse_log(log_file):
+    """Read a GAMESS MRSF log once and return its record, or None if the file does not exist.
+
+    The record holds every state energy (Hartree, keyed by root), the excitation energies
+    printed next to them (eV), the transitions between excited states (eV, keyed by
+    (from, to)), the final SCF energy and iteration count, convergence flags, whether
+    the run reached one of the completion markers, the last total wall clock time (s) and
+    the total CPU time of every process from the closing CPU timing section (s).
+    """
+    if not os.path.exists(log_file):
+        # Compacted logs are not decompressed: the record stored at compaction time is used.
+        archive, member = archive_member(log_file)
+        names, summary = read_archive(archive) if os.path.exists(archive) else (frozenset(), {})
+        if member in summary:
+            return dict(from_json(summary[member]["record"]), log=log_file)
+        if member not in names:
+            return None
+    with open_log(log_file) as lines:
+        return parse_lines(lines, new_record(log_file))
+
+def to_json(record):
+    """JSON-friendly copy of a record (tuple keys become "1->2")."""
+    data = dict(record)
+    data["transitions"] = {f"{i}->{j}": value for (i, j), value in record["transitions"].items()}
+    return data
+
+def from_json(data):
+    """Record from its to_json form (JSON object keys back to roots and (from, to) tuples)."""
+    record = dict(data)
+    record["energies"] = {int(root): value for root, value in data["energies"].items()}
+    record["excitation_energies"] = {int(root): value for root, value in data["excitation_energies"].items()}
+    record["transitions"] = {tuple(int(i) for i in key.split("->")): value for key, value in data["transitions"].items()}
+    return record
+
+if __name__ == "__main__":
+    for log_file in sys.argv[1:]:
+        record = parse_log(log_file)
+        print(json.dumps(to_json(record) if record else {"log": log_file, "missing": True}))
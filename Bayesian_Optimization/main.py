@@ -1,10 +1,27 @@
 #!/usr/bin/env python3
 
-from hyperopt import fmin, tpe, hp, STATUS_OK, Trials
-from generate_and_submit_jobs import generate_input_files_and_submit
-from extract_log_data import extract_log_data, save_extracted_data_to_csv
+from hyperopt import hp, STATUS_OK
+import os
+from generate_and_submit_jobs import (generate_input_files_and_submit, write_input_file, submit_inputs_as_array,
+                                      template_fingerprint, state_dir_path, FIDELITIES)
+from evaluation_cache import EvaluationCache
+from async_optimizer import AsyncTPE, run_async_optimization
+from gp_optimizer import AsyncGP
+from trial_journal import TrialJournal
+from extract_log_data import extract_log_data, cache_finished_log
+from job_tracker import JobTracker, JobPool, SlurmScheduler
 from compare_results import compare_with_reference, S1_ref, T1_ref, calculate_rmse_mae
-import csv
+from results_store import ResultsStore
+from early_abort import partial_results, doomed_reason
+from multi_fidelity import SuccessiveHalving
+from orbital_cache import OrbitalCache
+from retry_engine import RetryEngine
+from metrics import MetricsStore
+from simulator import SimulatedScheduler
+from job_array import gamess_command_or_fail
+from log_archive import BackgroundCompactor
+from sensitivity import SpaceShrinker
+from warm_start import store_history
 
 space = {
     'a1': hp.uniform('a1', 0.45, 0.55),
@@ -16,50 +33,162 @@ space = {
 molecules = ["Heptazine", "Cyclazine", "Molecule3", "Molecule4", "Molecule5",
              "Molecule6", "Molecule7", "Molecule8", "Molecule9", "Molecule10"]
 
-# Define max jobs for parallel submissions(better keep it 20)
+# Number of parameter combinations evaluated at the same time (1 gives the old serial behaviour).
+# Every combination needs 2 x len(molecules) jobs.
+parallel_evals = 4
+
+# Jobs in the queue at once, across all combinations and both states (better keep it 20). The jobs
+# of the combinations in flight wait in one sliding window and go in as earlier ones finish.
 max_jobs = 20
 
+# Cancel the remaining jobs of a combination as soon as its finished molecules show it cannot
+# beat the best RMSE so far (or, with reject_positive_gap, as soon as one S1-T1 gap is positive).
+# Aborted combinations are told to the optimizer with a lower bound on their RMSE instead of the
+# full result, so this is off by default.
+early_abort = False
+reject_positive_gap = False
+
+# 'tpe' (hyperopt) or 'gp' (Gaussian process with expected improvement, gp_optimizer.py).
+# Compare them offline with: python compare_optimizers.py --target 0.1
+optimizer_backend = 'tpe'
+
+# Screen every combination with the cheap 'screen' setup first and only run the best 1/eta
+# of them with the full setup (see FIDELITIES in generate_and_submit_jobs.py).
+multi_fidelity = False
+eta = 3
+
+# Every shrink_every finished evaluations, estimate how much each parameter drives the RMSE (Sobol
+# indices on a GP surrogate of the results store) and freeze or narrow the ones that hardly matter.
+# Every round starts again from the full space. Inspect the indices with: python sensitivity.py results.db
+shrink_space = False
+shrink_every = 50
+
+# Energies of every finished (parameters, molecule, state) run, shared across restarts.
+# Import Grid_Search results with: python evaluation_cache.py evaluation_cache.db ../Grid_Search
+cache = EvaluationCache('evaluation_cache.db')
+templates = {fidelity: template_fingerprint(fidelity) for fidelity in FIDELITIES}
+
+# Per-combination RMSE/MAE and per-molecule results of every evaluation.
+# Query with: python results_store.py results.db top 10
+store = ResultsStore('results.db')
+stores = {fidelity: store if fidelity == 'full' else ResultsStore(f'results_{fidelity}.db') for fidelity in FIDELITIES}
+
+# Best full-fidelity result so far; a resumed run starts from the best combination already in the
+# store, so the early abort compares against it straight away.
 best_result = {'rmse': float('inf'), 'params': None}
-
-def save_results_summary(params, rmse, mae, comparison_results, filename='results_summary.txt'):
-    with open(filename, 'a') as f:
-        f.write(f"Combination: a1={params['a1']}, b1={params['b1']}, a2={params['a2']}, b2={params['b2']}\n")
-        f.write(f"RMSE: {rmse}, MAE: {mae}\n")
-        f.write("Per-molecule differences:\n")
-        for result in comparison_results:
-            f.write(f"{result['molecule']}: S1_diff={result['S1_diff']}, T1_diff={result['T1_diff']}, S1_T1_diff={result['S1_T1_diff']}\n")
-        f.write("\n")
-
-def objective(params):
-    global best_result
-    
-    a1 = round(params['a1'], 2)
-    b1 = round(params['b1'], 2)
-    a2 = round(params['a2'], 2)
-    b2 = round(params['b2'], 2)
-
-    print(f"Trying combination: a1={a1}, b1={b1}, a2={a2}, b2={b2}")
-
-    job_ids_s = generate_input_files_and_submit(molecules, a1, b1, a2, b2, state='S', max_jobs=max_jobs)
-    job_ids_t = generate_input_files_and_submit(molecules, a1, b1, a2, b2, state='T', max_jobs=max_jobs)
-
-    job_ids = job_ids_s + job_ids_t
-
-    print("Waiting for all jobs to complete and extracting data.")
-    extracted_data = extract_log_data(molecules, a1, b1, a2, b2, job_ids)
-
-    save_extracted_data_to_csv(extracted_data, 'extracted_data.csv')
+for result in store.top_k(1):
+    best_result = {'rmse': result['rmse'], 'params': {name: result[name] for name in space if name in result}}
+
+# Submit all inputs of a combination as one Slurm job array (one sbatch call) instead of one
+# gms_sbatch call per molecule and state. Needs the GAMESS command of the array tasks, which has
+# to be set in job_array.py (GAMESS_COMMAND) first.
+array_jobs = False
+
+# Start every new run from the converged orbitals of the nearest finished (a1, b1) point for the
+# same molecule (GUESS=MOREAD). Orbitals are read from the .dat files next to the logs or in $USERSCR.
+# Import earlier runs with: python orbital_cache.py orbital_cache.db . ../Grid_Search
+warm_start = True
+orbitals = OrbitalCache('orbital_cache.db') if warm_start else None
+
+# Per-job timings (sbatch, queue wait, run time, poll latency, GAMESS wall/CPU time, parsing) and
+# per-evaluation driver phases. Summarise with: python metrics.py metrics.db jobs molecule
+metrics = MetricsStore('metrics.db')
+
+# Once every molecule of a combination has been extracted, move its logs into one compressed
+# <combination>.logs.zip (parsed records and key lines included). Parsing, scoring and the error
+# checks read the archives transparently. Compaction runs on a background thread (about 25 s for
+# 20 large logs), so the driver keeps polling and refilling meanwhile; 'deflate' is faster than
+# 'lzma' but gives larger archives. Compact older trees with: python log_archive.py compact .
+compact_logs = False
+compact_compression = 'lzma'
+compactor = BackgroundCompactor(compact_compression) if compact_logs else None
+
+# Run against simulator.SimulatedScheduler instead of Slurm: jobs "run" locally with simulated
+# queue delays, runtimes and failures and leave synthetic MRSF logs behind, so the whole loop
+# can be tried offline.
+simulate = False
+
+# One tracker for every job of the run. Each log is parsed into the cache the moment its job
+# leaves the queue, so scoring a finished combination reads only cached energies.
+# Point the commands at local fakes to try the submission path without a cluster.
+if simulate:
+    tracker = JobTracker(SimulatedScheduler(max_running=70, queue_delay=(0.0, 300.0), failure_rate=0.02, speedup=600.0),
+                         min_interval=0.5, max_interval=5.0, metrics=metrics)
+else:
+    tracker = JobTracker(SlurmScheduler(squeue_command="squeue", scancel_command="scancel", sbatch_command="sbatch"),
+                         metrics=metrics)
+
+pool = JobPool(max_jobs, tracker)
+
+# The simulator runs no commands; real array tasks need job_array.GAMESS_COMMAND.
+array_command = "true  # simulated" if simulate else None
+if array_jobs and not simulate:
+    gamess_command_or_fail()
+
+# Failed runs are classified from their logs (scratch, DDI, timeout, SCF, ...) and transient failures
+# are requeued in the background with per-class limits and backoff (retry_engine.RETRY_POLICY).
+# Every failure is recorded in retry_history.db.
+retries = RetryEngine(tracker)
+
+def round_params(params):
+    return {name: round(value, 2) for name, value in params.items()}
+
+def submit_combination(params, fidelity='full'):
+    p = round_params(params)
+    print(f"Trying combination ({fidelity}): a1={p['a1']}, b1={p['b1']}, a2={p['a2']}, b2={p['b2']}")
+
+    callback = retries.watch(lambda job_id, info: stream_result(p, fidelity, job_id, info))
+    array_inputs = []
+    for state in ('S', 'T'):
+        missing = cache.missing_molecules(molecules, p, state, templates[fidelity])
+        if len(missing) < len(molecules):
+            print(f"Using cached {state} results for {len(molecules) - len(missing)} molecule(s).")
+        if missing and array_jobs:
+            for molecule in missing:
+                inp_file = write_input_file(molecule, p['a1'], p['b1'], p['a2'], p['b2'], state, fidelity=fidelity,
+                                            orbitals=orbitals)
+                if inp_file is not None:
+                    array_inputs.append((molecule, state, inp_file))
+        elif missing:
+            generate_input_files_and_submit(missing, p['a1'], p['b1'], p['a2'], p['b2'], state=state, fidelity=fidelity,
+                                            pool=pool, callback=callback, orbitals=orbitals)
+
+    if array_inputs:
+        job_name = f"a1_{p['a1']}_b1_{p['b1']}_a2_{p['a2']}_b2_{p['b2']}_{fidelity}"
+        pool.add(lambda: submit_inputs_as_array(array_inputs, tracker, callback, scheduler=tracker.scheduler,
+                                                job_name=job_name, gamess_command=array_command),
+                 slots=len(array_inputs))
+
+    # Everything is queued on the pool; run_async_optimization picks the jobs up as they are submitted.
+    return []
+
+def stream_result(p, fidelity, job_id, info):
+    log_file = info['inp_file'][:-len('.inp')] + '.log'
+    energies = cache_finished_log(cache, p, info['molecule'], info['spin_state'], templates[fidelity], log_file,
+                                  metrics=metrics, job_id=job_id, info=info, fidelity=fidelity)
+    if energies and orbitals is not None:
+        orbitals.harvest(info['molecule'], templates[fidelity], p, log_file)
+
+def score_combination(params, job_ids=(), fidelity='full'):
+    p = round_params(params)
+
+    print(f"Extracting data for combination ({fidelity}): a1={p['a1']}, b1={p['b1']}, a2={p['a2']}, b2={p['b2']}")
+    extracted_data = extract_log_data(molecules, p['a1'], p['b1'], p['a2'], p['b2'], list(job_ids),
+                                      cache=cache, template=templates[fidelity], fidelity=fidelity, tracker=tracker)
 
     comparison_results, valid_differences = compare_with_reference(extracted_data, S1_ref, T1_ref)
 
     rmse, mae = calculate_rmse_mae(valid_differences)
 
+    stores[fidelity].add_evaluation(p, rmse, mae, extracted_data, comparison_results)
+
+    if compactor is not None and len(extracted_data) == len(molecules):
+        compactor.submit(state_dir_path(p['a1'], p['b1'], p['a2'], p['b2'], 'S', fidelity)[:-len('_S')])
+
     if rmse is not None and mae is not None:
         print(f"RMSE: {rmse}, MAE: {mae}")
 
-        save_results_summary(params, rmse, mae, comparison_results)
-
-        if rmse < best_result['rmse']:
+        if fidelity == 'full' and rmse < best_result['rmse']:
             best_result['rmse'] = rmse
             best_result['params'] = params
 
@@ -68,14 +197,50 @@ def objective(params):
         print(f"Skipping combination due to positive S1-T1 values.")
         return {'loss': float('inf'), 'status': STATUS_OK}
 
-trials = Trials()
-
-best = fmin(objective, space, algo=tpe.suggest, max_evals=2500, trials=trials)
-
-with open('results_summary.txt', 'a') as f:
-    f.write(f"\nBest Parameters Found: a1={best_result['params']['a1']}, b1={best_result['params']['b1']}, ")
-    f.write(f"a2={best_result['params']['a2']}, b2={best_result['params']['b2']}\n")
-    f.write(f"Best RMSE: {best_result['rmse']}\n")
+def check_combination(params, fidelity='full'):
+    p = round_params(params)
+    tag = f"a1_{p['a1']}_b1_{p['b1']}_a2_{p['a2']}_b2_{p['b2']}"
+    state_dirs = {state: state_dir_path(p['a1'], p['b1'], p['a2'], p['b2'], state, fidelity) for state in ('S', 'T')}
+    rows = partial_results(molecules, p, state_dirs, cache=cache, template=templates[fidelity])
+    doomed = doomed_reason(rows, len(molecules), S1_ref, T1_ref, best_result['rmse'], reject_positive_gap)
+    if doomed is None:
+        return None
+    reason, loss = doomed
+    print(f"Aborting combination {tag}: {reason}")
+    stores[fidelity].add_evaluation(p, None, None, rows, status='aborted')
+    return {'loss': loss, 'status': STATUS_OK, 'aborted': reason}
+
+optimizer = AsyncGP(space, lie='mean') if optimizer_backend == 'gp' else AsyncTPE(space, lie='mean')
+
+# Every trial is checkpointed here; rerunning main.py after a crash resumes from this file.
+journal = TrialJournal('optimizer_state.db')
+
+def started(params, fidelity):
+    p = round_params(params)
+    return os.path.isdir(state_dir_path(p['a1'], p['b1'], p['a2'], p['b2'], 'S', fidelity))
+
+submit, finish, check = submit_combination, score_combination, check_combination
+if multi_fidelity:
+    ladder = SuccessiveHalving(list(FIDELITIES), submit_combination, score_combination, eta=eta,
+                               check=check_combination, evaluated=started)
+    for fidelity, fidelity_store in stores.items():
+        for result in fidelity_store.query():
+            ladder.record({name: result[name] for name in space}, fidelity, result['rmse'])
+    submit, finish, check = ladder.submit, ladder.finish, ladder.check
+
+shrinker = SpaceShrinker(space, lambda: list(store_history(store)), every=shrink_every) if shrink_space else None
+
+best_params, best_rmse = run_async_optimization(optimizer, submit, finish, max_evals=2500,
+                                                n_parallel=parallel_evals, tracker=tracker, journal=journal,
+                                                check=check if early_abort else None, metrics=metrics,
+                                                adapt=shrinker, pool=pool)
+if compactor is not None:
+    compactor.close()
+if best_params is not None and best_rmse <= best_result['rmse']:
+    best_result = {'rmse': best_rmse, 'params': best_params}
 
 print("Best parameters found:", best_result)
+print("Top combinations in the results store:")
+for result in store.top_k(5):
+    print(result)
 
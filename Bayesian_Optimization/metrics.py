@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+
+import os
+import sys
+import csv
+import sqlite3
+from time import time, monotonic
+from contextlib import contextmanager
+
+from log_parser import parse_log
+from evaluation_cache import params_key
+
+# Columns `jobs` can be grouped by.
+JOB_GROUPS = ("molecule", "partition", "params", "tid", "fidelity", "spin_state", "state")
+
+class MetricsStore:
+    """Where the wall time of a run goes, per job and per driver phase, in one SQLite file.
+
+    `jobs` has one row per finished job: when it was submitted, how long sbatch took, how
+    long it waited in the queue and ran as seen by the tracker, how long after its log was
+    last written the tracker noticed it had finished (poll latency), the GAMESS wall clock
+    and CPU times from the end of the log, its SCF iterations and how long the log took to
+    parse. `phases` has one row per timed step of the driver or the tracker (ask, submit,
+    squeue, check, finish, sleep).
+    """
+
+    def __init__(self, filename="metrics.db"):
+        self.filename = filename
+        self.connection = sqlite3.connect(filename)
+        self.connection.row_factory = sqlite3.Row
+        self.connection.executescript("""
+            CREATE TABLE IF NOT EXISTS jobs (
+                job_id TEXT NOT NULL,
+                slurm_id TEXT,
+                tid INTEGER,
+                params TEXT,
+                fidelity TEXT,
+                molecule TEXT,
+                spin_state TEXT,
+                partition TEXT,
+                state TEXT,
+                attempts INTEGER,
+                submitted REAL,
+                submit_seconds REAL,
+                queue_wait REAL,
+                run_time REAL,
+                poll_latency REAL,
+                gamess_wall REAL,
+                gamess_cpu REAL,
+                processes INTEGER,
+                scf_iterations INTEGER,
+                parse_seconds REAL,
+                recorded REAL
+            );
+            CREATE INDEX IF NOT EXISTS jobs_molecule ON jobs (molecule);
+            CREATE INDEX IF NOT EXISTS jobs_params ON jobs (params);
+            CREATE TABLE IF NOT EXISTS phases (
+                name TEXT NOT NULL,
+                tid INTEGER,
+                seconds REAL NOT NULL,
+                recorded REAL
+            );
+        """)
+
+    def record_job(self, job_id, info, record=None, parse_seconds=None, params=None, fidelity=None):
+        """Store the timings of one finished job from its tracker `info` and parsed log `record`."""
+        now, now_monotonic = time(), monotonic()
+        submitted, started, finished = info.get("submitted_at"), info.get("started_at"), info.get("finished_at")
+
+        poll_latency = None
+        log_file = info["inp_file"][:-len(".inp")] + ".log" if "inp_file" in info else None
+        if finished is not None and log_file is not None and os.path.exists(log_file):
+            poll_latency = now - (now_monotonic - finished) - os.path.getmtime(log_file)
+
+        cpu_times = record["cpu_times"] if record is not None else []
+        self.connection.execute("INSERT INTO jobs VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", (
+            job_id, info.get("slurm_id", job_id), info.get("tid"),
+            params_key(params) if isinstance(params, dict) else params, fidelity,
+            info.get("molecule"), info.get("spin_state"), info.get("partition"), info.get("state"),
+            info.get("attempts", 1),
+            now - (now_monotonic - submitted) if submitted is not None else None,
+            info.get("submit_seconds"),
+            started - submitted if started is not None and submitted is not None else None,
+            finished - started if finished is not None and started is not None else None,
+            poll_latency,
+            record["wall_time"] if record is not None else None,
+            sum(cpu_times) if cpu_times else None,
+            len(cpu_times) or None,
+            record["scf_iterations"] if record is not None else None,
+            parse_seconds, now))
+        self.connection.commit()
+
+    def watch(self, callback=None, params=None, fidelity=None):
+        """Wrap a JobTracker callback so every finished job's log is parsed and recorded first."""
+        def handle(job_id, info):
+            start = monotonic()
+            record = parse_log(info["inp_file"][:-len(".inp")] + ".log") if "inp_file" in info else None
+            self.record_job(job_id, info, record, monotonic() - start, params, fidelity)
+            if callback is not None:
+                callback(job_id, info)
+        return handle
+
+    def phase(self, name, seconds, tid=None):
+        self.connection.execute("INSERT INTO phases VALUES (?, ?, ?, ?)", (name, tid, seconds, time()))
+        self.connection.commit()
+
+    def jobs_by(self, group):
+        """Job counts, mean timings and total CPU time per `group` (one of JOB_GROUPS)."""
+        if group not in JOB_GROUPS:
+            raise ValueError(f"Cannot group jobs by {group}; use one of {', '.join(JOB_GROUPS)}")
+        sql = (f"SELECT {group}, COUNT(*) AS jobs, AVG(submit_seconds) AS submit_seconds, "
+               "AVG(queue_wait) AS queue_wait, AVG(run_time) AS run_time, AVG(poll_latency) AS poll_latency, "
+               "AVG(gamess_wall) AS gamess_wall, SUM(gamess_cpu) AS gamess_cpu, AVG(scf_iterations) AS scf_iterations, "
+               f"AVG(parse_seconds) AS parse_seconds FROM jobs GROUP BY {group} ORDER BY {group}")
+        return [dict(row) for row in self.connection.execute(sql)]
+
+    def phases_by(self, group="name"):
+        """Count, total and mean seconds per phase name (or per evaluation with group='tid')."""
+        if group not in ("name", "tid"):
+            raise ValueError(f"Cannot group phases by {group}; use name or tid")
+        sql = (f"SELECT {group}, COUNT(*) AS count, SUM(seconds) AS total, AVG(seconds) AS mean "
+               f"FROM phases GROUP BY {group} ORDER BY total DESC")
+        return [dict(row) for row in self.connection.execute(sql)]
+
+@contextmanager
+def timed(metrics, name, tid=None):
+    """Record the time spent in the `with` block as phase `name` (nothing is recorded if `metrics` is None)."""
+    start = monotonic()
+    try:
+        yield
+    finally:
+        if metrics is not None:
+            metrics.phase(name, monotonic() - start, tid)
+
+def print_rows(rows):
+    for row in rows:
+        print("  ".join(f"{key}={value:.3f}" if isinstance(value, float) else f"{key}={value}"
+                        for key, value in row.items()))
+
+if __name__ == "__main__":
+    # Usage: metrics.py <metrics.db> jobs [molecule|partition|params|tid|fidelity|spin_state|state]
+    #        metrics.py <metrics.db> phases [name|tid]
+    #        metrics.py <metrics.db> export <jobs.csv>
+    metrics = MetricsStore(sys.argv[1])
+    command = sys.argv[2] if len(sys.argv) > 2 else "jobs"
+    if command == "jobs":
+        print_rows(metrics.jobs_by(sys.argv[3] if len(sys.argv) > 3 else "molecule"))
+    elif command == "phases":
+        print_rows(metrics.phases_by(sys.argv[3] if len(sys.argv) > 3 else "name"))
+    elif command == "export":
+        cursor = metrics.connection.execute("SELECT * FROM jobs ORDER BY recorded")
+        with open(sys.argv[3], "w", newline="") as output_file:
+            writer = csv.writer(output_file)
+            writer.writerow([column[0] for column in cursor.description])
+            writer.writerows(cursor)
+        print(f"Exported the job metrics to {sys.argv[3]}")
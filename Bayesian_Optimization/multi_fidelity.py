@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+
+import math
+
+from hyperopt import STATUS_OK
+
+from evaluation_cache import params_key
+
+class SuccessiveHalving:
+    """Asynchronous successive halving over a ladder of fidelities, cheapest first.
+
+    Every parameter set is first evaluated on the cheapest rung. When it finishes there it is
+    promoted to the next rung if its loss is among the best 1/eta of everything finished on
+    that rung so far; otherwise its evaluation stops. A stopped evaluation reports its loss
+    shifted onto the full-fidelity scale by the mean difference seen on parameter sets that
+    were evaluated on both rungs, so the optimizer can rank it against full-fidelity results.
+
+    `submit(params, fidelity)`, `finish(params, fidelity)` and `check(params, fidelity)` do the
+    work of one rung, like the callbacks of async_optimizer.run_async_optimization, which
+    this class provides in turn. `evaluated(params, fidelity)` tells whether a rung was
+    already started for a parameter set, so a restarted run carries on where it stopped.
+    """
+
+    def __init__(self, fidelities, submit, finish, eta=3, check=None, evaluated=None):
+        self.fidelities = list(fidelities)
+        self.eta = eta
+        self.submit_rung = submit
+        self.finish_rung = finish
+        self.check_rung = check
+        self.evaluated = evaluated
+        self.rungs = {}
+        self.losses = {fidelity: {} for fidelity in self.fidelities}
+
+    def rung_of(self, params):
+        key = params_key(params)
+        if key not in self.rungs:
+            self.rungs[key] = 0
+            if self.evaluated is not None:
+                for rung, fidelity in enumerate(self.fidelities):
+                    if self.evaluated(params, fidelity):
+                        self.rungs[key] = rung
+        return self.rungs[key]
+
+    def record(self, params, fidelity, loss):
+        """Add a finished result to a rung, e.g. from a previous run's results store."""
+        self.losses[fidelity][params_key(params)] = loss if loss is not None else float('inf')
+
+    def promotable(self, params, fidelity):
+        finished = sorted(self.losses[fidelity].values())
+        loss = self.losses[fidelity][params_key(params)]
+        if not math.isfinite(loss):
+            return False
+        return finished.index(loss) < math.ceil(len(finished) / self.eta)
+
+    def offset(self, fidelity):
+        """Mean full-fidelity minus `fidelity` loss over the parameter sets run on both."""
+        top = self.losses[self.fidelities[-1]]
+        pairs = [top[key] - loss for key, loss in self.losses[fidelity].items()
+                 if key in top and math.isfinite(top[key]) and math.isfinite(loss)]
+        return sum(pairs) / len(pairs) if pairs else 0.0
+
+    def submit(self, params):
+        return self.submit_rung(params, self.fidelities[self.rung_of(params)])
+
+    def check(self, params):
+        rung = self.rung_of(params)
+        if self.check_rung is None or rung < len(self.fidelities) - 1:
+            return None
+        return self.check_rung(params, self.fidelities[rung])
+
+    def finish(self, params):
+        """Score the current rung; promote the parameter set or return its final result."""
+        rung = self.rung_of(params)
+        fidelity = self.fidelities[rung]
+        result = self.finish_rung(params, fidelity)
+        if not isinstance(result, dict):
+            result = {'loss': result, 'status': STATUS_OK}
+        result = dict(result, fidelity=fidelity)
+        self.record(params, fidelity, result['loss'])
+
+        if rung == len(self.fidelities) - 1:
+            return result
+        if self.promotable(params, fidelity):
+            self.rungs[params_key(params)] = rung + 1
+            print(f"Promoting {params_key(params)} from {fidelity} to {self.fidelities[rung + 1]}.")
+            return dict(result, promoted=self.fidelities[rung + 1])
+
+        loss = result['loss']
+        if math.isfinite(loss):
+            result['loss'] = loss + self.offset(fidelity)
+        result.update(screened=True, screened_loss=loss)
+        return result
@@ -1,42 +0,0 @@
-#!/bin/bash
-
-awk -v RS='\r\n' -v name="$1"   '{
-    line[NR] = $0
-    if($4==name)
-        {
-        tmp = line[NR-1]
-        getline
-        for(i=1;i<=tmp;i++)
-            {
-                if($1=="C")
-                        {
-                        printf(" %2s 6.0 %14.12f %14.12f %14.12f\n", $1"\t",$2"\t",$3"\t",$4);
-                        }
-                if($1=="H")
-                        {
-                        printf(" %2s 1.0 %14.12f %14.12f %14.12f\n", $1"\t",$2"\t",$3"\t",$4);
-                        }
-                if($1=="N")
-                        {
-                        printf(" %2s 7.0 %14.12f %14.12f %14.12f\n", $1"\t",$2"\t",$3"\t",$4);
-                        }
-                if($1=="O")
-                        {
-                        printf(" %2s 8.0 %14.12f %14.12f %14.12f\n", $1"\t",$2"\t",$3"\t",$4);
-                        }
-                if($1=="S")
-                        {
-                        printf(" %2s 16.0 %14.12f %14.12f %14.12f\n", $1"\t",$2"\t",$3"\t",$4);
-                        }
-                if($1=="B")
-                        {
-                        printf(" %2s 5.0 %14.12f %14.12f %14.12f\n", $1"\t",$2"\t",$3"\t",$4);
-                        }
-                if($1=="F")
-                        {
-                        printf(" %2s 9.0 %14.12f %14.12f %14.12f\n", $1"\t",$2"\t",$3"\t",$4);
-                        }
-            getline
-            }
-        }
-        }' "$2"
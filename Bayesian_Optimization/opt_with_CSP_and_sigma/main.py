@@ -1,10 +1,30 @@
 #!/usr/bin/env python3
 
-from hyperopt import fmin, tpe, hp, STATUS_OK, Trials
-from generate_and_submit_jobs import generate_input_files_and_submit
-from extract_log_data import extract_log_data, save_extracted_data_to_csv
+import os
+import sys
+
+# The 8-parameter search runs on the Bayesian_Optimization engine; only the space and the run
+# files (job directories, databases) are its own.
+ENGINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, ENGINE)
+
+from hyperopt import hp, STATUS_OK
+from generate_and_submit_jobs import generate_input_files_and_submit, template_fingerprint, state_dir_path, EXTRA_PARAMETERS
+from evaluation_cache import EvaluationCache
+from async_optimizer import AsyncTPE, run_async_optimization
+from gp_optimizer import AsyncGP
+from trial_journal import TrialJournal
+from extract_log_data import extract_log_data, cache_finished_log
+from job_tracker import JobTracker, JobPool, SlurmScheduler
 from compare_results import compare_with_reference, S1_ref, T1_ref, calculate_rmse_mae
-import csv
+from results_store import ResultsStore
+from early_abort import partial_results, doomed_reason
+from retry_engine import RetryEngine
+from metrics import MetricsStore
+from simulator import SimulatedScheduler
+from log_archive import BackgroundCompactor
+from sensitivity import SpaceShrinker
+from warm_start import prior_evaluations, store_history
 
 space = {
     'a1': hp.uniform('a1', 0.45, 0.55),
@@ -15,78 +35,146 @@ space = {
     'ov': hp.uniform('ov', 0.40, 0.75),
     'cv': hp.uniform('cv', 0.40, 0.75),
     'mu': hp.uniform('mu', 0.25, 0.40),
-
 }
 
 molecules = ["Heptazine", "Cyclazine", "Molecule3", "Molecule4", "Molecule5",
              "Molecule6", "Molecule7", "Molecule8", "Molecule9", "Molecule10"]
 
-# Define max jobs for parallel submissions(better keep it 20)
+parallel_evals = 4
+# Jobs in the queue at once, across all combinations and both states (see ../main.py).
 max_jobs = 20
-
+early_abort = False
+reject_positive_gap = False
+
+# 'tpe' (hyperopt) or 'gp' (Gaussian process with expected improvement, gp_optimizer.py).
+optimizer_backend = 'tpe'
+
+# Seed the optimizer with what the 4-parameter run already knows: every combination in its
+# results store and every parameter set with complete energies in its evaluation cache (Grid_Search
+# trees imported with evaluation_cache.py included), placed at co=ov=cv=0.5 and mu=0.33
+# (generate_and_submit_jobs.EXTRA_PARAMETERS). The seeds do not count towards max_evals.
+# See what would be seeded with: python ../warm_start.py --store ../results.db --cache ../evaluation_cache.db
+history_stores = [os.path.join(ENGINE, 'results.db')]
+history_caches = [os.path.join(ENGINE, 'evaluation_cache.db')]
+
+# Freeze or narrow the parameters that hardly move the RMSE as results come in (see ../main.py);
+# co/ov/cv/mu are the likely candidates. Inspect the indices with: python ../sensitivity.py results.db
+shrink_space = False
+shrink_every = 50
+
+cache = EvaluationCache('evaluation_cache.db')
+# co, ov and cv are optimized, so the inputs carry spcp(1)=co,ov,cv and have a fingerprint of their own.
+template = template_fingerprint(extra=EXTRA_PARAMETERS)
+store = ResultsStore('results.db')
+
+# Best full-fidelity result so far; a resumed run starts from the best combination already in the
+# store, so the early abort compares against it straight away.
 best_result = {'rmse': float('inf'), 'params': None}
-
-def save_results_summary(params, rmse, mae, comparison_results, filename='results_summary.txt'):
-    with open(filename, 'a') as f:
-        f.write(f"Combination: a1={params['a1']}, b1={params['b1']}, a2={params['a2']}, b2={params['b2']},, co={params['co']}, ov={params['ov']}, cv={params['cv']}, mu={params['mu']}\ \n")
-        f.write(f"RMSE: {rmse}, MAE: {mae}\n")
-        f.write("Per-molecule differences:\n")
-        for result in comparison_results:
-            f.write(f"{result['molecule']}: S1_diff={result['S1_diff']}, T1_diff={result['T1_diff']}, S1_T1_diff={result['S1_T1_diff']}\n")
-        f.write("\n")
-
-def objective(params):
+for result in store.top_k(1):
+    best_result = {'rmse': result['rmse'], 'params': {name: result[name] for name in space if name in result}}
+metrics = MetricsStore('metrics.db')
+
+# Compact the logs of every fully extracted combination on a background thread (see ../main.py).
+compact_logs = False
+compactor = BackgroundCompactor('lzma') if compact_logs else None
+
+# Run against simulator.SimulatedScheduler instead of Slurm (see ../main.py).
+simulate = False
+
+if simulate:
+    tracker = JobTracker(SimulatedScheduler(max_running=70, queue_delay=(0.0, 300.0), failure_rate=0.02, speedup=600.0),
+                         min_interval=0.5, max_interval=5.0, metrics=metrics)
+else:
+    tracker = JobTracker(SlurmScheduler(squeue_command="squeue", scancel_command="scancel", sbatch_command="sbatch"),
+                         metrics=metrics)
+
+pool = JobPool(max_jobs, tracker)
+retries = RetryEngine(tracker)
+
+def round_params(params):
+    return {name: round(value, 2) for name, value in params.items()}
+
+def extra_of(p):
+    return {name: p[name] for name in EXTRA_PARAMETERS if name in p}
+
+def describe(p):
+    return ", ".join(f"{name}={value}" for name, value in p.items())
+
+def submit_combination(params):
+    p = round_params(params)
+    print(f"Trying combination: {describe(p)}")
+
+    def stream_result(job_id, info):
+        cache_finished_log(cache, p, info['molecule'], info['spin_state'], template, info['inp_file'][:-len('.inp')] + '.log',
+                           metrics=metrics, job_id=job_id, info=info, fidelity='full')
+
+    callback = retries.watch(stream_result)
+    for state in ('S', 'T'):
+        missing = cache.missing_molecules(molecules, p, state, template)
+        if len(missing) < len(molecules):
+            print(f"Using cached {state} results for {len(molecules) - len(missing)} molecule(s).")
+        if missing:
+            generate_input_files_and_submit(missing, p['a1'], p['b1'], p['a2'], p['b2'], state=state, pool=pool,
+                                            callback=callback, extra=extra_of(p))
+    return []
+
+def score_combination(params):
     global best_result
-    a1 = round(params['a1'], 2)
-    b1 = round(params['b1'], 2)
-    a2 = round(params['a2'], 2)
-    b2 = round(params['b2'], 2)
-    co = round(params['co'], 2)
-    ov = round(params['ov'], 2)
-    cv = round(params['cv'], 2)
-    mu = round(params['mu'], 2)
-
-
-    print(f"Trying combination: a1={a1}, b1={b1}, a2={a2}, b2={b2}, co={co}, ov={ov}, cv={cv}, mu={mu}")
-
-    job_ids_s = generate_input_files_and_submit(molecules, a1, b1, a2, b2, co, ov, cv, mu, state='S', max_jobs=max_jobs)
-    job_ids_t = generate_input_files_and_submit(molecules, a1, b1, a2, b2, co, ov, cv, mu, state='T', max_jobs=max_jobs)
-
-    job_ids = job_ids_s + job_ids_t
-
-    print("Waiting for all jobs to complete and extracting data.")
-    extracted_data = extract_log_data(molecules, a1, b1, a2, b2, co, ov, cv, mu, job_ids)
 
-    save_extracted_data_to_csv(extracted_data, 'extracted_data.csv')
+    p = round_params(params)
+    print(f"Extracting data for combination: {describe(p)}")
+    extracted_data = extract_log_data(molecules, p['a1'], p['b1'], p['a2'], p['b2'], [], cache=cache, template=template,
+                                      tracker=tracker, extra=extra_of(p))
 
     comparison_results, valid_differences = compare_with_reference(extracted_data, S1_ref, T1_ref)
-
     rmse, mae = calculate_rmse_mae(valid_differences)
+    store.add_evaluation(p, rmse, mae, extracted_data, comparison_results)
+
+    if compactor is not None and len(extracted_data) == len(molecules):
+        compactor.submit(state_dir_path(p['a1'], p['b1'], p['a2'], p['b2'], 'S', extra=extra_of(p))[:-len('_S')])
 
     if rmse is not None and mae is not None:
         print(f"RMSE: {rmse}, MAE: {mae}")
-
-        save_results_summary(params, rmse, mae, comparison_results)
-
         if rmse < best_result['rmse']:
-            best_result['rmse'] = rmse
-            best_result['params'] = params
-
+            best_result = {'rmse': rmse, 'params': params}
         return {'loss': rmse, 'status': STATUS_OK}
     else:
         print(f"Skipping combination due to positive S1-T1 values.")
         return {'loss': float('inf'), 'status': STATUS_OK}
 
-trials = Trials()
-
-best = fmin(objective, space, algo=tpe.suggest, max_evals=1, trials=trials)
-
-with open('results_summary.txt', 'a') as f:
-    f.write(f"\nBest Parameters Found: a1={best_result['params']['a1']}, b1={best_result['params']['b1']}, ")
-    f.write(f"a2={best_result['params']['a2']}, b2={best_result['params']['b2']}\n")
-    f.write(f"co={best_result['params']['co']}, ov={best_result['params']['ov']}\n")    
-    f.write(f"cv={best_result['params']['cv']}, mu={best_result['params']['mu']}\n")     
-    f.write(f"Best RMSE: {best_result['rmse']}\n")
+def check_combination(params):
+    p = round_params(params)
+    state_dirs = {state: state_dir_path(p['a1'], p['b1'], p['a2'], p['b2'], state, extra=extra_of(p)) for state in ('S', 'T')}
+    rows = partial_results(molecules, p, state_dirs, cache=cache, template=template)
+    doomed = doomed_reason(rows, len(molecules), S1_ref, T1_ref, best_result['rmse'], reject_positive_gap)
+    if doomed is None:
+        return None
+    reason, loss = doomed
+    print(f"Aborting combination {describe(p)}: {reason}")
+    store.add_evaluation(p, None, None, rows, status='aborted')
+    return {'loss': loss, 'status': STATUS_OK, 'aborted': reason}
+
+optimizer = AsyncGP(space, lie='mean') if optimizer_backend == 'gp' else AsyncTPE(space, lie='mean')
+
+# Every trial is checkpointed here; rerunning main.py after a crash resumes from this file.
+journal = TrialJournal('optimizer_state.db')
+
+prior = prior_evaluations(space, stores=[ResultsStore(f) for f in history_stores if os.path.exists(f)],
+                          caches=[EvaluationCache(f) for f in history_caches if os.path.exists(f)],
+                          molecules=molecules, S1_ref=S1_ref, T1_ref=T1_ref)
+
+shrinker = SpaceShrinker(space, lambda: list(store_history(store)), every=shrink_every) if shrink_space else None
+
+best_params, best_rmse = run_async_optimization(optimizer, submit_combination, score_combination, max_evals=2500,
+                                                n_parallel=parallel_evals, tracker=tracker, journal=journal,
+                                                check=check_combination if early_abort else None, metrics=metrics,
+                                                prior=prior, adapt=shrinker, pool=pool)
+if compactor is not None:
+    compactor.close()
+if best_params is not None and best_rmse <= best_result['rmse']:
+    best_result = {'rmse': best_rmse, 'params': best_params}
 
 print("Best parameters found:", best_result)
-
+print("Top combinations in the results store:")
+for result in store.top_k(5):
+    print(result)
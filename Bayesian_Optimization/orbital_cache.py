@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+
+import os
+import re
+import sys
+import json
+import math
+import sqlite3
+
+from evaluation_cache import params_key, parse_state_dir, input_fingerprint
+
+VEC_PATTERN = re.compile(r"^ ?\$VEC\s*\n(.*?)^ ?\$END", re.M | re.S | re.I)
+
+# Only the ground-state functional parameters change the ROHF orbitals; mralp/mrbet enter the
+# response step. The triplet (MULT=3) ROHF reference is the same for the S and T runs.
+ORBITAL_PARAMETERS = ("a1", "b1")
+
+def read_vec(dat_file):
+    """First $VEC group (the converged SCF orbitals) of a GAMESS .dat file, or None."""
+    try:
+        with open(dat_file, "r", errors="replace") as f:
+            match = VEC_PATTERN.search(f.read())
+    except OSError:
+        return None
+    return match.group(1) if match else None
+
+def count_orbitals(vec_body):
+    """Number of orbitals in a $VEC body: each orbital restarts the 3-digit line counter at 1."""
+    count = 0
+    for line in vec_body.splitlines():
+        if len(line) >= 5 and line[2:5].strip() == "1":
+            count += 1
+    return count
+
+def find_dat(log_file, search_dirs=()):
+    """The .dat file of a run: next to its log, or in $USERSCR / `search_dirs` where GAMESS punches it."""
+    name = os.path.basename(log_file)[:-len(".log")] + ".dat"
+    dirs = [os.path.dirname(log_file)] + list(search_dirs)
+    if os.environ.get("USERSCR"):
+        dirs.append(os.environ["USERSCR"])
+    for directory in dirs:
+        path = os.path.join(directory, name)
+        if os.path.exists(path):
+            return path
+    return None
+
+def guess_groups(vec_body):
+    """($GUESS line, $VEC group) to add to an input that should start from `vec_body`."""
+    guess = f" $GUESS GUESS=MOREAD NORB={count_orbitals(vec_body)} $END\n"
+    return guess, " $VEC\n" + vec_body + " $END\n"
+
+class OrbitalCache:
+    """Converged SCF orbitals per (molecule, template, parameters), for MOREAD warm starts.
+
+    `nearest` returns the stored orbitals whose ORBITAL_PARAMETERS are closest to a new
+    parameter set, so each new run starts from the orbitals of its nearest finished neighbour.
+    """
+
+    def __init__(self, filename="orbital_cache.db"):
+        self.filename = filename
+        self.connection = sqlite3.connect(filename)
+        self.connection.execute("""
+            CREATE TABLE IF NOT EXISTS orbitals (
+                molecule TEXT NOT NULL,
+                template TEXT NOT NULL,
+                params TEXT NOT NULL,
+                values_json TEXT NOT NULL,
+                vec TEXT NOT NULL,
+                source TEXT,
+                PRIMARY KEY (molecule, template, params)
+            )""")
+        self.connection.commit()
+
+    def put(self, molecule, template, params, vec_body, source=None):
+        params = {name: params[name] for name in ORBITAL_PARAMETERS if name in params}
+        self.connection.execute("INSERT OR REPLACE INTO orbitals VALUES (?, ?, ?, ?, ?, ?)",
+                                (molecule, template, params_key(params), json.dumps(params), vec_body, source))
+        self.connection.commit()
+
+    def nearest(self, molecule, template, params, max_distance=None):
+        """(stored params, $VEC body) closest to `params` for this molecule and template, or None."""
+        best, best_distance = None, math.inf
+        rows = self.connection.execute("SELECT values_json, vec FROM orbitals WHERE molecule=? AND template=?",
+                                       (molecule, template))
+        for values_json, vec in rows:
+            values = json.loads(values_json)
+            distance = math.sqrt(sum((float(params[name]) - values[name]) ** 2
+                                     for name in ORBITAL_PARAMETERS if name in values and name in params))
+            if distance < best_distance:
+                best, best_distance = (values, vec), distance
+        if best is None or (max_distance is not None and best_distance > max_distance):
+            return None
+        return best
+
+    def harvest(self, molecule, template, params, log_file, search_dirs=()):
+        """Store the orbitals of a finished run if its .dat file can be found; return True if stored."""
+        dat_file = find_dat(log_file, search_dirs)
+        vec_body = read_vec(dat_file) if dat_file else None
+        if not vec_body:
+            return False
+        self.put(molecule, template, params, vec_body, source=dat_file)
+        return True
+
+    def import_tree(self, root, search_dirs=()):
+        """Harvest the orbitals of every run with a .dat file under `*_S`/`*_T` directories below `root`."""
+        added = 0
+        for dirpath, dirnames, filenames in os.walk(root):
+            dirnames.sort()
+            parsed = parse_state_dir(dirpath)
+            if parsed is None:
+                continue
+            params, _ = parsed
+            suffix = f"_{os.path.basename(dirpath)}.inp"
+            for filename in sorted(filenames):
+                if not filename.endswith(suffix):
+                    continue
+                inp_file = os.path.join(dirpath, filename)
+                with open(inp_file) as f:
+                    template = input_fingerprint(f.read())
+                if self.harvest(filename[:-len(suffix)], template, params, inp_file[:-len(".inp")] + ".log", search_dirs):
+                    added += 1
+        return added
+
+if __name__ == "__main__":
+    # Usage: orbital_cache.py <orbital_cache.db> <directory> [<directory> ...]
+    cache = OrbitalCache(sys.argv[1])
+    for directory in sys.argv[2:]:
+        print(f"Imported orbitals of {cache.import_tree(directory)} run(s) from {directory}")
@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+
+import os
+import csv
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+
+from log_parser import parse_log, list_logs, HARTREE_TO_EV
+from evaluation_cache import parse_state_dir
+from generate_and_submit_jobs import FIDELITIES
+
+def state_dir_logs(state_dir):
+    """Yield (params, state, molecule, log_file) for the logs in one `*_S`/`*_T` directory,
+    including the ones compacted into the evaluation's archive."""
+    parsed = parse_state_dir(state_dir)
+    if parsed is None or not os.path.isdir(state_dir):
+        return
+    params, state = parsed
+    suffix = f"_{os.path.basename(state_dir.rstrip(os.sep))}.log"
+    for filename in list_logs(state_dir):
+        if filename.endswith(suffix):
+            yield params, state, filename[:-len(suffix)], os.path.join(state_dir, filename)
+
+def collect_logs(paths):
+    """Find the logs for every path: a state directory, an evaluation prefix or a whole tree.
+
+    An evaluation prefix is a directory name without the state suffix, e.g.
+    'a1_0.5_b1_-0.2_a2_0.65_b2_-0.1', and selects both its _S and _T directories. Walking a
+    tree skips the directories of lower-fidelity runs ('screen', ...) unless they are given
+    directly, so their results are not mixed with the full-fidelity ones.
+    """
+    entries = []
+    for path in paths:
+        path = path.rstrip(os.sep)
+        if parse_state_dir(path) is not None and os.path.isdir(path):
+            entries.extend(state_dir_logs(path))
+        elif os.path.isdir(f"{path}_S") or os.path.isdir(f"{path}_T"):
+            for state in ("S", "T"):
+                entries.extend(state_dir_logs(f"{path}_{state}"))
+        else:
+            for dirpath, dirnames, _ in os.walk(path):
+                dirnames[:] = sorted(name for name in dirnames if name not in FIDELITIES)
+                entries.extend(state_dir_logs(dirpath))
+    return entries
+
+def parse_logs_parallel(log_files, workers=None, chunksize=16):
+    """Parse `log_files` across a process pool and return the records in input order."""
+    if workers == 1 or len(log_files) < 2:
+        return [parse_log(log_file) for log_file in log_files]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(parse_log, log_files, chunksize=chunksize))
+
+def combine_records(entries, records):
+    """Pair singlet and triplet records into extract_log_data-style rows.
+
+    Rows are sorted by parameter values and molecule, so the output does not depend on the
+    order in which the workers finished. Returns (rows, problems).
+    """
+    by_key = {}
+    for (params, state, molecule, log_file), record in zip(entries, records):
+        key = (tuple(params.items()), molecule)
+        by_key.setdefault(key, {})[state] = record
+
+    rows = []
+    problems = []
+    for (params, molecule), states in sorted(by_key.items(), key=lambda item: (tuple(v for _, v in item[0][0]), item[0][1])):
+        record_s, record_t = states.get("S"), states.get("T")
+        if not (record_s and record_s["completed"] and 1 in record_s["energies"] and 2 in record_s["energies"]):
+            problems.append((dict(params), molecule, "S"))
+            continue
+        if not (record_t and record_t["completed"] and 1 in record_t["energies"]):
+            problems.append((dict(params), molecule, "T"))
+            continue
+
+        s0 = record_s["energies"][1]
+        S1 = (record_s["energies"][2] - s0) * HARTREE_TO_EV
+        T1 = (record_t["energies"][1] - s0) * HARTREE_TO_EV
+        row = {"molecule": molecule}
+        row.update(dict(params))
+        row.update({"S1": S1, "T1": T1, "S1-T1": S1 - T1})
+        rows.append(row)
+    return rows, problems
+
+def extract_parallel(paths, workers=None):
+    entries = collect_logs(paths)
+    print(f"Parsing {len(entries)} log(s) with {workers or os.cpu_count()} worker(s)...")
+    records = parse_logs_parallel([entry[3] for entry in entries], workers=workers)
+    return combine_records(entries, records)
+
+def save_rows_to_csv(rows, filename):
+    if not rows:
+        print("[WARNING] No data to save!")
+        return
+    fieldnames = list(rows[0].keys())
+    for row in rows:
+        fieldnames.extend(key for key in row if key not in fieldnames)
+    with open(filename, 'w', newline='') as output_file:
+        dict_writer = csv.DictWriter(output_file, fieldnames=fieldnames)
+        dict_writer.writeheader()
+        dict_writer.writerows(rows)
+    print(f"Data successfully saved to {filename}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Extract S1/T1 from MRSF logs in parallel.")
+    parser.add_argument("paths", nargs="+", help="state directories, evaluation prefixes or directory trees")
+    parser.add_argument("-j", "--workers", type=int, default=None, help="number of worker processes")
+    parser.add_argument("-o", "--output", default="extracted_data_all.csv")
+    args = parser.parse_args()
+
+    rows, problems = extract_parallel(args.paths, workers=args.workers)
+    for params, molecule, state in problems:
+        print(f"[WARNING] Missing or unfinished {state} log for {molecule} at {params}")
+    save_rows_to_csv(rows, args.output)
@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+
+import re
+import sys
+import csv
+import sqlite3
+from time import time
+
+from evaluation_cache import params_key
+
+class ResultsStore:
+    """Indexed SQLite store of every scored combination and its per-molecule results.
+
+    One row per combination in `combinations` (a REAL column per parameter, added on first
+    use, plus RMSE/MAE) and one row per combination x molecule in `molecule_results`.
+    Parameters, RMSE and molecule are indexed, so top-k and range queries never scan.
+    """
+
+    def __init__(self, filename="results.db"):
+        self.filename = filename
+        self.connection = sqlite3.connect(filename)
+        self.connection.row_factory = sqlite3.Row
+        self.connection.executescript("""
+            CREATE TABLE IF NOT EXISTS combinations (
+                id INTEGER PRIMARY KEY,
+                params TEXT NOT NULL UNIQUE,
+                rmse REAL,
+                mae REAL,
+                status TEXT NOT NULL,
+                created REAL
+            );
+            CREATE INDEX IF NOT EXISTS combinations_rmse ON combinations (rmse);
+            CREATE TABLE IF NOT EXISTS molecule_results (
+                combination_id INTEGER NOT NULL REFERENCES combinations (id),
+                molecule TEXT NOT NULL,
+                S1 REAL,
+                T1 REAL,
+                gap REAL,
+                S1_diff REAL,
+                T1_diff REAL,
+                S1_T1_diff REAL,
+                PRIMARY KEY (combination_id, molecule)
+            );
+            CREATE INDEX IF NOT EXISTS molecule_results_molecule ON molecule_results (molecule, S1_T1_diff);
+        """)
+        self.param_names = [row["name"][2:] for row in self.connection.execute("PRAGMA table_info(combinations)")
+                            if row["name"].startswith("p_")]
+
+    def ensure_params(self, names):
+        for name in names:
+            if name in self.param_names:
+                continue
+            if not re.match(r"^\w+$", name):
+                raise ValueError(f"Invalid parameter name: {name}")
+            self.connection.execute(f"ALTER TABLE combinations ADD COLUMN p_{name} REAL")
+            self.connection.execute(f"CREATE INDEX IF NOT EXISTS combinations_p_{name} ON combinations (p_{name})")
+            self.param_names.append(name)
+
+    def add_evaluation(self, params, rmse, mae, extracted_data, comparison_results=(), status=None):
+        """Insert or replace one scored combination; `rmse` None marks a rejected combination."""
+        if status is None:
+            status = "ok" if rmse is not None else "rejected"
+        params = {name: round(float(value), 2) + 0.0 for name, value in params.items()}
+        self.ensure_params(params)
+        key = params_key(params)
+        columns = ", ".join(f"p_{name}" for name in params)
+        placeholders = ", ".join("?" for _ in params)
+        with self.connection:
+            self.connection.execute("DELETE FROM molecule_results WHERE combination_id IN "
+                                    "(SELECT id FROM combinations WHERE params=?)", (key,))
+            self.connection.execute("DELETE FROM combinations WHERE params=?", (key,))
+            cursor = self.connection.execute(
+                f"INSERT INTO combinations (params, rmse, mae, status, created, {columns}) "
+                f"VALUES (?, ?, ?, ?, ?, {placeholders})",
+                (key, rmse, mae, status, time(), *params.values()))
+            combination_id = cursor.lastrowid
+
+            diffs = {result["molecule"]: result for result in comparison_results}
+            self.connection.executemany(
+                "INSERT INTO molecule_results VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                [(combination_id, entry["molecule"], float(entry["S1"]), float(entry["T1"]), float(entry["S1-T1"]),
+                  diffs.get(entry["molecule"], {}).get("S1_diff"), diffs.get(entry["molecule"], {}).get("T1_diff"),
+                  diffs.get(entry["molecule"], {}).get("S1_T1_diff"))
+                 for entry in extracted_data])
+        return combination_id
+
+    def combination_dict(self, row):
+        result = {name: row[f"p_{name}"] for name in self.param_names if row[f"p_{name}"] is not None}
+        result.update(rmse=row["rmse"], mae=row["mae"], status=row["status"])
+        return result
+
+    def top_k(self, k=10):
+        rows = self.connection.execute(
+            "SELECT * FROM combinations WHERE rmse IS NOT NULL ORDER BY rmse LIMIT ?", (k,))
+        return [self.combination_dict(row) for row in rows]
+
+    def query(self, ranges=None, max_rmse=None, limit=None):
+        """Combinations with every parameter inside `ranges` ({name: (low, high)}), best first."""
+        clauses, values = [], []
+        for name, (low, high) in (ranges or {}).items():
+            if name not in self.param_names:
+                return []
+            clauses.append(f"p_{name} BETWEEN ? AND ?")
+            values += [low, high]
+        if max_rmse is not None:
+            clauses.append("rmse <= ?")
+            values.append(max_rmse)
+        sql = "SELECT * FROM combinations"
+        if clauses:
+            sql += " WHERE " + " AND ".join(clauses)
+        sql += " ORDER BY rmse IS NULL, rmse"
+        if limit is not None:
+            sql += " LIMIT ?"
+            values.append(limit)
+        return [self.combination_dict(row) for row in self.connection.execute(sql, values)]
+
+    def get(self, params):
+        row = self.connection.execute("SELECT * FROM combinations WHERE params=?", (params_key(params),)).fetchone()
+        return self.combination_dict(row) if row is not None else None
+
+    def molecule_rows(self):
+        """Every stored combination x molecule as extract_log_data-style rows."""
+        columns = ", ".join(f"c.p_{name} AS {name}" for name in self.param_names)
+        sql = (f"SELECT m.molecule, {columns}, m.S1, m.T1, m.gap AS \"S1-T1\" FROM molecule_results m "
+               "JOIN combinations c ON c.id = m.combination_id ORDER BY c.id, m.molecule")
+        rows = []
+        for row in self.connection.execute(sql):
+            rows.append({key: row[key] for key in row.keys() if row[key] is not None})
+        return rows
+
+    def __len__(self):
+        return self.connection.execute("SELECT COUNT(*) FROM combinations").fetchone()[0]
+
+if __name__ == "__main__":
+    # Usage: results_store.py <results.db> top [k]
+    #        results_store.py <results.db> range a1=0.48:0.52 b1=-0.25:-0.20 ...
+    #        results_store.py <results.db> export <out.csv>
+    store = ResultsStore(sys.argv[1])
+    command = sys.argv[2] if len(sys.argv) > 2 else "top"
+    if command == "top":
+        for result in store.top_k(int(sys.argv[3]) if len(sys.argv) > 3 else 10):
+            print(result)
+    elif command == "range":
+        ranges = {}
+        for arg in sys.argv[3:]:
+            name, bounds = arg.split("=")
+            low, high = bounds.split(":")
+            ranges[name] = (float(low), float(high))
+        for result in store.query(ranges):
+            print(result)
+    elif command == "export":
+        rows = store.molecule_rows()
+        with open(sys.argv[3], "w", newline="") as output_file:
+            writer = csv.DictWriter(output_file, fieldnames=list(rows[0].keys()) if rows else ["molecule"])
+            writer.writeheader()
+            writer.writerows(rows)
+        print(f"Exported {len(rows)} row(s) from {len(store)} combination(s) to {sys.argv[3]}")
@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+
+import os
+import re
+import sys
+import sqlite3
+import argparse
+from time import time
+
+from log_parser import parse_log, open_log
+from job_tracker import JobTracker, JobPool
+from generate_and_submit_jobs import submit_input_file
+
+# Log messages of failures, checked in this order. The first two classes are what
+# error_check_II.sh and error_check_I.sh grep for. "DDI Process 0: error code 911" is
+# GAMESS's generic abort (SCF failures included), so only DDI signals count as DDI failures.
+FAILURE_PATTERNS = [
+    ("scratch", re.compile(r"Error changing to scratch directory|directory named above must exist on all nodes"
+                           r"|specify -scr directory")),
+    ("ddi", re.compile(r"Multiple DDI processes connecting with the same rank|Initiating 152 compute processes on 1 nodes"
+                       r"|DDI Process \d+: .*signal|ddikick\.x: .*(?:killed|terminated abnormally)", re.I)),
+    ("timeout", re.compile(r"DUE TO TIME LIMIT|TIME LIMIT EXCEEDED|EXCEEDED THE TIME LIMIT", re.I)),
+]
+
+# Slurm end states that say more than the log does.
+SLURM_FAILURES = {"TIMEOUT": "timeout", "NODE_FAIL": "node", "BOOT_FAIL": "node", "PREEMPTED": "node"}
+
+# How often each class of failure is retried and the delay before the first retry (doubled on each
+# further attempt). SCF non-convergence repeats with the same input, so it is only recorded.
+RETRY_POLICY = {
+    "scratch": {"limit": 3, "delay": 30.0},
+    "ddi": {"limit": 3, "delay": 60.0},
+    "node": {"limit": 2, "delay": 60.0},
+    "timeout": {"limit": 1, "delay": 0.0},
+    "missing": {"limit": 2, "delay": 60.0},
+    "unknown": {"limit": 1, "delay": 60.0},
+    "scf": {"limit": 0, "delay": 0.0},
+}
+
+def classify_failure(log_file, slurm_state=None):
+    """Return why a run failed ('scratch', 'ddi', 'timeout', 'node', 'scf', 'missing', 'unknown'),
+    or None if it finished with usable energies."""
+    record = parse_log(log_file)
+    if record is not None and record["completed"] and record["energies"] and record["scf_converged"] is not False:
+        return None
+    if slurm_state in SLURM_FAILURES:
+        return SLURM_FAILURES[slurm_state]
+    if record is None:
+        return "missing"
+    with open_log(log_file) as lines:
+        for line in lines:
+            for failure, pattern in FAILURE_PATTERNS:
+                if pattern.search(line):
+                    return failure
+    if record["scf_converged"] is False:
+        return "scf"
+    return "unknown"
+
+class RetryEngine:
+    """Classify every finished job and requeue the transient failures without blocking.
+
+    `watch(callback)` wraps a JobTracker callback: a job that failed with retries left is put
+    back in the queue under the same id (JobTracker.retry) after the class's backoff delay,
+    so whoever waits on it simply keeps waiting; the wrapped callback only fires once the job
+    has succeeded or its retries are used up. Every failure and retry is recorded in `history`.
+    Retries go to `partition` (comma-separated; generate_and_submit_jobs.PARTITION by default).
+    """
+
+    def __init__(self, tracker, submit=None, policy=None, history="retry_history.db", partition=None):
+        self.tracker = tracker
+        self.partition = partition
+        self.submit = submit if submit is not None else \
+            lambda inp_file: submit_input_file(inp_file, tracker.scheduler, self.partition)
+        self.policy = policy if policy is not None else RETRY_POLICY
+        self.connection = sqlite3.connect(history)
+        self.connection.execute("""
+            CREATE TABLE IF NOT EXISTS failures (
+                job_id TEXT NOT NULL,
+                inp_file TEXT NOT NULL,
+                failure TEXT,
+                attempt INTEGER NOT NULL,
+                action TEXT NOT NULL,
+                recorded REAL
+            )""")
+        self.connection.commit()
+
+    def record(self, job_id, inp_file, failure, attempt, action):
+        self.connection.execute("INSERT INTO failures VALUES (?, ?, ?, ?, ?, ?)",
+                                (job_id, inp_file, failure, attempt, action, time()))
+        self.connection.commit()
+
+    def watch(self, callback=None):
+        def handle(job_id, info):
+            self.handle(job_id, info, handle, callback)
+        return handle
+
+    def handle(self, job_id, info, handler, callback=None):
+        inp_file = info["inp_file"]
+        log_file = inp_file[:-len(".inp")] + ".log"
+        attempt = info.get("attempts", 1)
+        failure = classify_failure(log_file, info.get("state"))
+
+        if failure is None:
+            if attempt > 1:
+                self.record(job_id, inp_file, None, attempt, "recovered")
+        else:
+            policy = self.policy.get(failure, self.policy["unknown"])
+            if attempt - 1 < policy["limit"]:
+                delay = policy["delay"] * 2 ** (attempt - 1)
+                if os.path.exists(log_file):
+                    os.replace(log_file, f"{log_file}.attempt{attempt}")
+                print(f"Job {job_id} failed ({failure}); retrying in {delay:.0f} s "
+                      f"(retry {attempt}/{policy['limit']}).")
+                self.record(job_id, inp_file, failure, attempt, "retry")
+                self.tracker.retry(job_id, lambda: self.submit(inp_file), delay, callback=handler)
+                return
+            print(f"Job {job_id} failed ({failure}); giving up after {attempt} attempt(s).")
+            self.record(job_id, inp_file, failure, attempt, "gave_up")
+
+        if callback is not None:
+            callback(job_id, info)
+
+    def summary(self):
+        """{(failure, action): count} over the whole history."""
+        rows = self.connection.execute("SELECT failure, action, COUNT(*) FROM failures GROUP BY failure, action")
+        return {(failure, action): count for failure, action, count in rows}
+
+def failed_inputs(root, classes=None):
+    """(inp_file, failure) for every run below `root` whose log shows a failure of one of `classes`."""
+    found = []
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames.sort()
+        for filename in sorted(filenames):
+            if not filename.endswith(".inp"):
+                continue
+            inp_file = os.path.join(dirpath, filename)
+            failure = classify_failure(inp_file[:-len(".inp")] + ".log")
+            if failure is not None and (classes is None or failure in classes):
+                found.append((inp_file, failure))
+    return found
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Find failed GAMESS runs, classify them and requeue them.")
+    parser.add_argument("dirs", nargs="*", default=["."])
+    parser.add_argument("--classes", nargs="+", choices=RETRY_POLICY, default=["scratch", "ddi"],
+                        help="failure classes to requeue (runs still in progress look like 'unknown')")
+    parser.add_argument("--max-jobs", type=int, default=1000, help="jobs in flight at once")
+    parser.add_argument("-p", "--partition", help="Slurm partition(s) to requeue on, comma-separated "
+                                                  "(default: generate_and_submit_jobs.PARTITION)")
+    parser.add_argument("--history", default="retry_history.db")
+    parser.add_argument("--dry-run", action="store_true", help="only list the failures")
+    args = parser.parse_args()
+
+    failures = [entry for directory in args.dirs for entry in failed_inputs(directory, args.classes)]
+    for inp_file, failure in failures:
+        print(f"{failure:>8s}  {inp_file}")
+    if args.dry_run or not failures:
+        sys.exit(0)
+
+    tracker = JobTracker()
+    engine = RetryEngine(tracker, history=args.history, partition=args.partition)
+    pool = JobPool(args.max_jobs, tracker)
+    for inp_file, failure in failures:
+        engine.record("-", inp_file, failure, 1, "requeued")
+        log_file = inp_file[:-len(".inp")] + ".log"
+        if os.path.exists(log_file):
+            os.replace(log_file, f"{log_file}.attempt1")
+        pool.add(lambda inp_file=inp_file: submit_input_file(inp_file, partition=args.partition), engine.watch(),
+                 inp_file=inp_file, attempts=2)
+    pool.run()
+    for (failure, action), count in sorted(engine.summary().items(), key=str):
+        print(f"{failure or 'ok'}: {action} x{count}")
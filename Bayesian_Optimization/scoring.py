@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+
+import sys
+import csv
+import json
+import argparse
+
+import numpy as np
+
+METRICS = ("S1", "T1", "gap")
+
+class ResultArrays:
+    """Every evaluated combination x molecule as dense arrays (NaN where a value is missing).
+
+    `combinations` is a list of parameter tuples in the order of `param_names`; S1, T1 and
+    gap have shape (len(combinations), len(molecules)).
+    """
+
+    def __init__(self, param_names, combinations, molecules, S1, T1, gap):
+        self.param_names = param_names
+        self.combinations = combinations
+        self.molecules = molecules
+        self.S1 = S1
+        self.T1 = T1
+        self.gap = gap
+
+    @classmethod
+    def from_rows(cls, rows, molecules=None, param_names=None):
+        """Build the arrays from extract_log_data / parallel_extract / CSV rows."""
+        if param_names is None:
+            param_names = [key for key in rows[0] if key not in ("molecule", "S1", "T1", "S1-T1")] if rows else []
+        if molecules is None:
+            molecules = sorted({row["molecule"] for row in rows})
+
+        combo_index = {}
+        molecule_index = {molecule: j for j, molecule in enumerate(molecules)}
+        cells = []
+        for row in rows:
+            j = molecule_index.get(row["molecule"])
+            if j is None:
+                continue
+            combo = tuple(round(float(row[name]), 2) + 0.0 for name in param_names)
+            i = combo_index.setdefault(combo, len(combo_index))
+            cells.append((i, j, float(row["S1"]), float(row["T1"]), float(row["S1-T1"])))
+
+        shape = (len(combo_index), len(molecules))
+        S1, T1, gap = np.full(shape, np.nan), np.full(shape, np.nan), np.full(shape, np.nan)
+        if cells:
+            i, j, s1, t1, g = (np.array(column) for column in zip(*cells))
+            i, j = i.astype(int), j.astype(int)
+            S1[i, j], T1[i, j], gap[i, j] = s1, t1, g
+        return cls(param_names, list(combo_index), molecules, S1, T1, gap)
+
+def reference_arrays(molecules, S1_ref, T1_ref):
+    S1 = np.array([S1_ref.get(molecule, np.nan) for molecule in molecules], dtype=float)
+    T1 = np.array([T1_ref.get(molecule, np.nan) for molecule in molecules], dtype=float)
+    return S1, T1
+
+def score_all(results, S1_ref, T1_ref, reject_positive_gap=False):
+    """Score every combination at once.
+
+    Follows compare_results.compare_with_reference: molecules with a positive (or zero)
+    S1-T1 gap or without reference values are left out of the averages. With
+    `reject_positive_gap` a single positive gap invalidates the whole combination instead
+    (the extract_log_data.calculate_rmse_mae variant). Returns a dict of arrays with
+    RMSE/MAE per metric, the number of molecules used and the absolute differences.
+    """
+    S1_r, T1_r = reference_arrays(results.molecules, S1_ref, T1_ref)
+    diffs = {
+        "S1": np.abs(results.S1 - S1_r),
+        "T1": np.abs(results.T1 - T1_r),
+        "gap": np.abs(results.gap - (S1_r - T1_r)),
+    }
+
+    present = np.isfinite(results.gap) & np.isfinite(S1_r) & np.isfinite(T1_r)
+    with np.errstate(invalid="ignore"):
+        negative = results.gap < 0
+    valid = present & negative
+    if reject_positive_gap:
+        rejected = (present & ~negative).any(axis=1)
+        valid &= ~rejected[:, None]
+
+    count = valid.sum(axis=1)
+    scores = {"n_valid": count, "valid": valid, "diffs": diffs}
+    with np.errstate(invalid="ignore", divide="ignore"):
+        for metric, diff in diffs.items():
+            d = np.where(valid, diff, 0.0)
+            scores[f"{metric}_rmse"] = np.where(count > 0, np.sqrt((d ** 2).sum(axis=1) / count), np.nan)
+            scores[f"{metric}_mae"] = np.where(count > 0, d.sum(axis=1) / count, np.nan)
+    return scores
+
+def ranking_rows(results, scores, metric="gap"):
+    """One row per combination, best `metric` RMSE first (unscorable combinations last)."""
+    order = np.argsort(np.where(np.isfinite(scores[f"{metric}_rmse"]), scores[f"{metric}_rmse"], np.inf), kind="stable")
+    rows = []
+    for i in order:
+        row = dict(zip(results.param_names, results.combinations[i]))
+        row["n_valid"] = int(scores["n_valid"][i])
+        for name in METRICS:
+            row[f"{name}_rmse"] = float(scores[f"{name}_rmse"][i])
+            row[f"{name}_mae"] = float(scores[f"{name}_mae"][i])
+        rows.append(row)
+    return rows
+
+def load_rows_from_csv(filenames):
+    rows = []
+    for filename in filenames:
+        with open(filename, "r") as csvfile:
+            rows.extend(csv.DictReader(csvfile))
+    return rows
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Re-score every evaluated combination against reference values.")
+    parser.add_argument("inputs", nargs="+", help="extracted-data CSV files, run directories with --from-logs "
+                                                  "or a results.db with --from-store")
+    parser.add_argument("--from-logs", action="store_true", help="parse the logs under the given directories")
+    parser.add_argument("--from-store", action="store_true", help="read results_store databases")
+    parser.add_argument("-j", "--workers", type=int, default=None)
+    parser.add_argument("--reference", help='JSON file {"S1": {molecule: eV}, "T1": {molecule: eV}}')
+    parser.add_argument("--metric", choices=METRICS, default="gap")
+    parser.add_argument("--strict", action="store_true", help="reject a combination if any S1-T1 gap is positive")
+    parser.add_argument("-o", "--output", default="rescored_results.csv")
+    args = parser.parse_args()
+
+    if args.reference:
+        with open(args.reference) as f:
+            reference = json.load(f)
+        S1_ref, T1_ref = reference["S1"], reference["T1"]
+    else:
+        from compare_results import S1_ref, T1_ref
+
+    if args.from_logs:
+        from parallel_extract import extract_parallel
+        rows, _ = extract_parallel(args.inputs, workers=args.workers)
+    elif args.from_store:
+        from results_store import ResultsStore
+        rows = [row for filename in args.inputs for row in ResultsStore(filename).molecule_rows()]
+    else:
+        rows = load_rows_from_csv(args.inputs)
+    if not rows:
+        sys.exit("No extracted data found.")
+
+    results = ResultArrays.from_rows(rows)
+    scores = score_all(results, S1_ref, T1_ref, reject_positive_gap=args.strict)
+    ranking = ranking_rows(results, scores, metric=args.metric)
+
+    with open(args.output, "w", newline="") as output_file:
+        writer = csv.DictWriter(output_file, fieldnames=list(ranking[0].keys()))
+        writer.writeheader()
+        writer.writerows(ranking)
+    print(f"Scored {len(ranking)} combination(s) over {len(results.molecules)} molecule(s); saved to {args.output}")
+    print("Best:", ranking[0])
@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+
+import math
+import argparse
+
+import numpy as np
+from hyperopt import hp
+from scipy.stats import qmc
+
+from gp_optimizer import GaussianProcess, space_bounds
+
+def surrogate(X, y, max_points=400, rng=None):
+    """GaussianProcess fitted to standardized losses at unit-cube points, on at most `max_points` of them."""
+    rng = rng if rng is not None else np.random.default_rng()
+    if len(y) > max_points:
+        keep = rng.choice(len(y), max_points, replace=False)
+        X, y = X[keep], y[keep]
+    return GaussianProcess(rng=rng).fit(X, (y - y.mean()) / y.std())
+
+def predict_mean(gp, X, batch=4096):
+    return np.concatenate([gp.predict(X[i:i + batch])[0] for i in range(0, len(X), batch)])
+
+def sobol_indices(f, d, n_samples=2048, seed=None):
+    """First-order and total Sobol indices of `f` (rows of the unit cube -> values) over d dimensions.
+
+    Saltelli sampling on a scrambled Sobol sequence: f is called once on (d + 2) * n_samples
+    points. First-order indices use the Saltelli (2010) estimator, total indices Jansen's.
+    """
+    AB = qmc.Sobol(d=2 * d, scramble=True, seed=seed).random(n_samples)
+    A, B = AB[:, :d], AB[:, d:]
+    ABs = []
+    for i in range(d):
+        ABi = A.copy()
+        ABi[:, i] = B[:, i]
+        ABs.append(ABi)
+    values = f(np.vstack([A, B] + ABs))
+    fA, fB = values[:n_samples], values[n_samples:2 * n_samples]
+    fAB = values[2 * n_samples:].reshape(d, n_samples)
+
+    variance = np.var(np.concatenate([fA, fB]))
+    if variance == 0:
+        return np.zeros(d), np.zeros(d)
+    first = np.mean(fB * (fAB - fA), axis=1) / variance
+    total = 0.5 * np.mean((fA - fAB) ** 2, axis=1) / variance
+    return first, total
+
+def analyze(space, history, n_samples=2048, max_points=400, seed=None):
+    """Sobol indices of the loss over `space`, estimated on a GP surrogate of `history`.
+
+    `history` is a list of (params, loss); infinite losses (rejected combinations) are left
+    out. Returns {name: {'first', 'total', 'lengthscale'}} with the GP's ARD lengthscales (in
+    units of the range width; short means the loss changes fast along that parameter), or
+    None if there are fewer than two distinct finite losses.
+    """
+    bounds = space_bounds(space)
+    names = list(bounds)
+    low = np.array([bounds[name][1] for name in names])
+    high = np.array([bounds[name][2] for name in names])
+    points = [(params, loss) for params, loss in history
+              if loss is not None and math.isfinite(loss) and all(name in params for name in names)]
+    if len(points) < 2 or len({loss for _, loss in points}) < 2:
+        return None
+
+    X = np.clip((np.array([[params[name] for name in names] for params, _ in points]) - low) / (high - low), 0.0, 1.0)
+    y = np.array([loss for _, loss in points])
+    gp = surrogate(X, y, max_points, np.random.default_rng(seed))
+    first, total = sobol_indices(lambda Xs: predict_mean(gp, Xs), len(names), n_samples, seed)
+    return {name: {'first': float(first[i]), 'total': float(total[i]), 'lengthscale': float(gp.lengthscales[i])}
+            for i, name in enumerate(names)}
+
+def shrink_space(space, analysis, history, freeze=0.01, narrow=0.05, top=0.2, margin=0.1, resolution=0.01):
+    """Narrow or freeze the low-impact parameters of `space`; returns (new space, {name: (action, low, high)}).
+
+    A parameter whose total index is below `freeze` is pinned to its value in the best
+    combination (a range of less than `resolution`, which main.py rounds to that value). One
+    below `narrow` is limited to the span of the best `top` fraction of the finite-loss
+    combinations, widened by `margin` of its original width. The others, and every parameter
+    when `analysis` is None, keep their ranges. Only hp.uniform / hp.quniform spaces are supported.
+    """
+    bounds = space_bounds(space)
+    points = sorted(((params, loss) for params, loss in history if loss is not None and math.isfinite(loss)
+                     and all(name in params for name in bounds)), key=lambda point: point[1])
+    new_space = dict(space)
+    changes = {}
+    if analysis is None or not points:
+        return new_space, changes
+
+    best = points[0][0]
+    good = points[:max(1, int(math.ceil(top * len(points))))]
+    for name, (label, low, high, _) in bounds.items():
+        total = analysis[name]['total']
+        if total < freeze:
+            value = min(max(best[name], low), high)
+            new_low, new_high = max(low, value - 0.4 * resolution), min(high, value + 0.4 * resolution)
+            action = 'frozen'
+        elif total < narrow:
+            values = [params[name] for params, _ in good]
+            pad = margin * (high - low)
+            new_low, new_high = max(low, min(values) - pad), min(high, max(values) + pad)
+            action = 'narrowed'
+        else:
+            continue
+        if new_high - new_low < (high - low) - 1e-12:
+            new_space[name] = hp.uniform(label, new_low, new_high)
+            changes[name] = (action, new_low, new_high)
+    return new_space, changes
+
+class SpaceShrinker:
+    """Re-runs the analysis during a campaign and narrows the optimizer's space in place.
+
+    Pass it as `adapt` to async_optimizer.run_async_optimization. Every `every` finished
+    evaluations (once at least `min_points` are done) the indices are estimated again from
+    `history()` (a list of (params, loss)) over the original `space`, and the optimizer gets
+    the space shrink_space returns. Since each round starts from the original ranges, a
+    parameter that gains importance later is widened again.
+    """
+
+    def __init__(self, space, history, every=50, min_points=30, freeze=0.01, narrow=0.05, top=0.2, seed=None):
+        self.space = space
+        self.history = history
+        self.every = every
+        self.min_points = min_points
+        self.freeze = freeze
+        self.narrow = narrow
+        self.top = top
+        self.seed = seed
+        self.changes = {}
+
+    def __call__(self, optimizer, finished):
+        if finished < self.min_points or finished % self.every:
+            return
+        history = self.history()
+        analysis = analyze(self.space, history, seed=self.seed)
+        if analysis is None:
+            return
+        print("Sensitivity (total Sobol index): " +
+              ", ".join(f"{name}={indices['total']:.3f}" for name, indices in analysis.items()))
+        space, changes = shrink_space(self.space, analysis, history, self.freeze, self.narrow, self.top)
+        if changes != self.changes:
+            for name, (action, low, high) in changes.items():
+                print(f"Search space: {name} {action} to [{low:.4f}, {high:.4f}]")
+            for name in set(self.changes) - set(changes):
+                print(f"Search space: {name} back to its full range")
+            optimizer.set_space(space)
+            self.changes = changes
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Sobol sensitivity of the RMSE to each parameter, on a GP surrogate "
+                                                 "of a results store, and the space a shrinking run would use.")
+    parser.add_argument("store", help="results_store database")
+    parser.add_argument("--bounds", nargs="*", default=[], metavar="NAME=LOW:HIGH",
+                        help="search range of a parameter (default: the range spanned by the store)")
+    parser.add_argument("--samples", type=int, default=2048, help="Saltelli base samples")
+    parser.add_argument("--max-points", type=int, default=400, help="combinations the surrogate is fitted to")
+    parser.add_argument("--freeze", type=float, default=0.01)
+    parser.add_argument("--narrow", type=float, default=0.05)
+    parser.add_argument("--top", type=float, default=0.2)
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+
+    from results_store import ResultsStore
+    from warm_start import store_history
+
+    store = ResultsStore(args.store)
+    history = list(store_history(store))
+    ranges = {}
+    for name in store.param_names:
+        values = [params[name] for params, _ in history if name in params]
+        if values and max(values) > min(values):
+            ranges[name] = (min(values), max(values))
+    for arg in args.bounds:
+        name, span = arg.split("=")
+        low, high = span.split(":")
+        ranges[name] = (float(low), float(high))
+    space = {name: hp.uniform(name, low, high) for name, (low, high) in ranges.items()}
+
+    analysis = analyze(space, history, args.samples, args.max_points, args.seed)
+    if analysis is None:
+        raise SystemExit(f"Not enough scored combinations in {args.store}")
+    n_finite = sum(1 for _, loss in history if math.isfinite(loss))
+    print(f"{n_finite} scored combination(s); surrogate fitted to {min(n_finite, args.max_points)}.")
+    print(f"{'parameter':<10s} {'first':>8s} {'total':>8s} {'lengthscale':>12s}   range")
+    _, changes = shrink_space(space, analysis, history, args.freeze, args.narrow, args.top)
+    for name, indices in sorted(analysis.items(), key=lambda item: -item[1]['total']):
+        low, high = ranges[name]
+        action = changes.get(name)
+        suggestion = f"{action[0]} to [{action[1]:.4f}, {action[2]:.4f}]" if action else "keep"
+        print(f"{name:<10s} {indices['first']:8.3f} {indices['total']:8.3f} {indices['lengthscale']:12.3f}   "
+              f"[{low:.4f}, {high:.4f}] -> {suggestion}")
@@ -0,0 +1,268 @@
+#!/usr/bin/env python3
+
+import os
+import re
+import heapq
+import random
+import argparse
+import tempfile
+from time import monotonic
+from collections import deque
+
+from evaluation_cache import parse_state_dir
+from synthetic_logs import render_log
+
+# Injected failures: how the log looks and the state squeue reports for the job afterwards.
+# 'node' is a node crash in the middle of the run; its log just stops.
+SIMULATED_FAILURES = {
+    "scratch": ("scratch", "FAILED"),
+    "ddi": ("ddi", "FAILED"),
+    "scf": ("scf", "FAILED"),
+    "timeout": ("timeout", "TIMEOUT"),
+    "node": ("truncated", "NODE_FAIL"),
+    "missing": ("missing", "FAILED"),
+}
+
+class SimulatedScheduler:
+    """In-process stand-in for Slurm and GAMESS with the SlurmScheduler interface.
+
+    Jobs wait `queue_delay` (simulated seconds, a (min, max) range) before they are
+    eligible, then start in submission order as long as fewer than `max_running` run at
+    once (and fewer than an array's own %limit). Each one runs for `runtime` seconds and
+    then writes a synthetic MRSF log (synthetic_logs.render_log) to the path the real run
+    would use, `{molecule}_{state_dir}.log` next to its input. A fraction `failure_rate` fails
+    in one of `failures` (see SIMULATED_FAILURES) instead.
+
+    The clock runs `speedup` times faster than real time, and events are processed lazily
+    on every call, so tens of thousands of jobs need no threads or processes.
+    """
+
+    def __init__(self, max_running=70, queue_delay=(0.0, 0.0), runtime=(600.0, 1800.0), failure_rate=0.0,
+                 failures=tuple(SIMULATED_FAILURES), speedup=1.0, log_size='small', seed=None):
+        self.max_running = max_running
+        self.queue_delay = queue_delay
+        self.runtime = runtime
+        self.failure_rate = failure_rate
+        self.failures = failures
+        self.speedup = speedup
+        self.log_size = log_size
+        self.rng = random.Random(seed)
+        self.started_at = monotonic()
+        self.next_id = 1000
+        self.jobs = {}
+        self.pending = deque()
+        self.running = []
+        self.array_limits = {}
+        self.array_running = {}
+        self.submissions = 0
+        self.queries = 0
+        self.busy = 0.0
+
+    def clock(self):
+        return (monotonic() - self.started_at) * self.speedup
+
+    def add_job(self, job_id, inp_file, array_id=None):
+        now = self.clock()
+        self.jobs[job_id] = {"inp_file": inp_file, "state": "PENDING", "array": array_id,
+                             "eligible_at": now + self.rng.uniform(*self.queue_delay)}
+        self.pending.append(job_id)
+
+    def submit_input(self, inp_file, partition="r630", cpus=30):
+        """Queue one input like gms_sbatch and return its job id."""
+        if not os.path.exists(inp_file):
+            raise OSError(f"{inp_file} does not exist")
+        self.advance()
+        self.next_id += 1
+        self.submissions += 1
+        job_id = str(self.next_id)
+        self.add_job(job_id, inp_file)
+        return job_id
+
+    def submit(self, script, *options):
+        """Queue a job_array.ARRAY_SCRIPT like sbatch: one task per line of its manifest."""
+        with open(script) as f:
+            text = f.read()
+        array = re.search(r"^#SBATCH --array=0-(\d+)(?:%(\d+))?", text, re.M)
+        manifest = re.search(r'sed -n "[^"]*" ([^)\s]+)', text)
+        if array is None or manifest is None:
+            raise ValueError(f"{script} is not a job array script")
+        with open(manifest.group(1)) as f:
+            inp_files = [line.strip() for line in f if line.strip()]
+        self.advance()
+        self.next_id += 1
+        self.submissions += 1
+        array_id = str(self.next_id)
+        if array.group(2):
+            self.array_limits[array_id] = int(array.group(2))
+            self.array_running[array_id] = 0
+        for i, inp_file in enumerate(inp_files[:int(array.group(1)) + 1]):
+            self.add_job(f"{array_id}_{i}", inp_file, array_id)
+        return array_id
+
+    def start_pending(self, now):
+        """Start eligible pending jobs at time `now`, in submission order, while slots are free."""
+        skipped = deque()
+        while self.pending and len(self.running) < self.max_running:
+            job_id = self.pending.popleft()
+            job = self.jobs[job_id]
+            array_id = job["array"]
+            if job["eligible_at"] > now or (array_id in self.array_limits
+                                            and self.array_running[array_id] >= self.array_limits[array_id]):
+                skipped.append(job_id)
+                continue
+            job.update(state="RUNNING", start=now)
+            if array_id in self.array_running:
+                self.array_running[array_id] += 1
+            heapq.heappush(self.running, (now + self.rng.uniform(*self.runtime), job_id))
+        skipped.extend(self.pending)
+        self.pending = skipped
+
+    def advance(self):
+        """Run the simulation up to the current clock, one job end at a time.
+
+        The real time this takes (mostly writing logs) is added to `busy`, so it can be told
+        apart from the orchestration being measured.
+        """
+        started = monotonic()
+        now = self.clock()
+        self.start_pending(now)
+        while self.running and self.running[0][0] <= now:
+            end, job_id = heapq.heappop(self.running)
+            self.finish(job_id, end)
+            self.start_pending(end)
+        # Jobs that became eligible after the last job end.
+        self.start_pending(now)
+        self.busy += monotonic() - started
+
+    def finish(self, job_id, end):
+        job = self.jobs[job_id]
+        if job["array"] in self.array_running:
+            self.array_running[job["array"]] -= 1
+        failure, state = None, "COMPLETED"
+        if self.rng.random() < self.failure_rate:
+            failure, state = SIMULATED_FAILURES[self.rng.choice(self.failures)]
+        job.update(state=state, end=end)
+
+        inp_file = job["inp_file"]
+        parsed = parse_state_dir(os.path.dirname(inp_file))
+        if parsed is None:
+            return
+        params, spin_state = parsed
+        molecule = os.path.basename(inp_file)[:-len(f"_{os.path.basename(os.path.dirname(inp_file))}.inp")]
+        text = render_log(molecule, params, spin_state, failure, self.log_size, self.rng.randrange(2 ** 31))
+        if text is not None:
+            with open(inp_file[:-len(".inp")] + ".log", "w") as f:
+                f.write(text)
+
+    def query(self, job_ids):
+        """{job_id: state} like squeue: queued and running jobs, and jobs that ended badly."""
+        self.advance()
+        self.queries += 1
+        states = {}
+        for job_id in job_ids:
+            job = self.jobs.get(job_id)
+            if job is not None and job["state"] != "COMPLETED":
+                states[job_id] = job["state"]
+        return states
+
+    def cancel(self, job_ids):
+        self.advance()
+        for job_id in job_ids:
+            job = self.jobs.get(job_id)
+            if job is None or job["state"] not in ("PENDING", "RUNNING"):
+                continue
+            if job["state"] == "RUNNING":
+                self.running = [(end, other) for end, other in self.running if other != job_id]
+                heapq.heapify(self.running)
+                if job["array"] in self.array_running:
+                    self.array_running[job["array"]] -= 1
+            else:
+                self.pending.remove(job_id)
+            job["state"] = "CANCELLED"
+        self.start_pending(self.clock())
+
+    def makespan(self):
+        """Simulated seconds from the first job start to the last job end."""
+        ends = [job["end"] for job in self.jobs.values() if "end" in job]
+        starts = [job["start"] for job in self.jobs.values() if "start" in job]
+        return max(ends) - min(starts) if ends and starts else 0.0
+
+def write_inputs(root, n_jobs, molecules=("Heptazine", "Cyclazine")):
+    """Write `n_jobs` small placeholder inputs in the optimizer's directory layout; return their paths."""
+    inp_files = []
+    point = 0
+    while len(inp_files) < n_jobs:
+        a1, b1 = round(0.45 + (point % 11) * 0.01, 2), round(-0.28 + (point // 11 % 11) * 0.01, 2)
+        a2, b2 = round(0.60 + (point // 121 % 16) * 0.01, 2), round(-0.12 + (point // 1936 % 5) * 0.01, 2)
+        for state in ('S', 'T'):
+            state_dir = os.path.join(root, f"a1_{a1}_b1_{b1}_a2_{a2}_b2_{b2}_{state}")
+            os.makedirs(state_dir, exist_ok=True)
+            for molecule in molecules:
+                inp_file = os.path.join(state_dir, f"{molecule}_{os.path.basename(state_dir)}.inp")
+                with open(inp_file, "w") as f:
+                    f.write(f" $CONTRL RUNTYP=energy $END\n $DFT alphac={a1} betac={b1} $END\n")
+                inp_files.append(inp_file)
+        point += 1
+    return inp_files[:n_jobs]
+
+if __name__ == "__main__":
+    from job_tracker import JobTracker, JobPool
+    from job_array import submit_array, MAX_ARRAY_SIZE
+    from retry_engine import RetryEngine, RETRY_POLICY
+    from metrics import MetricsStore
+
+    parser = argparse.ArgumentParser(description="Load-test the job pool, tracker, retries and log streaming "
+                                                 "against the simulated scheduler.")
+    parser.add_argument("-n", "--jobs", type=int, default=10000)
+    parser.add_argument("--max-running", type=int, default=500, help="cluster slots")
+    parser.add_argument("--max-jobs", type=int, default=1000, help="JobPool window")
+    parser.add_argument("--runtime", type=float, nargs=2, default=(600.0, 1800.0), metavar=("MIN", "MAX"))
+    parser.add_argument("--queue-delay", type=float, nargs=2, default=(0.0, 60.0), metavar=("MIN", "MAX"))
+    parser.add_argument("--failure-rate", type=float, default=0.02)
+    parser.add_argument("--speedup", type=float, default=3600.0, help="simulated seconds per real second")
+    parser.add_argument("--poll", type=float, default=0.05, help="tracker poll interval in real seconds")
+    parser.add_argument("--array", action="store_true", help="submit job arrays instead of one job per input")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--dir", help="where to write the inputs and logs (default: a temporary directory)")
+    args = parser.parse_args()
+
+    root = args.dir or tempfile.mkdtemp(prefix="slurm_sim_")
+    inp_files = write_inputs(root, args.jobs)
+    scheduler = SimulatedScheduler(args.max_running, tuple(args.queue_delay), tuple(args.runtime), args.failure_rate,
+                                   speedup=args.speedup, seed=args.seed)
+    metrics = MetricsStore(":memory:")
+    tracker = JobTracker(scheduler, min_interval=args.poll, max_interval=args.poll, metrics=metrics)
+    # Retries are not delayed: the policy's delays are in real seconds.
+    retries = RetryEngine(tracker, history=":memory:",
+                          policy={name: dict(rule, delay=0.0) for name, rule in RETRY_POLICY.items()})
+    callback = retries.watch(metrics.watch())
+
+    print(f"{len(inp_files)} job(s) in {root}, {args.max_running} slot(s), speedup {args.speedup:g}x")
+    start = monotonic()
+    if args.array:
+        for first in range(0, len(inp_files), MAX_ARRAY_SIZE):
+            chunk = inp_files[first:first + MAX_ARRAY_SIZE]
+            task_ids = submit_array(chunk, f"sim_{first // MAX_ARRAY_SIZE}", scheduler=scheduler,
+                                    array_dir=os.path.join(root, "job_arrays"), gamess_command="true  # simulated")
+            for task_id, inp_file in zip(task_ids, chunk):
+                tracker.track(task_id, callback, inp_file=inp_file)
+        tracker.wait()
+    else:
+        pool = JobPool(args.max_jobs, tracker)
+        for inp_file in inp_files:
+            pool.add(lambda inp_file=inp_file: scheduler.submit_input(inp_file), callback, inp_file=inp_file)
+        pool.run()
+    elapsed = monotonic() - start
+
+    phases = {row["name"]: row["total"] for row in metrics.phases_by()}
+    slept = phases.get("sleep", 0.0)
+    makespan = scheduler.makespan()
+    ideal = sum(job["end"] - job["start"] for job in scheduler.jobs.values() if "end" in job) / args.max_running
+    print(f"Wall time {elapsed:.1f} s: {elapsed - slept - scheduler.busy:.1f} s orchestration, "
+          f"{scheduler.busy:.1f} s simulating, {slept:.1f} s waiting between polls")
+    print(f"Throughput {len(scheduler.jobs) / elapsed:.0f} job(s)/s real; simulated makespan {makespan / 3600:.2f} h "
+          f"against {ideal / 3600:.2f} h with every slot busy ({ideal / makespan if makespan else 0:.0%} utilisation)")
+    print(f"{scheduler.submissions} submission(s), {scheduler.queries} squeue call(s) "
+          f"({phases.get('squeue', 0.0):.2f} s), {tracker.polls} poll(s)")
+    for (failure, action), count in sorted(retries.summary().items(), key=str):
+        print(f"{failure or 'ok'}: {action} x{count}")
@@ -0,0 +1,206 @@
+#!/usr/bin/env python3
+
+import os
+import random
+import argparse
+
+from log_parser import HARTREE_TO_EV
+from compare_results import S1_ref, T1_ref
+from evaluation_cache import params_key
+from generate_and_submit_jobs import render_input, state_dir_path
+
+# Filler lines (SCF iterations, orbital listings) per log size; real MRSF logs are a few
+# thousand lines, with verbose eigenvector printing tens of thousands.
+SIZES = {'small': 300, 'medium': 5000, 'large': 50000}
+
+# How a synthetic run can go wrong. 'missing' leaves no log at all, 'truncated' stops in the
+# middle of the run (no completion markers, like a job that was killed or is still running).
+FAILURE_MODES = ("scratch", "ddi", "scf", "timeout", "truncated", "missing")
+
+HEADER = """ ----- GAMESS execution script 'rungms' -----
+ This job is running on host synthetic-node-{node:02d}
+ under the process id {pid}
+          ******************************************************
+          *         GAMESS VERSION = 30 JUN 2023 (R2)          *
+          ******************************************************
+ EXECUTION OF GAMESS BEGUN {date}
+
+ INPUT CARD> $CONTRL SCFTYP=ROHF RUNTYP=energy DFTTYP=camb3lyp ICHARG=0
+ INPUT CARD> TDDFT=MRSF MAXIT=200 MULT=3 ISPHER=0 UNITS=BOHR $END
+ INPUT CARD> $TDDFT NSTATE=3 IROOT=1 MULT={mult} mralp={a2} mrbet={b2} $END
+ INPUT CARD> $DFT alphac={a1} betac={b1} $END
+ INPUT CARD> $DATA
+ INPUT CARD> {molecule}
+
+ TOTAL NUMBER OF BASIS SET SHELLS             =  {shells}
+ NUMBER OF CARTESIAN GAUSSIAN BASIS FUNCTIONS =  {functions}
+"""
+
+SCRATCH_FAILURE = """ Error changing to scratch directory /scr/{user}/{job}
+ The directory named above must exist on all nodes, and be writable.
+ ddikick.x: Execution terminated due to error(s).
+"""
+
+DDI_FAILURE = """ DDI Process 0: Multiple DDI processes connecting with the same rank.
+ ddikick.x: application process 17 quit unexpectedly.
+ ddikick.x: Sending kill signal to DDI processes.
+ ddikick.x: Execution terminated due to error(s).
+"""
+
+ABNORMAL_END = """ EXECUTION OF GAMESS TERMINATED -ABNORMALLY- AT {date}
+ DDI Process 0: error code 911
+ ddikick.x: application process 0 quit unexpectedly.
+ ddikick.x: Execution terminated due to error(s).
+"""
+
+def synthetic_energies(molecule, params, state, rng=None):
+    """{root: Hartree} for a run, with S1/T1 near the reference values and smooth in the parameters.
+
+    For 'S' roots 1 and 2 are S0 and S1; for 'T' root 1 is T1, relative to the same S0.
+    """
+    index = sorted(S1_ref).index(molecule) if molecule in S1_ref else len(molecule)
+    s0 = -230.0 - 41.3 * index - 0.8 * (params['a1'] - 0.5) + 0.3 * (params['b1'] + 0.23)
+    noise = rng.gauss(0.0, 0.01) if rng is not None else 0.0
+    S1 = S1_ref.get(molecule, 2.0) + 1.6 * (params['a1'] - 0.5) - 0.9 * (params['a2'] - 0.68) + noise
+    T1 = T1_ref.get(molecule, 2.2) + 1.1 * (params['a2'] - 0.68) + 2.0 * (params['b2'] + 0.1) - noise
+    if state == 'S':
+        return {1: s0, 2: s0 + S1 / HARTREE_TO_EV, 3: s0 + (S1 + 0.9) / HARTREE_TO_EV}
+    return {1: s0 + T1 / HARTREE_TO_EV, 2: s0 + (T1 + 0.4) / HARTREE_TO_EV, 3: s0 + (T1 + 1.1) / HARTREE_TO_EV}
+
+def filler_lines(count, rng):
+    """SCF iteration and eigenvector lines, the bulk of a real log."""
+    lines = ["          --------------------------",
+             "          ROHF SCF CALCULATION",
+             "          --------------------------",
+             " ITER EX     TOTAL ENERGY        E CHANGE       DENSITY CHANGE    ORB. GRAD"]
+    energy = -230.0
+    for i in range(1, min(count, 40) + 1):
+        change = -rng.random() / 2 ** i
+        energy += change
+        lines.append(f"{i:5d}{0:3d}{energy:21.10f}{change:17.10f}{abs(change) * 3:17.9f}{abs(change):14.9f}")
+    lines.append("          EIGENVECTORS")
+    # One random block of coefficients, repeated: writing the corpus should not cost more than parsing it.
+    block = [f"{atom:5d}  C  {atom:2d}  S  " + "".join(f"{rng.uniform(-1, 1):11.6f}" for _ in range(5))
+             for atom in range(1, 10)]
+    orbital = 1
+    while len(lines) < count:
+        lines.append(f"{orbital:21d}{orbital + 1:11d}{orbital + 2:11d}{orbital + 3:11d}{orbital + 4:11d}")
+        lines += block
+        orbital += 5
+    return lines[:count]
+
+def state_block(energies, mult):
+    """MRSF-DFT summary and transitions, in the layout data_collector_I.sh and log_parser read."""
+    lines = ["", "          SUMMARY OF MRSF-DFT RESULTS", "",
+             "   STATE             ENERGY     EXCITATION      TRANSITION DIPOLE, A.U.  OSCILLATOR",
+             "                    HARTREE          EV         X          Y          Z    STRENGTH", ""]
+    ground = energies[1]
+    for root, energy in sorted(energies.items()):
+        excitation = (energy - ground) * HARTREE_TO_EV
+        lines.append(f"{root:4d}  A  {energy:20.10f}{excitation:10.3f}   0.0000     0.0000     0.0000     0.0000"
+                     f"   {mult}")
+    lines += ["", "          TRANSITION BETWEEN EXCITED STATES", "",
+              "    STATE   ->  STATE    ENERGY(EV)     X          Y          Z    STRENGTH"]
+    for i in sorted(energies):
+        for j in sorted(energies):
+            if j > i:
+                gap = (energies[j] - energies[i]) * HARTREE_TO_EV
+                lines.append(f"{i:4d}  ->  {j}  {gap:12.3f}      0.0000     0.0000     0.0000     0.0000")
+    return lines
+
+def render_log(molecule, params, state, failure=None, size='small', seed=None):
+    """Text of a synthetic GAMESS MRSF log, or None for failure='missing'."""
+    if failure == 'missing':
+        return None
+    rng = random.Random(seed)
+    count = SIZES[size] if size in SIZES else int(size)
+    energies = synthetic_energies(molecule, params, state, rng)
+    date = "SAT OCT 18 12:00:00 2025"
+    lines = HEADER.format(node=rng.randrange(64), pid=rng.randrange(10000, 99999), date=date,
+                          mult=1 if state == 'S' else 3, molecule=molecule, shells=rng.randrange(60, 140),
+                          functions=rng.randrange(150, 400), **params).splitlines()
+
+    if failure == 'scratch':
+        return "\n".join(lines) + "\n" + SCRATCH_FAILURE.format(user="user", job=rng.randrange(100000))
+    if failure == 'ddi':
+        return "\n".join(lines) + "\n" + DDI_FAILURE
+
+    filler = filler_lines(count, rng)
+    if failure == 'truncated':
+        return "\n".join(lines + filler[:max(len(filler) // 2, 1)]) + "\n"
+    lines += filler
+    if failure == 'scf':
+        lines += ["", "          SCF IS UNCONVERGED, TOO MANY ITERATIONS"]
+        return "\n".join(lines) + "\n" + ABNORMAL_END.format(date=date)
+
+    iterations = rng.randrange(12, 30)
+    lines += ["", "          DENSITY CONVERGED", "",
+              f" FINAL ROHF ENERGY IS  {energies[1] - 0.05:20.10f} AFTER {iterations:3d} ITERATIONS"]
+    lines += state_block(energies, 1 if state == 'S' else 3)
+    wall = rng.uniform(600.0, 3600.0)
+    if failure == 'timeout':
+        lines += ["", " *** THIS JOB HAS EXCEEDED THE TIME LIMIT ***",
+                  f" TOTAL WALL CLOCK TIME={wall:13.1f} SECONDS, CPU UTILIZATION IS  99.10%"]
+        return "\n".join(lines) + "\n" + ABNORMAL_END.format(date=date)
+
+    lines += ["", " ...... END OF PROPERTY EVALUATION ......",
+              f" STEP CPU TIME = {wall * 0.02:10.2f} TOTAL CPU TIME = {wall * 0.99:12.1f} ({wall * 0.99 / 60:8.1f} MIN)",
+              f" TOTAL WALL CLOCK TIME={wall:13.1f} SECONDS, CPU UTILIZATION IS  99.10%",
+              f" EXECUTION OF GAMESS TERMINATED NORMALLY {date}",
+              " CPU timing information for all processes", " ========================================"]
+    for process in range(4):
+        user = wall * rng.uniform(0.95, 0.99)
+        system = wall * 0.005
+        lines.append(f" {process}: {user:.3f} + {system:.3f} = {user + system:.3f}")
+    lines += [" ----------------------------------------", " ddikick.x: exited gracefully.",
+              " ----- accounting info -----"]
+    return "\n".join(lines) + "\n"
+
+def write_tree(root, points, molecules, failure_rate=0.0, size='small', seed=0, inputs=True,
+               geom_file=os.path.join(os.path.dirname(os.path.abspath(__file__)), "geometries.txt")):
+    """Write the `a1_*_b1_*_a2_*_b2_*_{S,T}` directories of `points` below `root`.
+
+    Every (point, molecule, state) gets a log (and, with `inputs`, its .inp file); a fraction
+    `failure_rate` of them fails in one of FAILURE_MODES. Returns {(params key, molecule, state):
+    failure or None}.
+    """
+    rng = random.Random(seed)
+    outcome = {}
+    for p in points:
+        for state in ('S', 'T'):
+            job_dir = os.path.join(root, state_dir_path(p['a1'], p['b1'], p['a2'], p['b2'], state))
+            os.makedirs(job_dir, exist_ok=True)
+            for molecule in molecules:
+                base = os.path.join(job_dir, f"{molecule}_{os.path.basename(job_dir)}")
+                failure = rng.choice(FAILURE_MODES) if rng.random() < failure_rate else None
+                if inputs:
+                    with open(base + ".inp", "w") as f:
+                        f.write(render_input(molecule, p['a1'], p['b1'], p['a2'], p['b2'], state, geom_file))
+                text = render_log(molecule, p, state, failure, size, rng.randrange(2 ** 31))
+                if text is not None:
+                    with open(base + ".log", "w") as f:
+                        f.write(text)
+                outcome[(params_key(p), molecule, state)] = failure
+    return outcome
+
+def random_points(n_points, seed=0):
+    """`n_points` parameter sets on the 0.01 grid of the main.py search space."""
+    rng = random.Random(seed)
+    return [{'a1': round(rng.uniform(0.45, 0.55), 2), 'b1': round(rng.uniform(-0.28, -0.18), 2),
+             'a2': round(rng.uniform(0.60, 0.75), 2), 'b2': round(rng.uniform(-0.12, -0.08), 2)}
+            for _ in range(n_points)]
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Write a synthetic tree of MRSF logs in the optimizer's directory layout.")
+    parser.add_argument("root")
+    parser.add_argument("-n", "--points", type=int, default=10)
+    parser.add_argument("--molecules", nargs="+", default=list(S1_ref))
+    parser.add_argument("--size", default="small", help=f"{', '.join(SIZES)} or a number of filler lines")
+    parser.add_argument("--failure-rate", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    outcome = write_tree(args.root, random_points(args.points, args.seed), args.molecules, args.failure_rate,
+                         args.size, args.seed)
+    failed = sum(1 for failure in outcome.values() if failure is not None)
+    print(f"Wrote {len(outcome)} run(s) below {args.root}, {failed} of them failed.")
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# The modules of Bayesian_Optimization are scripts run from their own directory.
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
@@ -0,0 +1,60 @@
+import os
+
+from evaluation_cache import EvaluationCache, input_fingerprint, spcp_weights
+from generate_and_submit_jobs import render_input, state_dir_path, template_fingerprint, EXTRA_PARAMETERS
+from warm_start import cache_history
+
+GEOMETRIES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "geometries.txt")
+PARAMS = {'a1': 0.5, 'b1': -0.2, 'a2': 0.65, 'b2': -0.1}
+EXTRA = {'co': 0.6, 'ov': 0.45, 'cv': 0.7, 'mu': 0.3}
+S1_ref = {"Heptazine": 2.7}
+T1_ref = {"Heptazine": 2.9}
+
+def write_run(root, state, extra, input_text=None):
+    state_dir = os.path.join(root, state_dir_path(*PARAMS.values(), state, extra=extra))
+    os.makedirs(state_dir)
+    base = os.path.join(state_dir, f"Heptazine_{os.path.basename(state_dir)}")
+    with open(base + ".inp", "w") as f:
+        f.write(input_text or render_input("Heptazine", *PARAMS.values(), state, GEOMETRIES, extra=extra))
+    with open(base + ".log", "w") as f:
+        f.write("finished\n")
+
+def fake_energies(log_file):
+    return {1: -230.0, 2: -229.9}
+
+def test_spcp_weights_reach_the_input():
+    text = render_input("Heptazine", *PARAMS.values(), 'S', GEOMETRIES, extra=EXTRA)
+    assert spcp_weights(text) == (0.6, 0.45, 0.7)
+    assert spcp_weights(render_input("Heptazine", *PARAMS.values(), 'S', GEOMETRIES)) == (0.5, 0.5, 0.5)
+
+def test_only_optimized_weights_change_the_fingerprint():
+    plain = template_fingerprint()
+    assert plain == input_fingerprint(render_input("Heptazine", *PARAMS.values(), 'S', GEOMETRIES))
+    assert template_fingerprint(extra={'mu': 0.3}) == plain
+    assert template_fingerprint(extra=EXTRA_PARAMETERS) != plain
+
+def test_import_skips_trees_with_tied_weights(tmp_path):
+    for state in ('S', 'T'):
+        text = render_input("Heptazine", *PARAMS.values(), state, GEOMETRIES, extra=EXTRA)
+        write_run(tmp_path / "old", state, EXTRA, text.replace("spcp(1)=0.6,0.45,0.7", "spcp(1)=0.6,0.6,0.6"))
+        write_run(tmp_path / "new", state, EXTRA)
+        write_run(tmp_path / "plain", state, None)
+
+    cache = EvaluationCache(str(tmp_path / "cache.db"))
+    assert cache.import_tree(str(tmp_path), fake_energies) == 4
+    weighted = template_fingerprint(extra=EXTRA_PARAMETERS)
+    assert cache.get({**PARAMS, **EXTRA}, "Heptazine", 'S', weighted) is not None
+    assert cache.get({**PARAMS, **EXTRA}, "Heptazine", 'S', template_fingerprint()) is None
+    assert cache.get(PARAMS, "Heptazine", 'S', template_fingerprint()) is not None
+
+def test_history_leaves_out_weights_under_the_plain_template(tmp_path):
+    cache = EvaluationCache(str(tmp_path / "cache.db"))
+    plain, weighted = template_fingerprint(), template_fingerprint(extra=EXTRA_PARAMETERS)
+    tied = {**PARAMS, 'co': 0.6, 'ov': 0.45, 'cv': 0.7, 'mu': 0.3}
+    independent = {**PARAMS, 'co': 0.55, 'ov': 0.45, 'cv': 0.7, 'mu': 0.3}
+    for params, template in ((PARAMS, plain), (tied, plain), (independent, weighted)):
+        cache.put(params, "Heptazine", 'S', template, {1: -230.0, 2: -229.9})
+        cache.put(params, "Heptazine", 'T', template, {1: -229.9})
+
+    history = [params for params, _ in cache_history(cache, ["Heptazine"], S1_ref, T1_ref)]
+    assert sorted(history, key=len) == [PARAMS, independent]
@@ -0,0 +1,38 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "Grid_Search"))
+
+from grid_search import run_design, run_design_as_arrays
+from evaluation_cache import EvaluationCache
+from generate_and_submit_jobs import template_fingerprint
+from job_tracker import JobTracker
+from simulator import SimulatedScheduler
+
+GEOMETRIES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "geometries.txt")
+MOLECULES = ["Heptazine", "Cyclazine"]
+POINTS = [{'a1': 0.5, 'b1': -0.23, 'a2': 0.68, 'b2': -0.1}, {'a1': 0.51, 'b1': -0.2, 'a2': 0.7, 'b2': -0.09}]
+
+def simulated_tracker():
+    scheduler = SimulatedScheduler(runtime=(1.0, 2.0), speedup=1000.0, seed=0)
+    return JobTracker(scheduler, min_interval=0.01, max_interval=0.05)
+
+def run(design, cache, **options):
+    tracker = simulated_tracker()
+    design(POINTS, MOLECULES, GEOMETRIES, max_jobs=4, cache=cache, tracker=tracker, **options)
+    return tracker.scheduler.submissions
+
+@pytest.mark.parametrize("design, options", [(run_design, {}),
+                                             (run_design_as_arrays, {"gamess_command": "true  # simulated"})])
+def test_second_run_over_the_same_points_submits_nothing(tmp_path, monkeypatch, design, options):
+    monkeypatch.chdir(tmp_path)
+    cache = EvaluationCache(str(tmp_path / "evaluation_cache.db"))
+
+    assert run(design, cache, **options) > 0
+    template = template_fingerprint()
+    for p in POINTS:
+        for state in ('S', 'T'):
+            assert cache.missing_molecules(MOLECULES, p, state, template) == []
+    assert run(design, cache, **options) == 0
@@ -0,0 +1,109 @@
+import os
+import stat
+import subprocess
+
+import pytest
+
+import job_array
+from job_array import submit_array, write_array_script
+from job_tracker import JobTracker, SlurmScheduler
+from generate_and_submit_jobs import submit_inputs_as_array
+
+COMMAND = 'echo "ran $inp on $SLURM_CPUS_PER_TASK cores" > "${inp%.inp}.log"'
+
+# sbatch stand-in: records its arguments and answers like sbatch.
+FAKE_SBATCH = """#!/bin/bash
+echo "$@" >> {calls}
+echo "Submitted batch job 4242"
+"""
+
+# squeue stand-in: records its arguments and prints the queue file ("<id> <state>" per line).
+FAKE_SQUEUE = """#!/bin/bash
+echo "$@" >> {calls}
+cat {queue}
+"""
+
+def executable(path, text):
+    path.write_text(text)
+    path.chmod(path.stat().st_mode | stat.S_IXUSR)
+    return str(path)
+
+@pytest.fixture
+def slurm(tmp_path):
+    """SlurmScheduler on fake sbatch/squeue; returns (scheduler, queue file, sbatch calls, squeue calls)."""
+    queue = tmp_path / "queue.txt"
+    queue.write_text("")
+    sbatch_calls, squeue_calls = tmp_path / "sbatch_calls.txt", tmp_path / "squeue_calls.txt"
+    scheduler = SlurmScheduler(
+        sbatch_command=executable(tmp_path / "sbatch", FAKE_SBATCH.format(calls=sbatch_calls)),
+        squeue_command=executable(tmp_path / "squeue", FAKE_SQUEUE.format(calls=squeue_calls, queue=queue)))
+    return scheduler, queue, sbatch_calls, squeue_calls
+
+@pytest.fixture
+def inputs(tmp_path):
+    paths = []
+    for state in ("S", "T"):
+        job_dir = tmp_path / f"a1_0.5_b1_-0.23_a2_0.68_b2_-0.1_{state}"
+        job_dir.mkdir()
+        for molecule in ("Heptazine", "Cyclazine"):
+            inp_file = job_dir / f"{molecule}_{job_dir.name}.inp"
+            inp_file.write_text(" $CONTRL $END\n")
+            paths.append((molecule, state, str(inp_file)))
+    return paths
+
+def test_array_needs_a_gamess_command(tmp_path, inputs, monkeypatch):
+    monkeypatch.setattr(job_array, "GAMESS_COMMAND", None)
+    with pytest.raises(ValueError, match="GAMESS_COMMAND"):
+        write_array_script([inp_file for _, _, inp_file in inputs], "grid", array_dir=str(tmp_path / "arrays"))
+
+def test_submit_array_writes_one_script(tmp_path, slurm, inputs):
+    scheduler, _, sbatch_calls, _ = slurm
+    inp_files = [inp_file for _, _, inp_file in inputs]
+    task_ids = submit_array(inp_files, "grid", partition="r630,trd,ryzn", max_running=2, scheduler=scheduler,
+                            array_dir=str(tmp_path / "arrays"), gamess_command=COMMAND)
+
+    assert task_ids == ["4242_0", "4242_1", "4242_2", "4242_3"]
+    script = str(tmp_path / "arrays" / "grid.sh")
+    assert sbatch_calls.read_text().split() == [script]
+    text = open(script).read()
+    assert "#SBATCH -p r630,trd,ryzn" in text and "#SBATCH --array=0-3%2" in text and COMMAND in text
+    with open(tmp_path / "arrays" / "grid.txt") as f:
+        assert f.read().split() == inp_files
+
+def test_array_task_runs_its_own_input(tmp_path, slurm, inputs):
+    scheduler = slurm[0]
+    inp_files = [inp_file for _, _, inp_file in inputs]
+    submit_array(inp_files, "grid", scheduler=scheduler, array_dir=str(tmp_path / "arrays"), gamess_command=COMMAND)
+
+    env = dict(os.environ, SLURM_ARRAY_TASK_ID="2", SLURM_CPUS_PER_TASK="30")
+    subprocess.run(["bash", str(tmp_path / "arrays" / "grid.sh")], env=env, check=True)
+    log_file = inp_files[2][:-len(".inp")] + ".log"
+    assert open(log_file).read().strip() == f"ran {os.path.basename(inp_files[2])} on 30 cores"
+    assert not any(os.path.exists(inp_file[:-len(".inp")] + ".log") for i, inp_file in enumerate(inp_files) if i != 2)
+
+def test_array_tasks_are_tracked_one_by_one(tmp_path, slurm, inputs, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    scheduler, queue, _, squeue_calls = slurm
+    tracker = JobTracker(scheduler, min_interval=0.0, max_interval=0.0)
+    finished = []
+
+    def callback(job_id, info):
+        finished.append((job_id, info["molecule"], info["spin_state"]))
+
+    task_ids = submit_inputs_as_array(inputs, tracker, callback, scheduler=scheduler, job_name="eval", partition="trd",
+                                      gamess_command=COMMAND)
+    assert task_ids == ["4242_0", "4242_1", "4242_2", "4242_3"]
+    assert tracker.jobs["4242_3"]["partition"] == "trd"
+
+    queue.write_text("4242_0 RUNNING\n4242_1 RUNNING\n4242_2 PENDING\n")
+    assert tracker.poll() == ["4242_3"]
+    queue.write_text("4242_1 RUNNING\n4242_2 COMPLETED\n")
+    assert sorted(tracker.poll()) == ["4242_0", "4242_2"]
+    queue.write_text("")
+    assert tracker.poll() == ["4242_1"]
+
+    assert sorted(finished) == [("4242_0", "Heptazine", "S"), ("4242_1", "Cyclazine", "S"),
+                                ("4242_2", "Heptazine", "T"), ("4242_3", "Cyclazine", "T")]
+    assert finished[0] == ("4242_3", "Cyclazine", "T") and finished[-1] == ("4242_1", "Cyclazine", "S")
+    # One squeue call per poll, through the array job, one line per task.
+    assert squeue_calls.read_text().splitlines() == ["-h -r -o %i %T -j 4242"] * 3
@@ -0,0 +1,141 @@
+import os
+
+import pytest
+
+from retry_engine import RetryEngine, classify_failure, RETRY_POLICY
+
+FINISHED = """ FINAL ROHF ENERGY IS     -230.1234567890 AFTER  15 ITERATIONS
+
+          SUMMARY OF MRSF-DFT RESULTS
+   1  A       -230.0000000000     0.000   0.0000     0.0000     0.0000     0.0000   1
+   2  A       -229.9000000000     2.721   0.0000     0.0000     0.0000     0.0000   1
+ EXECUTION OF GAMESS TERMINATED NORMALLY SAT OCT 18 12:00:00 2025
+ CPU timing information for all processes
+ ddikick.x: exited gracefully.
+"""
+
+SCRATCH = """ Error changing to scratch directory /scr/user/12345
+ The directory named above must exist on all nodes, and be writable.
+ ddikick.x: Execution terminated due to error(s).
+"""
+
+DDI_RANK = """ DDI Process 138: Multiple DDI processes connecting with the same rank.
+ ddikick.x: Execution terminated due to error(s).
+"""
+
+DDI_COUNT = """ Initiating 152 compute processes on 1 nodes to run the following command:
+"""
+
+DDI_SIGNAL = """ DDI Process 3: trapped a segmentation violation signal (SIGSEGV).
+"""
+
+# GAMESS ends every abnormal run with "error code 911", SCF failures included.
+SCF = """ ITER EX     TOTAL ENERGY
+          SCF IS UNCONVERGED, TOO MANY ITERATIONS
+ EXECUTION OF GAMESS TERMINATED -ABNORMALLY- AT SAT OCT 18 12:00:00 2025
+ DDI Process 0: error code 911
+ ddikick.x: application process 0 quit unexpectedly.
+ ddikick.x: Execution terminated due to error(s).
+"""
+
+TIMEOUT = FINISHED.split(" EXECUTION")[0] + """ *** THIS JOB HAS EXCEEDED THE TIME LIMIT ***
+ DDI Process 0: error code 911
+"""
+
+TRUNCATED = """ ITER EX     TOTAL ENERGY
+    1  0     -229.9000000000
+"""
+
+def write_log(tmp_path, text, name="Heptazine_a1_0.5_S.log"):
+    log_file = tmp_path / name
+    log_file.write_text(text)
+    return str(log_file)
+
+@pytest.mark.parametrize("text, expected", [
+    (FINISHED, None),
+    (SCRATCH, "scratch"),
+    (DDI_RANK, "ddi"),
+    (DDI_COUNT, "ddi"),
+    (DDI_SIGNAL, "ddi"),
+    (SCF, "scf"),
+    (TIMEOUT, "timeout"),
+    (TRUNCATED, "unknown"),
+])
+def test_classify_failure(tmp_path, text, expected):
+    assert classify_failure(write_log(tmp_path, text)) == expected
+
+def test_classify_missing_log(tmp_path):
+    assert classify_failure(str(tmp_path / "none.log")) == "missing"
+
+def test_slurm_state_wins_over_log(tmp_path):
+    log_file = write_log(tmp_path, TRUNCATED)
+    assert classify_failure(log_file, "NODE_FAIL") == "node"
+    assert classify_failure(log_file, "TIMEOUT") == "timeout"
+    # A run that finished is fine whatever Slurm says about it.
+    assert classify_failure(write_log(tmp_path, FINISHED, "ok.log"), "TIMEOUT") is None
+
+class FakeTracker:
+    def __init__(self):
+        self.retries = []
+        self.scheduler = FakeScheduler()
+
+    def retry(self, job_id, resubmit, delay=0.0, callback=None):
+        self.retries.append((job_id, delay, resubmit))
+
+class FakeScheduler:
+    def __init__(self):
+        self.submitted = []
+
+    def submit_input(self, inp_file, partition="r630", cpus=30):
+        self.submitted.append((inp_file, partition))
+        return "2001"
+
+def engine_for(policy=None, **kwargs):
+    tracker = FakeTracker()
+    return tracker, RetryEngine(tracker, policy=policy, history=":memory:", **kwargs)
+
+def run_attempts(tmp_path, text, attempts):
+    """Handle `attempts` consecutive failures of one job; return the tracker, engine and callback calls."""
+    tracker, engine = engine_for()
+    calls = []
+    handler = engine.watch(lambda job_id, info: calls.append(info["attempts"]))
+    inp_file = str(tmp_path / "Heptazine_a1_0.5_S.inp")
+    for attempt in range(1, attempts + 1):
+        write_log(tmp_path, text)
+        handler("1001", {"inp_file": inp_file, "attempts": attempt, "state": "COMPLETED"})
+    return tracker, engine, calls
+
+def test_ddi_failures_back_off_until_the_limit(tmp_path):
+    limit = RETRY_POLICY["ddi"]["limit"]
+    tracker, engine, calls = run_attempts(tmp_path, DDI_RANK, limit + 1)
+
+    delays = [delay for _, delay, _ in tracker.retries]
+    base = RETRY_POLICY["ddi"]["delay"]
+    assert delays == [base * 2 ** i for i in range(limit)]
+    assert calls == [limit + 1]
+    assert engine.summary() == {("ddi", "retry"): limit, ("ddi", "gave_up"): 1}
+    # Each failed attempt keeps its log next to the input.
+    for attempt in range(1, limit + 1):
+        assert os.path.exists(tmp_path / f"Heptazine_a1_0.5_S.log.attempt{attempt}")
+
+def test_scf_failures_are_not_retried(tmp_path):
+    tracker, engine, calls = run_attempts(tmp_path, SCF, 1)
+    assert tracker.retries == []
+    assert calls == [1]
+    assert engine.summary() == {("scf", "gave_up"): 1}
+
+def test_recovered_run_is_recorded(tmp_path):
+    tracker, engine, calls = run_attempts(tmp_path, FINISHED, 1)
+    assert tracker.retries == [] and calls == [1] and engine.summary() == {}
+
+    tracker, engine = engine_for()
+    engine.watch()("1001", {"inp_file": write_log(tmp_path, FINISHED)[:-len(".log")] + ".inp", "attempts": 2})
+    assert engine.summary() == {(None, "recovered"): 1}
+
+def test_retries_go_to_the_configured_partition(tmp_path):
+    tracker, engine = engine_for(partition="trd,ryzn,chc3,r630")
+    inp_file = write_log(tmp_path, SCRATCH)[:-len(".log")] + ".inp"
+    engine.watch()("1001", {"inp_file": inp_file, "attempts": 1})
+    (_, _, resubmit), = tracker.retries
+    assert resubmit() == "2001"
+    assert tracker.scheduler.submitted == [(inp_file, "trd,ryzn,chc3,r630")]
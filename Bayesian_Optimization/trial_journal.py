@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+
+import json
+import sqlite3
+from time import time
+
+class TrialJournal:
+    """SQLite journal of every optimizer trial, written as the run progresses.
+
+    A trial is recorded when it is proposed ('submitting'), again once its jobs are in the
+    queue ('running', with the job ids) and finally with its result ('done'). While some of
+    its jobs still wait in a JobPool it stays 'submitting' with the ids submitted so far.
+    Each step is committed immediately, so after a crash `restore` can rebuild the optimizer
+    history and hand back the evaluations that still have to be collected.
+    """
+
+    def __init__(self, filename="optimizer_state.db"):
+        self.filename = filename
+        self.connection = sqlite3.connect(filename)
+        self.connection.execute("""
+            CREATE TABLE IF NOT EXISTS trials (
+                tid INTEGER PRIMARY KEY,
+                vals TEXT NOT NULL,
+                job_ids TEXT NOT NULL DEFAULT '[]',
+                state TEXT NOT NULL,
+                result TEXT,
+                updated REAL
+            )""")
+        self.connection.commit()
+
+    def record_ask(self, tid, vals):
+        self.connection.execute("INSERT OR REPLACE INTO trials (tid, vals, state, updated) VALUES (?, ?, 'submitting', ?)",
+                                (tid, json.dumps(vals), time()))
+        self.connection.commit()
+
+    def record_submitted(self, tid, job_ids):
+        self.connection.execute("UPDATE trials SET job_ids=?, state='running', updated=? WHERE tid=?",
+                                (json.dumps(list(job_ids)), time(), tid))
+        self.connection.commit()
+
+    def record_jobs(self, tid, job_ids):
+        """Job ids of a trial whose jobs are only partly in the queue yet (the rest wait in a job_tracker.JobPool)."""
+        self.connection.execute("UPDATE trials SET job_ids=?, updated=? WHERE tid=?", (json.dumps(list(job_ids)), time(), tid))
+        self.connection.commit()
+
+    def record_tell(self, tid, result):
+        self.connection.execute("UPDATE trials SET result=?, state='done', updated=? WHERE tid=?",
+                                (json.dumps(result), time(), tid))
+        self.connection.commit()
+
+    def rows(self):
+        return self.connection.execute("SELECT tid, vals, job_ids, state, result FROM trials ORDER BY tid").fetchall()
+
+    def restore(self, optimizer):
+        """Replay the journal into `optimizer` and return the unfinished trials.
+
+        Finished trials are told back with their stored result. The others are re-registered
+        as pending and returned as (tid, params, job_ids, state) so the driver can reattach
+        to their jobs ('running') or submit them again ('submitting').
+        """
+        rows = self.rows()
+        unfinished = []
+        for tid, vals, job_ids, state, result in rows:
+            vals = json.loads(vals)
+            if state == 'done':
+                optimizer.restore(tid, vals, json.loads(result))
+            else:
+                params = optimizer.restore(tid, vals)
+                unfinished.append((tid, params, json.loads(job_ids), state))
+        if rows:
+            print(f"Restored {len(rows) - len(unfinished)} finished and {len(unfinished)} unfinished trial(s) "
+                  f"from {self.filename}.")
+        return unfinished
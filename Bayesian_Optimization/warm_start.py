@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+
+import os
+import argparse
+from collections import defaultdict
+
+import numpy as np
+from hyperopt import STATUS_OK
+
+from evaluation_cache import EvaluationCache, params_key, SPCP_WEIGHTS
+from results_store import ResultsStore
+from early_abort import energy_row
+from scoring import ResultArrays, score_all
+from gp_optimizer import space_bounds
+from generate_and_submit_jobs import EXTRA_PARAMETERS, template_fingerprint
+
+def complete_params(params, names, defaults=EXTRA_PARAMETERS):
+    """`params` extended to `names` with the default of every parameter it did not optimize.
+
+    Returns None if `params` has a parameter outside `names` or lacks one without a default.
+    """
+    if not set(params) <= set(names) or any(name not in params and name not in defaults for name in names):
+        return None
+    return {name: params[name] if name in params else defaults[name] for name in names}
+
+def store_history(store):
+    """(params, loss) of every combination in a results_store.ResultsStore.
+
+    Rejected combinations get an infinite loss, as in main.py; aborted ones only have a lower
+    bound and are left out.
+    """
+    for result in store.query():
+        if result['status'] == 'aborted':
+            continue
+        params = {name: result[name] for name in store.param_names if name in result}
+        yield params, result['rmse'] if result['rmse'] is not None else float('inf')
+
+def cache_history(cache, molecules, S1_ref, T1_ref, fidelity='full'):
+    """(params, loss) of every parameter set with S and T energies of all `molecules` in an EvaluationCache.
+
+    Covers runs that never went through a results store, e.g. Grid_Search trees imported with
+    evaluation_cache.py. The loss is the S1-T1 gap RMSE main.py would have given. Only energies
+    stored under the template a parameter set is run with now count (template_fingerprint of its
+    parameters), which leaves out the co,co,co runs of the original CSP generator.
+    """
+    plain, weighted = template_fingerprint(fidelity), template_fingerprint(fidelity, EXTRA_PARAMETERS)
+    energies = defaultdict(dict)
+    params_of = {}
+    for template in (plain, weighted):
+        for params, molecule, state, root_energies in cache.entries(template):
+            if (template == weighted) != any(name in params for name in SPCP_WEIGHTS):
+                continue
+            key = params_key(params)
+            params_of[key] = params
+            energies[key][(molecule, state)] = root_energies
+
+    complete = []
+    for key, found in energies.items():
+        rows = [energy_row(molecule, found.get((molecule, 'S')), found.get((molecule, 'T'))) for molecule in molecules]
+        if all(row is not None for row in rows):
+            complete.append((params_of[key], rows))
+    if not complete:
+        return
+
+    arrays = {metric: np.array([[row[column] for row in rows] for _, rows in complete])
+              for metric, column in (("S1", "S1"), ("T1", "T1"), ("gap", "S1-T1"))}
+    results = ResultArrays([], [params_key(params) for params, _ in complete], list(molecules), **arrays)
+    for (params, _), rmse in zip(complete, score_all(results, S1_ref, T1_ref)["gap_rmse"]):
+        yield params, float(rmse) if np.isfinite(rmse) else float('inf')
+
+def prior_evaluations(space, stores=(), caches=(), molecules=(), S1_ref=None, T1_ref=None, fidelity='full',
+                      defaults=EXTRA_PARAMETERS):
+    """Earlier evaluations that fall inside `space`, as (vals, result) for run_async_optimization(prior=...).
+
+    Results stores are read first, then caches; a parameter set is only taken once. Points of
+    lower-dimensional runs are lifted into `space` with `defaults` for the parameters they kept
+    fixed (co, ov, cv and mu of a 4-parameter run). Points outside the bounds of `space` are dropped.
+    """
+    bounds = space_bounds(space)
+    names = list(bounds)
+    sources = [(store.filename, store_history(store)) for store in stores]
+    sources += [(cache.filename, cache_history(cache, molecules, S1_ref, T1_ref, fidelity)) for cache in caches]
+
+    seen = set()
+    prior = []
+    for source, history in sources:
+        for params, loss in history:
+            params = complete_params(params, names, defaults)
+            if params is None or params_key(params) in seen:
+                continue
+            if any(not low - 1e-9 <= params[name] <= high + 1e-9 for name, (_, low, high, _) in bounds.items()):
+                continue
+            seen.add(params_key(params))
+            prior.append(({bounds[name][0]: params[name] for name in names},
+                          {'loss': loss, 'status': STATUS_OK, 'seeded': source}))
+    return prior
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="List the earlier evaluations a warm-started search would be seeded with.")
+    parser.add_argument("--store", nargs="*", default=[], help="results_store databases")
+    parser.add_argument("--cache", nargs="*", default=[], help="evaluation_cache databases (Grid_Search imports included)")
+    parser.add_argument("--molecules", nargs="+", help="molecules a cached parameter set needs (default: the references)")
+    parser.add_argument("--top", type=int, default=10)
+    args = parser.parse_args()
+
+    from compare_results import S1_ref, T1_ref
+    molecules = args.molecules or list(S1_ref)
+    history = []
+    for filename in args.store:
+        history += [(filename, params, loss) for params, loss in store_history(ResultsStore(filename))]
+    for filename in args.cache:
+        history += [(filename, params, loss) for params, loss in
+                    cache_history(EvaluationCache(filename), molecules, S1_ref, T1_ref)]
+    history.sort(key=lambda entry: entry[2])
+    print(f"{len(history)} earlier evaluation(s), {sum(1 for entry in history if entry[2] < float('inf'))} with a finite loss.")
+    for filename, params, loss in history[:args.top]:
+        print(f"{loss:.4f}  {params_key(params)}  ({os.path.basename(filename)})")
@@ -0,0 +1,210 @@
+#!/usr/bin/env python3
+
+import os
+import sys
+import argparse
+import itertools
+
+import numpy as np
+from scipy.stats import qmc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "Bayesian_Optimization"))
+
+from generate_and_submit_jobs import (generate_input_files_and_submit, write_input_file, submit_inputs_as_array,
+                                      template_fingerprint, FIDELITIES)
+from evaluation_cache import EvaluationCache, params_key, parse_state_dir
+from extract_log_data import cache_finished_log
+from job_tracker import JobPool, JobTracker, SlurmScheduler
+from job_array import MAX_ARRAY_SIZE, gamess_command_or_fail
+from retry_engine import RetryEngine
+from metrics import MetricsStore
+from simulator import SimulatedScheduler
+
+# Ranges of Input_generator_singlet.csh / Input_generator_triplet.csh: (start, stop, step), stop included.
+ranges = {
+    'a1': (0.48, 0.52, 0.01),
+    'b1': (-0.28, -0.18, 0.01),
+    'a2': (0.65, 0.75, 0.01),
+    'b2': (-0.12, -0.08, 0.01),
+}
+
+molecules = ["Molecule1", "Molecule2", "Molecule3"]
+
+# Partitions the csh generators submitted to (gms_sbatch -p r630,trd,ryzn).
+partition = "r630,trd,ryzn"
+
+def grid_values(start, stop, step):
+    count = int(round((stop - start) / step)) + 1
+    return [round(start + i * step, 2) + 0.0 for i in range(count)]
+
+def full_grid(ranges):
+    """Every combination of the range values, like the nested foreach loops of the csh generators."""
+    names = list(ranges)
+    for values in itertools.product(*(grid_values(*ranges[name]) for name in names)):
+        yield dict(zip(names, values))
+
+def space_filling(ranges, n_points, method="sobol", seed=None):
+    """`n_points` Latin hypercube or scrambled Sobol points, snapped to the range grid.
+
+    Points that land on the same grid node after snapping are kept once, so the result can
+    be slightly shorter than `n_points`.
+    """
+    names = list(ranges)
+    if method == "lhs":
+        sampler = qmc.LatinHypercube(d=len(names), seed=seed)
+    else:
+        sampler = qmc.Sobol(d=len(names), scramble=True, seed=seed)
+    unit = sampler.random(n_points)
+
+    points = {}
+    for row in unit:
+        params = {}
+        for name, u in zip(names, row):
+            values = grid_values(*ranges[name])
+            params[name] = values[min(int(u * len(values)), len(values) - 1)]
+        points.setdefault(params_key(params), params)
+    return list(points.values())
+
+def design(kind, ranges, n_points=None, seed=None):
+    if kind == "grid":
+        return list(full_grid(ranges))
+    return space_filling(ranges, n_points, kind, seed)
+
+def job_callback(cache, template, fidelity, metrics=None, params=None):
+    """Per-job callback that records the timings in `metrics` and, given a cache, stores the energies in it.
+
+    Without `params` (array tasks of many points) the parameters are read from the job directory.
+    """
+    if cache is None:
+        return metrics.watch(params=params, fidelity=fidelity) if metrics is not None else None
+
+    def stream_result(job_id, info):
+        p = params if params is not None else parse_state_dir(os.path.dirname(info['inp_file']))[0]
+        cache_finished_log(cache, p, info['molecule'], info['spin_state'], template,
+                           info['inp_file'][:-len('.inp')] + '.log', metrics=metrics, job_id=job_id, info=info,
+                           fidelity=fidelity)
+    return stream_result
+
+def run_design(points, molecules, geom_file="geometries.txt", max_jobs=70, cache=None, fidelity='full', tracker=None,
+               metrics=None, partition=partition):
+    """Run the singlet and triplet jobs of every point through one sliding window of `max_jobs`.
+
+    Molecules already in the evaluation cache are skipped, and the energies of every finished
+    job are added to it as it finishes. With a metrics.MetricsStore the timings of every finished
+    job are recorded. Jobs and their retries go to `partition`.
+    Returns the submitted job ids.
+    """
+    pool = JobPool(max_jobs, tracker)
+    retries = RetryEngine(pool.tracker, partition=partition)
+    template = template_fingerprint(fidelity)
+
+    for i, p in enumerate(points, 1):
+        queued = len(pool)
+        for state in ('S', 'T'):
+            missing = cache.missing_molecules(molecules, p, state, template) if cache is not None else list(molecules)
+            if missing:
+                callback = job_callback(cache, template, fidelity, metrics, p)
+                generate_input_files_and_submit(missing, p['a1'], p['b1'], p['a2'], p['b2'], state,
+                                                geom_file=geom_file, fidelity=fidelity, pool=pool,
+                                                callback=retries.watch(callback), partition=partition)
+        if len(pool) == queued:
+            print(f"[{i}/{len(points)}] {params_key(p)} already in the cache.")
+
+    print(f"Running {len(pool)} job(s) for {len(points)} point(s), {max_jobs} at a time...")
+    job_ids = pool.run()
+    print("All jobs have been completed.")
+    return job_ids
+
+def run_design_as_arrays(points, molecules, geom_file="geometries.txt", max_jobs=70, cache=None, fidelity='full',
+                         tracker=None, array_size=MAX_ARRAY_SIZE, metrics=None, partition=partition, gamess_command=None):
+    """Write every input of the design and run them as Slurm job arrays of up to `array_size` tasks.
+
+    Each array (a slice of the design) is one sbatch call to `partition` with at most `max_jobs`
+    tasks running at once (%max_jobs); the slices run one after another. The tasks run
+    `gamess_command` (job_array.GAMESS_COMMAND by default). Finished energies go to the cache
+    as in run_design. Returns the task ids.
+    """
+    tracker = tracker if tracker is not None else JobTracker()
+    retries = RetryEngine(tracker, partition=partition)
+    template = template_fingerprint(fidelity)
+    inputs = []
+    for p in points:
+        for state in ('S', 'T'):
+            missing = cache.missing_molecules(molecules, p, state, template) if cache is not None else list(molecules)
+            for molecule in missing:
+                inp_file = write_input_file(molecule, p['a1'], p['b1'], p['a2'], p['b2'], state, geom_file, fidelity)
+                if inp_file is not None:
+                    inputs.append((molecule, state, inp_file))
+    callback = job_callback(cache, template, fidelity, metrics)
+
+    task_ids = []
+    n_slices = (len(inputs) + array_size - 1) // array_size
+    for start in range(0, len(inputs), array_size):
+        print(f"Slice {start // array_size + 1}/{n_slices}: {len(inputs[start:start + array_size])} task(s)")
+        slice_ids = submit_inputs_as_array(inputs[start:start + array_size], tracker, retries.watch(callback),
+                                           scheduler=tracker.scheduler,
+                                           max_running=max_jobs, job_name=f"grid_{fidelity}_{start // array_size}",
+                                           partition=partition, gamess_command=gamess_command)
+        tracker.wait(slice_ids)
+        task_ids += slice_ids
+    print("All jobs have been completed.")
+    return task_ids
+
+def parse_range(text):
+    start, stop, step = (float(value) for value in text.split(":"))
+    return start, stop, step
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Grid or space-filling survey of a1/b1/a2/b2 (S and T jobs together).")
+    parser.add_argument("--design", choices=("grid", "lhs", "sobol"), default="grid")
+    parser.add_argument("-n", "--points", type=int, default=64, help="number of points for lhs/sobol")
+    parser.add_argument("--seed", type=int, default=None)
+    for name, (start, stop, step) in ranges.items():
+        parser.add_argument(f"--{name}", type=parse_range, default=(start, stop, step), metavar="START:STOP:STEP")
+    parser.add_argument("--molecules", nargs="+", default=molecules)
+    parser.add_argument("--geometries", default="geometries.txt")
+    parser.add_argument("--max-jobs", type=int, default=70)
+    parser.add_argument("-p", "--partition", default=partition, help="Slurm partition(s), comma-separated")
+    parser.add_argument("--fidelity", choices=FIDELITIES, default='full')
+    parser.add_argument("--array", action="store_true", help="submit Slurm job arrays instead of one job per input "
+                                                              "(set GAMESS_COMMAND in job_array.py first)")
+    parser.add_argument("--array-size", type=int, default=MAX_ARRAY_SIZE, help="tasks per job array")
+    parser.add_argument("--sbatch", default="sbatch", help="sbatch command (e.g. a local fake for testing)")
+    parser.add_argument("--squeue", default="squeue", help="squeue command (e.g. a local fake for testing)")
+    parser.add_argument("--simulate", type=float, metavar="SPEEDUP",
+                        help="run against the local Slurm/GAMESS simulator, this many times faster than real time")
+    parser.add_argument("--cache", help="evaluation_cache.db; molecules already in it are not run again and "
+                                         "finished jobs are added to it")
+    parser.add_argument("--metrics", default="metrics.db", help="where the per-job timings are recorded")
+    parser.add_argument("--dry-run", action="store_true", help="only print the design")
+    args = parser.parse_args()
+    if args.array and not args.dry_run and not args.simulate:
+        try:
+            gamess_command_or_fail()
+        except ValueError as e:
+            parser.error(str(e))
+
+    survey_ranges = {name: getattr(args, name) for name in ranges}
+    points = design(args.design, survey_ranges, args.points, args.seed)
+    n_grid = int(np.prod([len(grid_values(*r)) for r in survey_ranges.values()]))
+    print(f"{args.design} design: {len(points)} point(s) out of a {n_grid}-point grid, "
+          f"{2 * len(points) * len(args.molecules)} job(s) at most")
+
+    if args.dry_run:
+        for p in points:
+            print(params_key(p))
+    else:
+        cache = EvaluationCache(args.cache) if args.cache else None
+        metrics = MetricsStore(args.metrics)
+        if args.simulate:
+            tracker = JobTracker(SimulatedScheduler(max_running=args.max_jobs, speedup=args.simulate),
+                                 min_interval=0.5, max_interval=5.0, metrics=metrics)
+        else:
+            tracker = JobTracker(SlurmScheduler(squeue_command=args.squeue, sbatch_command=args.sbatch), metrics=metrics)
+        if args.array:
+            run_design_as_arrays(points, args.molecules, args.geometries, args.max_jobs, cache, args.fidelity,
+                                 tracker, args.array_size, metrics, args.partition,
+                                 "true  # simulated" if args.simulate else None)
+        else:
+            run_design(points, args.molecules, args.geometries, args.max_jobs, cache, args.fidelity, tracker, metrics,
+                       args.partition)